@@ -30,6 +30,7 @@ from azimuth.utils.cluster import default_cluster
 from azimuth.utils.conversion import JSONResponseIgnoreNan
 from azimuth.utils.exception_handlers import handle_validation_error
 from azimuth.utils.logs import set_logger_config
+from azimuth.utils.ml.perturbation_test import shutdown_perturbation_executors
 from azimuth.utils.validation import assert_not_none
 
 _dataset_split_managers: Dict[DatasetSplitName, Optional[DatasetSplitManager]] = {}
@@ -145,6 +146,7 @@ def start_app(config_path: Optional[str], load_config_history: bool, debug: bool
         if _task_manager:
             _task_manager.close()
             _task_manager.cluster.close()
+        shutdown_perturbation_executors()
 
     return app
 
@@ -29,6 +29,12 @@ class SupportedLanguage(str, Enum):
     fr = "fr"
 
 
+class BatchingStrategy(str, Enum):
+    contiguous = "contiguous"  # Batches of `batch_size` rows, in the dataset order.
+    sorted_by_length = "sorted_by_length"  # Batches of `batch_size` rows of similar lengths.
+    token_budget = "token_budget"  # Batches of similar lengths with a bounded padded size.
+
+
 # spaCy models must be in pyproject.toml to be loaded by Azimuth
 class SupportedSpacyModels(str, Enum):
     use_default = ""
@@ -302,6 +308,10 @@ class CommonFieldsConfig(ArtifactsConfig, ProjectConfig, extra=Extra.ignore):
 
     # Batch size to use during inference.
     batch_size: int = Field(32, exclude_from_cache=True)
+    # How utterances are grouped in batches during inference. Sorting by length reduces padding.
+    batching_strategy: BatchingStrategy = Field(
+        BatchingStrategy.contiguous, exclude_from_cache=True
+    )
     # Will use CUDA and will need GPUs if set to True.
     # If "auto" we check if CUDA is available.
     use_cuda: Union[Literal["auto"], bool] = Field("auto", exclude_from_cache=True)
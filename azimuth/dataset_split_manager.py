@@ -9,19 +9,39 @@ from copy import copy, deepcopy
 from dataclasses import asdict, dataclass
 from glob import glob
 from os.path import join as pjoin
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union, cast
 
+import datasets
 import faiss
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import structlog
 from datasets import ClassLabel, Dataset, concatenate_datasets
 from filelock import FileLock
 
 from azimuth.config import AzimuthConfig, AzimuthValidationError, CommonFieldsConfig
-from azimuth.types import DatasetColumn, DatasetFilters, DatasetSplitName
+from azimuth.types import DatasetColumn, DatasetFilters, DatasetSplitName, ExportFormat
 from azimuth.types.tag import ALL_DATA_ACTIONS, Tag
-from azimuth.utils.dataset_operations import filter_dataset_split
+from azimuth.utils.dataset_operations import (
+    filter_dataset_split,
+    get_array_from_ds,
+    get_arrow_column,
+    get_arrow_table,
+    get_column_from_ds,
+    get_confidences_from_ds,
+    get_data_action_memberships,
+    get_filters_mask,
+    get_indices_mapping,
+    get_outcome_codes_from_ds,
+    get_predictions_from_ds,
+)
+from azimuth.utils.export import EXPORT_CHUNK_SIZE, class_ids_to_names, iter_export_bytes
+from azimuth.utils.ml.group_statistics import GroupStatistics
+from azimuth.utils.ml.linguistic_analysis import analyze_utterances
+from azimuth.utils.utterance_index import UtteranceIndex
 from azimuth.utils.validation import assert_not_none
 
 REJECTION_CLASS = "REJECTION_CLASS"
@@ -51,12 +71,6 @@ class PredictionTableKey:
         )
 
 
-def to_class_name(class_idx, class_names):
-    if isinstance(class_idx, Sequence):
-        return [to_class_name(v, class_names) for v in class_idx]
-    return class_names[class_idx]
-
-
 class DatasetSplitManager:
     """Manage the dataset_split state, add/filter tags.
 
@@ -91,6 +105,8 @@ class DatasetSplitManager:
         self._file_lock = pjoin(self._hf_path, f"{name}.lock")
         # Load the dataset_split from disk.
         self._base_dataset_split_last_update: Time = -1
+        # Same as above, but not updated when only data action tags change.
+        self._base_dataset_split_last_update_excluding_data_actions: Time = -1
         cached_base_dataset_split = self._load_latest_base_dataset_split()
         if cached_base_dataset_split is None:
             if dataset_split is None:
@@ -104,6 +120,25 @@ class DatasetSplitManager:
             self._base_dataset_split, self._malformed_dataset = cached_base_dataset_split
         self._prediction_tables: Dict[PredictionTableKey, Dataset] = {}
         self._prediction_tables_last_update: Dict[PredictionTableKey, Time] = defaultdict(float)
+        # Base dataset_split concatenated with each prediction table, while both are unchanged.
+        self._datasets_with_predictions: Dict[
+            PredictionTableKey, Tuple[Dataset, Dataset, Dataset]
+        ] = {}
+        self._utterance_index: Optional[UtteranceIndex] = None
+        self._linguistic_analyses: Dict[str, pa.Table] = {}
+        self._data_action_statistics: Dict[
+            Tuple[PredictionTableKey, bool], Tuple[Time, GroupStatistics]
+        ] = {}
+        self._sorted_row_indices: Dict[
+            Tuple[str, Optional[PredictionTableKey], bool],
+            Tuple[Tuple[Time, Optional[Time]], np.ndarray],
+        ] = {}
+        self._datasets_with_class_names: Dict[
+            Optional[PredictionTableKey], Tuple[Tuple[Time, Optional[Time]], Dataset]
+        ] = {}
+        self._filtered_counts: Dict[
+            Tuple[str, Optional[PredictionTableKey], bool], Tuple[Tuple[Time, Optional[Time]], int]
+        ] = {}
         self._validate_columns()
 
     @property
@@ -112,6 +147,16 @@ class DatasetSplitManager:
             (self._base_dataset_split_last_update, *self._prediction_tables_last_update.values())
         )
 
+    @property
+    def last_update_excluding_data_actions(self) -> Time:
+        """Last update of the dataset split, ignoring updates where only data actions changed."""
+        return max(
+            (
+                self._base_dataset_split_last_update_excluding_data_actions,
+                *self._prediction_tables_last_update.values(),
+            )
+        )
+
     def get_dataset_split(self, table_key: Optional[PredictionTableKey] = None) -> Dataset:
         """Return a dataset_split concatenated with the config predictions.
 
@@ -124,8 +169,11 @@ class DatasetSplitManager:
         current_last_update = self._base_dataset_split_last_update
         latest_base_ds, last_update = self.load_latest_cache(self._save_path, current_last_update)
         if latest_base_ds:
+            data_actions_only = self._only_data_actions_differ(
+                self._base_dataset_split, latest_base_ds
+            )
             self._base_dataset_split = latest_base_ds
-            self._base_dataset_split_last_update = last_update
+            self._set_base_dataset_split_last_update(last_update, data_actions_only)
         if table_key is None:
             return self._base_dataset_split
         return self.dataset_split_with_predictions(table_key=table_key)
@@ -141,8 +189,16 @@ class DatasetSplitManager:
 
         """
         prediction_table = self._get_prediction_table(table_key)
-        ds: Dataset = concatenate_datasets([self._base_dataset_split, prediction_table], axis=1)
-        return ds
+        cached = self._datasets_with_predictions.get(table_key)
+        if (
+            cached is None
+            or cached[0] is not self._base_dataset_split
+            or cached[1] is not prediction_table
+        ):
+            ds: Dataset = concatenate_datasets([self._base_dataset_split, prediction_table], axis=1)
+            cached = self._base_dataset_split, prediction_table, ds
+            self._datasets_with_predictions[table_key] = cached
+        return cached[2]
 
     @property
     def num_rows(self):
@@ -162,7 +218,7 @@ class DatasetSplitManager:
             current_update = self._base_dataset_split_last_update
             base_ds, last_update = self.load_latest_cache(self._save_path, current_update)
             malformed, _ = self.load_latest_cache(self._malformed_path, current_update)
-            self._base_dataset_split_last_update = last_update
+            self._set_base_dataset_split_last_update(last_update)
             return assert_not_none(base_ds), assert_not_none(malformed)
         return None
 
@@ -181,58 +237,282 @@ class DatasetSplitManager:
         base_dataset_split = self._init_dataset_split(base_dataset_split, self._tags)
         return base_dataset_split, malformed_dataset
 
-    def _save_base_dataset_split(self):
+    def _save_base_dataset_split(self, data_actions_only: bool = False):
         # NOTE: We should not have the Index in `self.dataset_split`.
         with FileLock(self._file_lock):
             version_path, last_update = self._get_new_version_path(self._save_path)
             self._base_dataset_split.save_to_disk(version_path)
             malformed, _ = self._get_new_version_path(self._malformed_path)
             self._malformed_dataset.save_to_disk(malformed)
-        self._base_dataset_split_last_update = last_update
+        self._set_base_dataset_split_last_update(last_update, data_actions_only=data_actions_only)
         log.debug("Base dataset split saved.", path=version_path)
 
+    def _set_base_dataset_split_last_update(self, last_update: Time, data_actions_only=False):
+        self._base_dataset_split_last_update = last_update
+        if not data_actions_only:
+            self._base_dataset_split_last_update_excluding_data_actions = last_update
+
+    @staticmethod
+    def _only_data_actions_differ(previous: Dataset, current: Dataset) -> bool:
+        # Another process saved a new version, which could have changed any column.
+        if previous.column_names != current.column_names or (
+            get_indices_mapping(previous) is not None or get_indices_mapping(current) is not None
+        ):
+            return False
+        columns = [column for column in current.column_names if column not in ALL_DATA_ACTIONS]
+        return cast(
+            bool, previous.data.table.select(columns).equals(current.data.table.select(columns))
+        )
+
     def get_dataset_split_with_class_names(
         self, table_key: Optional[PredictionTableKey] = None
     ) -> Dataset:
         """Get a copy of the dataset_split, with class names instead of ids.
 
+        The copy is cached until the base dataset_split or the prediction table is updated.
+
         Args:
             table_key: If provided, which pipeline predictions to return.
 
         Returns:
             Dataset with class indices replaces for their names.
         """
-        # Not using self.dataset_split.features["label"].int2str() as it throws on -1,
-        # which is possible in postprocessed_prediction
-        # if a rejection class is missing from the classes.
-        class_names = [
-            *self.get_class_names(),
-            self.config.rejection_class or REJECTION_CLASS,
-        ]  # so class_names[-1] returns "REJECTION_CLASS"
         ds = self.get_dataset_split(table_key=table_key)
-        col_names = ds.column_names
-        class_columns = {c for c in self.classification_columns if c in col_names}
-        ds_with_names: Dataset = ds.map(
-            lambda r: {c: to_class_name(r[c], class_names) for c in class_columns}, batched=True
+        version = (
+            self._base_dataset_split_last_update,
+            self._prediction_tables_last_update[table_key] if table_key is not None else None,
         )
-        return ds_with_names
+        cached = self._datasets_with_class_names.get(table_key)
+        if cached is None or cached[0] != version:
+            cached = version, self.decode_class_names(ds)
+            self._datasets_with_class_names[table_key] = cached
+        return cached[1]
 
-    def save_csv(self, table_key=None) -> str:
-        """Save the dataset_split and return the path.
+    def get_sorted_row_indices(
+        self,
+        column: str,
+        table_key: Optional[PredictionTableKey] = None,
+        descending: bool = False,
+    ) -> np.ndarray:
+        """Get the row_idx of all rows, sorted by a column.
+
+        The order is computed once per version of the tables, and is not recomputed when only data
+        action tags change. Class columns are sorted by class name, columns of lists by their first
+        value, and ties by row_idx.
 
         Args:
-            table_key: If provided, which prediction table to select.
+            column: Column to sort by.
+            table_key: If provided, which prediction table the column can come from.
+            descending: Whether to sort from the largest value.
 
         Returns:
-            Local path to the csv.
+            row_idx of all rows, in the sort order.
         """
-        log.info("Saving dataset_split as csv.", path=self._project_path)
-        file_label = time.strftime("%Y%m%d_%H%M%S", time.localtime())
-        pt = pjoin(
-            self._project_path,
-            f"azimuth_export_{self.config.name}_{self.name}_{file_label}.csv",
+        ds = self.get_dataset_split(table_key=table_key)
+        version = self.get_sort_version(table_key)
+        cache_key = (column, table_key, descending)
+        cached = self._sorted_row_indices.get(cache_key)
+        if cached is None or cached[0] != version:
+            cached = version, self._sort_row_indices(ds, column, descending)
+            self._sorted_row_indices[cache_key] = cached
+        return cached[1]
+
+    def get_sort_version(
+        self, table_key: Optional[PredictionTableKey] = None
+    ) -> Tuple[Time, Optional[Time]]:
+        """Get the version of the tables on which the orders of `get_sorted_row_indices` depend.
+
+        Args:
+            table_key: If provided, which prediction table the columns can come from.
+
+        Returns:
+            Last update of the base dataset_split excluding data actions, and of the prediction
+                table.
+        """
+        self.get_dataset_split(table_key=table_key)  # Loads the latest versions.
+        return (
+            self._base_dataset_split_last_update_excluding_data_actions,
+            self._prediction_tables_last_update[table_key] if table_key is not None else None,
+        )
+
+    def get_filtered_count(
+        self,
+        filters: DatasetFilters,
+        table_key: Optional[PredictionTableKey] = None,
+        without_postprocessing: bool = False,
+    ) -> int:
+        """Count the rows matching filters, computed once per version of the tables.
+
+        Args:
+            filters: Filters to count the rows of.
+            table_key: If provided, which prediction table the filtered columns can come from.
+            without_postprocessing: Filter on columns without postprocessing.
+
+        Returns:
+            Number of rows matching the filters.
+        """
+        ds = self.get_dataset_split(table_key=table_key)
+        # Unlike the orders, the filters can be on data actions, so any update is a new version.
+        version = (
+            self._base_dataset_split_last_update,
+            self._prediction_tables_last_update[table_key] if table_key is not None else None,
+        )
+        cache_key = (filters.json(), table_key, without_postprocessing)
+        cached = self._filtered_counts.get(cache_key)
+        if cached is None or cached[0] != version:
+            mask = get_filters_mask(
+                ds,
+                filters,
+                self.config,
+                without_postprocessing,
+                utterance_index=self.get_utterance_index()
+                if filters.utterance is not None
+                else None,
+            )
+            cached = version, len(ds) if mask is None else int(mask.sum())
+            # Counts of previous versions are never requested again.
+            self._filtered_counts = {
+                key: value for key, value in self._filtered_counts.items() if value[0] == version
+            }
+            self._filtered_counts[cache_key] = cached
+        return cached[1]
+
+    def _sort_row_indices(self, ds: Dataset, column: str, descending: bool) -> np.ndarray:
+        """Sort the rows of the dataset_split with a stable sort on a column.
+
+        Args:
+            ds: Dataset split, with the prediction table if the column comes from it.
+            column: Column to sort by.
+            descending: Whether to sort from the largest value.
+
+        Returns:
+            row_idx of all rows, in the sort order.
+        """
+        if column == DatasetColumn.row_idx:
+            row_indices = np.arange(len(ds))
+            return row_indices[::-1].copy() if descending else row_indices
+        values = get_arrow_column(ds, column).combine_chunks()
+        if pa.types.is_list(values.type) or pa.types.is_fixed_size_list(values.type):
+            values = pa.array(get_array_from_ds(ds, column)[:, 0])
+        if column in self.classification_columns:
+            # Equal names get the same rank, such as a rejection class both in the classes and last.
+            class_names = self._get_class_names_lookup().astype(str)
+            _, name_ranks = np.unique(class_names, return_inverse=True)
+            values = pa.array(name_ranks[values.to_numpy().astype(np.int64)])
+        return cast(
+            np.ndarray,
+            pc.array_sort_indices(
+                values, order="descending" if descending else "ascending"
+            ).to_numpy(),
         )
 
+    def decode_class_names(self, ds: Dataset) -> Dataset:
+        """Replace class ids by their names in the rows of a dataset.
+
+        Only the rows of `ds` are decoded, so selecting the rows first keeps it cheap.
+
+        Args:
+            ds: Rows of the dataset_split, with or without predictions.
+
+        Returns:
+            Rows of `ds`, with class indices replaced by their names.
+        """
+        table = self._decode_class_columns(get_arrow_table(ds))
+        class_columns = {c for c in self.classification_columns if c in table.column_names}
+        inferred_features = datasets.Features.from_arrow_schema(table.schema)
+        features = datasets.Features(
+            {
+                column: inferred_features[column] if column in class_columns else feature
+                for column, feature in ds.features.items()
+            }
+        )
+        return Dataset(
+            table,
+            info=datasets.DatasetInfo(features=features),
+            fingerprint=f"{ds._fingerprint}_class_names",
+        )
+
+    def get_rows(
+        self,
+        row_indices: Sequence[int],
+        table_key: Optional[PredictionTableKey] = None,
+        with_class_names: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Get a few rows of the dataset_split, gathered from each table at once.
+
+        The rows are gathered from the base dataset_split and from the prediction table, without
+        concatenating the whole tables. The cost is proportional to the number of rows.
+
+        Args:
+            row_indices: row_idx of the rows to get.
+            table_key: If provided, which prediction table to join.
+            with_class_names: Whether to replace class ids by their names.
+
+        Returns:
+            Rows, as dicts from column to value.
+        """
+        indices = np.asarray(row_indices, dtype=np.int64)
+        tables = [get_arrow_table(self.get_dataset_split(), indices)]
+        if table_key is not None:
+            tables.append(get_arrow_table(self._get_prediction_table(table_key), indices))
+        table = pa.Table.from_arrays(
+            [column for table in tables for column in table.columns],
+            names=[name for table in tables for name in table.column_names],
+        )
+        if with_class_names:
+            table = self._decode_class_columns(table)
+        return cast(List[Dict[str, Any]], table.to_pylist())
+
+    def _decode_class_columns(self, table: pa.Table) -> pa.Table:
+        """Replace class ids by their names in the classification columns of a table.
+
+        Args:
+            table: Rows of the dataset_split.
+
+        Returns:
+            Table with class names, without the features in its metadata.
+        """
+        class_names = self._get_class_names_lookup()
+        for column in self.classification_columns:
+            if column in table.column_names:
+                idx = table.column_names.index(column)
+                array = table.column(idx).combine_chunks()
+                table = table.set_column(idx, column, class_ids_to_names(array, class_names))
+        # The features in the metadata would still have class ids.
+        return table.replace_schema_metadata()
+
+    def _get_class_names_lookup(self) -> np.ndarray:
+        # Not using self.dataset_split.features["label"].int2str() as it throws on -1,
+        # which is possible in postprocessed_prediction if a rejection class is missing.
+        return np.array(
+            [*self.get_class_names(), self.config.rejection_class or REJECTION_CLASS],
+            dtype=object,
+        )  # so class_names[-1] returns "REJECTION_CLASS"
+
+    def get_export_filename(self, export_format: ExportFormat = ExportFormat.csv) -> str:
+        file_label = time.strftime("%Y%m%d_%H%M%S", time.localtime())
+        return f"azimuth_export_{self.config.name}_{self.name}_{file_label}.{export_format.value}"
+
+    def iter_export(
+        self,
+        table_key: Optional[PredictionTableKey] = None,
+        export_format: ExportFormat = ExportFormat.csv,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """Export the dataset_split with class names, chunk by chunk.
+
+        Only a chunk of rows is converted at a time, so the memory used doesn't grow with the
+        size of the dataset_split.
+
+        Args:
+            table_key: If provided, which prediction table to select.
+            export_format: Format of the file.
+            chunk_size: Number of rows to convert at once.
+
+        Returns:
+            Content of the file, chunk by chunk.
+        """
+        ds = self.get_dataset_split(table_key)
         order = [
             DatasetColumn.row_idx,
             self.config.columns.persistent_id,
@@ -252,7 +532,7 @@ class DatasetSplitManager:
             DatasetColumn.neighbors_eval,
             *self._tags,
         ]
-        available_columns = self.get_dataset_split(table_key).column_names
+        available_columns = ds.column_names
         order = [c for c in order if c in available_columns]
 
         # This *available_columns allows for new or extra columns to end up here automatically,
@@ -260,11 +540,39 @@ class DatasetSplitManager:
         # The dict.fromkeys() avoids duplicates.
         columns = list(dict.fromkeys([*order, *available_columns]))
 
-        # pd.to_csv() instead of HF version to avoid unintended type conversions (list to array)
-        df = pd.DataFrame(self.get_dataset_split_with_class_names(table_key)).reindex(
-            columns=columns
-        )
-        df.to_csv(path_or_buf=pt, index=False)
+        class_names = self._get_class_names_lookup()
+        arrow_columns = [get_arrow_column(ds, column) for column in columns]
+
+        def make_tables() -> Iterator[pa.Table]:
+            for start in range(0, max(len(ds), 1), chunk_size):
+                chunk = [array.slice(start, chunk_size).combine_chunks() for array in arrow_columns]
+                yield pa.Table.from_arrays(
+                    [
+                        class_ids_to_names(array, class_names)
+                        if column in self.classification_columns
+                        else array
+                        for column, array in zip(columns, chunk)
+                    ],
+                    names=columns,
+                )
+
+        return iter_export_bytes(make_tables(), export_format)
+
+    def save_csv(self, table_key=None, export_format: ExportFormat = ExportFormat.csv) -> str:
+        """Save the dataset_split and return the path.
+
+        Args:
+            table_key: If provided, which prediction table to select.
+            export_format: Format of the file, CSV by default.
+
+        Returns:
+            Local path to the file.
+        """
+        log.info("Saving dataset_split as csv.", path=self._project_path)
+        pt = pjoin(self._project_path, self.get_export_filename(export_format))
+        with open(pt, "wb") as f:
+            for content in self.iter_export(table_key, export_format):
+                f.write(content)
 
         log.info("Dataset saved as CSV.", path=pt)
         return pt
@@ -277,6 +585,50 @@ class DatasetSplitManager:
         )
         return dataset_split
 
+    def get_utterance_index(self) -> UtteranceIndex:
+        """Get the index to search utterances, built the first time it is requested.
+
+        Utterances, row_idx and persistent ids are never modified in the base dataset_split, so the
+        index stays valid when tags or columns are added.
+
+        Returns:
+            Index of the utterances in the base dataset_split.
+        """
+        if self._utterance_index is None:
+            ds = self._base_dataset_split
+            self._utterance_index = UtteranceIndex(
+                ds[self.config.columns.text_input],
+                row_indices=ds[DatasetColumn.row_idx],
+                persistent_ids=ds[self.config.columns.persistent_id],
+            )
+        return self._utterance_index
+
+    def get_linguistic_analysis(self, spacy_model: str) -> pa.Table:
+        """Get the linguistic analysis of the utterances, computed the first time it is requested.
+
+        The analysis is saved next to the base dataset_split, so that it is computed once for all
+        modules and processes. As for the utterance index, it stays valid when tags or columns are
+        added since utterances are never modified.
+
+        Args:
+            spacy_model: Name of the spaCy model used to tokenize and parse.
+
+        Returns:
+            Analysis of each utterance, ordered by row_idx. See `analyze_utterances`.
+        """
+        if spacy_model not in self._linguistic_analyses:
+            path = pjoin(self._base_dataset_path, f"linguistic_analysis_{spacy_model}.parquet")
+            # Not the lock of the dataset_split, which is needed to save tags in the meantime.
+            with FileLock(f"{path}.lock"):
+                if not os.path.exists(path):
+                    analysis = analyze_utterances(
+                        self._base_dataset_split[self.config.columns.text_input], spacy_model
+                    )
+                    pq.write_table(analysis, f"{path}.tmp")
+                    os.replace(f"{path}.tmp", path)
+            self._linguistic_analyses[spacy_model] = pq.read_table(path, memory_map=True)
+        return self._linguistic_analyses[spacy_model]
+
     def get_row_indices_from_persistent_id(self, persistent_ids: List[Union[int, str]]):
         ds = self.get_dataset_split()
         all_persistent_ids = ds[self.config.columns.persistent_id]
@@ -313,7 +665,13 @@ class DatasetSplitManager:
             self._base_dataset_split = self._base_dataset_split.map(
                 lambda u, i: base_tags[i], with_indices=True, desc="Set base tag"
             )
-            self._save_base_dataset_split()
+            self._save_base_dataset_split(
+                data_actions_only=all(
+                    tag in ALL_DATA_ACTIONS
+                    for tag_values in base_tags.values()
+                    for tag in tag_values
+                )
+            )
 
         # Process prediction tags
         if table_key:
@@ -324,6 +682,46 @@ class DatasetSplitManager:
             )
             self.save_prediction_table(non_null_table_key)
 
+    def get_data_action_statistics(
+        self, table_key: PredictionTableKey, without_postprocessing: bool = False
+    ) -> GroupStatistics:
+        """Get the statistics of the predictions of each data action, including NO_ACTION.
+
+        The statistics are kept between calls. If only data action tags changed since the last
+        call, only the rows whose data actions changed are updated. Any other change recomputes
+        them.
+
+        Args:
+            table_key: Which pipeline to gather predictions from.
+            without_postprocessing: Whether to use predictions without postprocessing.
+
+        Returns:
+            Statistics of each data action, in the order of ALL_DATA_ACTION_FILTERS.
+        """
+        ds = self.get_dataset_split(table_key)
+        memberships = get_data_action_memberships(ds)
+        last_update = self.last_update_excluding_data_actions
+        cached = self._data_action_statistics.get((table_key, without_postprocessing))
+        if cached is not None and cached[0] == last_update:
+            statistics = cached[1]
+            statistics.update_memberships(memberships)
+        else:
+            statistics = GroupStatistics(
+                labels=get_column_from_ds(ds, self.config.columns.label),
+                predictions=np.array(get_predictions_from_ds(ds, without_postprocessing)),
+                outcome_codes=get_outcome_codes_from_ds(ds, without_postprocessing),
+                confidences=get_confidences_from_ds(ds, without_postprocessing).max(axis=1)
+                if len(ds) > 0
+                else np.empty(0),
+                memberships=memberships,
+                num_classes=self.get_num_classes(),
+            )
+            self._data_action_statistics[(table_key, without_postprocessing)] = (
+                last_update,
+                statistics,
+            )
+        return statistics
+
     def get_tags(
         self, indices: Optional[List[int]] = None, table_key: Optional[PredictionTableKey] = None
     ) -> Dict[int, Dict[Tag, bool]]:
@@ -554,6 +952,57 @@ class DatasetSplitManager:
         self._prediction_tables[table_key] = ds
         self.save_prediction_table(table_key)
 
+    def add_array_to_prediction_table(
+        self, key: str, array: np.ndarray, table_key: PredictionTableKey
+    ):
+        """
+        Add a fixed-width column to the prediction table.
+
+        Notes:
+            The column is stored as an Arrow FixedSizeList, so that it can be read back with
+            `get_prediction_array` without converting each row to a Python list.
+
+        Args:
+            key: Name of the column
+            array: Array of shape [num_rows, width].
+            table_key: Key to the prediction table.
+
+        Raises:
+            ValueError if the array doesn't match the dataset length.
+
+        """
+        ds = self._get_prediction_table(table_key=table_key)
+        if array.ndim != 2 or len(array) != len(ds):
+            raise ValueError(
+                f"Can't add an array of shape {array.shape} in a dataset of {len(ds)} rows."
+            )
+        feature = datasets.Sequence(datasets.Value(str(array.dtype)), length=array.shape[1])
+        features = datasets.Features({**ds.features, key: feature})
+        ds = ds.map(
+            lambda _, indices: {key: array[indices].tolist()},
+            with_indices=True,
+            batched=True,
+            features=features,
+            desc=f"Add column {key}",
+        )
+        self._prediction_tables[table_key] = ds
+        self.save_prediction_table(table_key)
+
+    def get_prediction_array(self, key: str, table_key: PredictionTableKey) -> np.ndarray:
+        """Get a column of the prediction table as an array of shape [num_rows, width].
+
+        Notes:
+            The array is a read-only view on the Arrow buffer when possible.
+
+        Args:
+            key: Name of the column, such as `DatasetColumn.model_confidences`.
+            table_key: Key to the prediction table.
+
+        Returns:
+            Array with one row per utterance.
+        """
+        return get_array_from_ds(self._get_prediction_table(table_key=table_key), key)
+
     def _split_malformed(self, dataset: Dataset) -> Tuple[Dataset, Dataset]:
         # Split dataset between malformed and correctly formed.
         malformed = dataset.filter(
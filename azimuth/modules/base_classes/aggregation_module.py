@@ -2,13 +2,16 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 from abc import ABC
-from typing import List
+from typing import List, Optional
 
 from datasets import Dataset
 
 from azimuth.modules.base_classes import ConfigScope, ExpirableMixin, Module
-from azimuth.types import DatasetSplitName, ModuleResponse
+from azimuth.types import DatasetFilters, DatasetSplitName, ModuleResponse
+from azimuth.types.tag import ALL_DATA_ACTION_FILTERS
 from azimuth.utils.dataset_operations import filter_dataset_split
+from azimuth.utils.ml.group_statistics import GroupStatistics
+from azimuth.utils.validation import assert_not_none
 
 
 class AggregationModule(Module[ConfigScope], ABC):
@@ -49,4 +52,34 @@ class FilterableModule(AggregationModule[ConfigScope], ExpirableMixin, ABC):
             filters=self.mod_options.filters,
             config=self.config,
             without_postprocessing=self.mod_options.without_postprocessing,
+            utterance_index=self.get_dataset_split_manager(name).get_utterance_index()
+            if self.mod_options.filters.utterance is not None
+            else None,
         )
+
+    def get_data_action_statistics(self) -> GroupStatistics:
+        """Get the statistics of each data action on the whole dataset split.
+
+        The statistics are updated incrementally when data action tags change, so they are cheap
+        to get again after a user tags a few utterances.
+
+        Returns:
+            Statistics of each data action, in the order of ALL_DATA_ACTION_FILTERS.
+        """
+        return self.get_dataset_split_manager().get_data_action_statistics(
+            assert_not_none(self._get_table_key()), self.mod_options.without_postprocessing
+        )
+
+    def get_data_action_filter_index(self) -> Optional[int]:
+        """Get the data action selected by the filters, if it is the only filter.
+
+        Returns:
+            Index of the data action in ALL_DATA_ACTION_FILTERS, None if the filters select
+                anything else than a single data action.
+        """
+        data_actions = self.mod_options.filters.data_action
+        if len(data_actions) != 1 or self.mod_options.filters != DatasetFilters(
+            data_action=data_actions
+        ):
+            return None
+        return ALL_DATA_ACTION_FILTERS.index(data_actions[0])
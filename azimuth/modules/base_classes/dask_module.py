@@ -119,6 +119,7 @@ class DaskModule(HDF5CacheMixin, Generic[ConfigScope]):
         if not all(deps):
             raise ValueError("Can't wait for an unstarted Module.")
         self.done_event = Event(name=self.task_id, client=client)
+        self._time = time.time()
         # pure=false to be sure that everything is rerun.
         self.future = client.submit(
             self._compute_on_dataset_split_with_deps,
@@ -2,6 +2,9 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 import abc
+from typing import Optional
+
+from azimuth.types import ModuleOptions
 
 
 class ExpirableMixin(abc.ABC):
@@ -14,7 +17,26 @@ class ExpirableMixin(abc.ABC):
     """
 
     _time: float
+    mod_options: ModuleOptions
+
+    @property
+    def depends_on_data_actions(self) -> bool:
+        # By default, data action tags only affect the results through the filters.
+        return len(self.mod_options.filters.data_action) > 0
+
+    def is_expired(
+        self, compared_to: float, compared_to_excluding_data_actions: Optional[float] = None
+    ):
+        """Check if this Module results are expired.
+
+        Args:
+            compared_to: Last update of the dataset split.
+            compared_to_excluding_data_actions: Last update of the dataset split, ignoring updates
+                where only data actions changed. Used when the results don't depend on them.
 
-    def is_expired(self, compared_to: float):
-        # Check if this Module results are expired.
+        Returns:
+            Whether the results were computed before the relevant last update.
+        """
+        if compared_to_excluding_data_actions is not None and not self.depends_on_data_actions:
+            return self._time < compared_to_excluding_data_actions
         return self._time < compared_to
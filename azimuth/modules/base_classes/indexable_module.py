@@ -22,6 +22,7 @@ from azimuth.types import (
 )
 from azimuth.types.tag import SmartTag
 from azimuth.types.task import PredictionResponse, SaliencyResponse
+from azimuth.utils.ml.batching import make_batches
 from azimuth.utils.ml.model_performance import compute_outcome
 from azimuth.utils.ml.postprocessing import (
     PostProcessingIO,
@@ -85,6 +86,29 @@ class ModelContractModule(DatasetResultModule[ModelContractConfig], abc.ABC):
             res: List[ModuleResponse] = my_func(batch)
         return res
 
+    def get_batches(self, ds: Dataset) -> List[List[int]]:
+        """Split the dataset_split in batches according to `config.batching_strategy`.
+
+        Only methods that run the model benefit from grouping utterances of similar lengths, as
+        each batch is padded to its longest utterance.
+
+        Args:
+            ds: Dataset split to split in batches.
+
+        Returns:
+            Row positions in `ds` for each batch.
+        """
+        if self.model_contract_method_name not in {
+            SupportedMethod.Predictions,
+            SupportedMethod.Saliency,
+        }:
+            return super().get_batches(ds)
+        return make_batches(
+            lengths=[len(utterance) for utterance in ds[self.config.columns.text_input]],
+            batch_size=self.config.batch_size,
+            strategy=self.config.batching_strategy,
+        )
+
     def route_request(self, method_name: SupportedMethod) -> Callable:
         """Route the method_name to the correct fn.
 
@@ -173,19 +197,19 @@ class ModelContractModule(DatasetResultModule[ModelContractConfig], abc.ABC):
             table_key = self._get_table_key()
             class_names = dm.get_class_names()
             res_casted = cast(List[PredictionResponse], res)
-            dm.add_column_to_prediction_table(
+            model_probs = np.concatenate([pred_res.model_output.probs for pred_res in res_casted])
+            postprocessed_probs = np.concatenate(
+                [pred_res.postprocessed_output.probs for pred_res in res_casted]
+            )
+            # Classes and confidences are sorted by decreasing confidence.
+            dm.add_array_to_prediction_table(
                 key=DatasetColumn.model_predictions,
-                features=[
-                    list(np.argsort(pred_res.model_output.probs[0])[::-1])
-                    for pred_res in res_casted
-                ],
+                array=np.argsort(model_probs, axis=1)[:, ::-1],
                 table_key=table_key,
             )
-            dm.add_column_to_prediction_table(
+            dm.add_array_to_prediction_table(
                 key=DatasetColumn.model_confidences,
-                features=[
-                    list(np.sort(pred_res.model_output.probs[0])[::-1]) for pred_res in res_casted
-                ],
+                array=np.sort(model_probs, axis=1)[:, ::-1],
                 table_key=table_key,
             )
             dm.add_column_to_prediction_table(
@@ -193,12 +217,9 @@ class ModelContractModule(DatasetResultModule[ModelContractConfig], abc.ABC):
                 features=[int(pred_res.postprocessed_output.preds[0]) for pred_res in res_casted],
                 table_key=table_key,
             ),
-            dm.add_column_to_prediction_table(
+            dm.add_array_to_prediction_table(
                 key=DatasetColumn.postprocessed_confidences,
-                features=[
-                    list(np.sort(pred_res.postprocessed_output.probs[0])[::-1])
-                    for pred_res in res_casted
-                ],
+                array=np.sort(postprocessed_probs, axis=1)[:, ::-1],
                 table_key=table_key,
             )
             dm.add_column_to_prediction_table(
@@ -1,7 +1,7 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from typing import List, Optional, Set, cast
+from typing import Dict, List, Optional, Set, cast
 
 import numpy as np
 from datasets import Dataset
@@ -15,6 +15,7 @@ from azimuth.types import DatasetColumn, DatasetSplitName, ModuleOptions, Module
 from azimuth.types.general.module_arguments import ModuleEffectiveArguments
 from azimuth.utils.conversion import md5_hash
 from azimuth.utils.exclude_fields_from_cache import exclude_fields_from_cache
+from azimuth.utils.ml.batching import make_batches
 from azimuth.utils.validation import assert_not_none
 
 
@@ -92,18 +93,28 @@ class Module(DaskModule[ConfigScope]):
     def compute_on_dataset_split(self) -> List[ModuleResponse]:
         """Method that iterates over a dataset_split and call `compute`"""
         ds: Dataset = self.get_dataset_split()
-        batch_size = self.config.batch_size
-        num_rows = list(range(len(ds)))
-        batches = [num_rows[i : i + batch_size] for i in range(0, len(ds), batch_size)]
+        batches = self.get_batches(ds)
 
-        result = []
+        # Batches are not always contiguous, so results are put back in the dataset_split order.
+        result_per_row: Dict[int, ModuleResponse] = {}
         for batch in tqdm(
             batches,
             desc=f"{self.task_name} on {self.dataset_split_name} set "
             f"for pipeline {self.mod_options.pipeline_index}",
         ):
-            result += self.compute(ds.select(batch))
-        return result
+            result_per_row.update(zip(batch, self.compute(ds.select(batch))))
+        return [result_per_row[row] for row in range(len(ds))]
+
+    def get_batches(self, ds: Dataset) -> List[List[int]]:
+        """Split the dataset_split in batches of contiguous rows.
+
+        Args:
+            ds: Dataset split to split in batches.
+
+        Returns:
+            Row positions in `ds` for each batch.
+        """
+        return make_batches(lengths=[0] * len(ds), batch_size=self.config.batch_size)
 
     def compute(self, batch: Dataset) -> List[ModuleResponse]:
         raise NotImplementedError
@@ -4,9 +4,9 @@
 import itertools
 from typing import Dict, List, cast
 
-import spacy
+import numpy as np
+import pyarrow as pa
 from datasets import Dataset
-from spacy.lang.en import English
 
 from azimuth.config import SyntaxConfig, SyntaxOptions
 from azimuth.dataset_split_manager import DatasetSplitManager
@@ -19,18 +19,33 @@ from azimuth.types.tag import (
     Tag,
     TaggingResponse,
 )
-from azimuth.utils.utterance import clean_utterance
+from azimuth.utils.ml.linguistic_analysis import (
+    analyze_utterances,
+    flatten_token_column,
+    get_token_row_indices,
+)
 from azimuth.utils.validation import assert_not_none
 
 
 class SyntaxTaggingModule(DatasetResultModule[SyntaxConfig]):
     """Calculate smart tags related to syntax."""
 
-    spacy_sentencizer_en = English()
-    spacy_sentencizer_en.add_pipe("sentencizer")
     # we use pos_ for verb since it is simpler and more reliable than dep_
     verb_tags = ["VERB", "AUX"]
 
+    def compute_on_dataset_split(self) -> List[TaggingResponse]:  # type: ignore
+        """Get smart tags from the linguistic analysis of the dataset_split.
+
+        The analysis is computed once per dataset_split and shared with other modules.
+
+        Returns:
+            tags: Newly calculated tags.
+        """
+        syntax_options: SyntaxOptions = assert_not_none(self.config.syntax)
+        dm = self.get_dataset_split_manager()
+        analysis = dm.get_linguistic_analysis(syntax_options.spacy_model)
+        return self._get_tagging_responses(analysis.take(self.get_indices()))
+
     def compute(self, batch: Dataset) -> List[TaggingResponse]:  # type: ignore
         """Get smart tags for provided indices.
 
@@ -42,45 +57,56 @@ class SyntaxTaggingModule(DatasetResultModule[SyntaxConfig]):
 
         """
         syntax_options: SyntaxOptions = assert_not_none(self.config.syntax)
-        spacy_model = spacy.load(syntax_options.spacy_model)
+        analysis = analyze_utterances(
+            batch[self.config.columns.text_input], syntax_options.spacy_model
+        )
+        return self._get_tagging_responses(analysis)
 
-        utterances = batch[self.config.columns.text_input]
-        records: List[TaggingResponse] = []
+    def _get_tagging_responses(self, analysis: pa.Table) -> List[TaggingResponse]:
+        """Get smart tags from the linguistic analysis of utterances.
 
-        for utterance in utterances:
+        Args:
+            analysis: Linguistic analysis of each utterance.
+
+        Returns:
+            Smart tags and word count of each utterance.
+        """
+        syntax_options: SyntaxOptions = assert_not_none(self.config.syntax)
+        num_rows = analysis.num_rows
+        token_rows = get_token_row_indices(analysis)
+
+        def count_per_row(token_mask: np.ndarray) -> np.ndarray:
+            return np.bincount(token_rows[token_mask], minlength=num_rows)
+
+        # Remove punctuation for word count and smart tags
+        word_counts = count_per_row(~flatten_token_column(analysis, "is_punct"))
+        dep = flatten_token_column(analysis, "dep")
+        subj_counts = count_per_row(np.isin(dep, syntax_options.subj_tags))
+        obj_counts = count_per_row(np.isin(dep, syntax_options.obj_tags))
+        verb_counts = count_per_row(np.isin(flatten_token_column(analysis, "pos"), self.verb_tags))
+        sentence_counts = analysis.column("sentence_count").to_numpy()
+
+        records: List[TaggingResponse] = []
+        for word_count, subj_count, obj_count, verb_count, sentence_count in zip(
+            word_counts.tolist(),
+            subj_counts.tolist(),
+            obj_counts.tolist(),
+            verb_counts.tolist(),
+            sentence_counts.tolist(),
+        ):
             tag: Dict[Tag, bool] = {
                 smart_tag: False
                 for family in [SmartTagFamily.extreme_length, SmartTagFamily.partial_syntax]
                 for smart_tag in SMART_TAGS_FAMILY_MAPPING[family]
             }
-
-            doc = spacy_model(clean_utterance(utterance))
-            # Remove punctuation for word count and smart tags
-            tokens = [token.text for token in doc if not token.is_punct]
-
-            if len(tokens) >= syntax_options.long_utterance_min_word:
-                tag[SmartTag.long] = True
-            if len(tokens) <= syntax_options.short_utterance_max_word:
-                tag[SmartTag.short] = True
-
-            sub_toks = [tok for tok in doc if (tok.dep_ in syntax_options.subj_tags)]
-            obj_toks = [tok for tok in doc if (tok.dep_ in syntax_options.obj_tags)]
-            vrb_toks = [tok for tok in doc if (tok.pos_ in self.verb_tags)]
-            if not sub_toks:
-                tag[SmartTag.no_subj] = True
-            if not obj_toks:
-                tag[SmartTag.no_obj] = True
-            if not vrb_toks:
-                tag[SmartTag.no_verb] = True
-
-            # Some issues occur with other languages such as french if using doc.sents directly.
-            # Hence, we use an English sentencizer that seems to work better for similar languages.
-            doc_sentencizer_en = self.spacy_sentencizer_en(clean_utterance(utterance))
-            sentence_count = len(list(doc_sentencizer_en.sents))
-            if sentence_count > 1:
-                tag[SmartTag.multi_sent] = True
-
-            adds = {DatasetColumn.word_count: len(tokens)}
+            tag[SmartTag.long] = word_count >= syntax_options.long_utterance_min_word
+            tag[SmartTag.short] = word_count <= syntax_options.short_utterance_max_word
+            tag[SmartTag.no_subj] = subj_count == 0
+            tag[SmartTag.no_obj] = obj_count == 0
+            tag[SmartTag.no_verb] = verb_count == 0
+            tag[SmartTag.multi_sent] = sentence_count > 1
+
+            adds = {DatasetColumn.word_count: word_count}
             records.append(TaggingResponse(tags=tag, adds=adds))
 
         return records
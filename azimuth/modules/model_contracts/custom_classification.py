@@ -39,7 +39,7 @@ class CustomTextClassificationModule(TextClassificationNoSaliencyModule):
         epistemic = [0.0] * len(utterances)  # dummy epistemic
 
         model_or_custom_pipeline: Callable = self.get_model()
-        predictions = model_or_custom_pipeline(utterances)
+        predictions = self.get_model_probs(utterances, model_or_custom_pipeline)
         (
             raw,
             postprocessed,
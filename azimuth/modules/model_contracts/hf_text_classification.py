@@ -2,14 +2,16 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 
-from typing import List, Optional, Set
+from typing import List, Optional, Set, cast
 
 import numpy as np
 import structlog
 import torch
 from datasets import Dataset
+from scipy.special import expit, softmax
+from transformers import TextClassificationPipeline
 
-from azimuth.config import ModelContractConfig
+from azimuth.config import BatchingStrategy, ModelContractConfig
 from azimuth.modules.model_contracts.text_classification import TextClassificationModule
 from azimuth.types import DatasetSplitName, ModuleOptions
 from azimuth.types.general.module_arguments import GradientCalculation
@@ -26,6 +28,8 @@ log = structlog.get_logger(__file__)
 EPSILON = 1e-6
 
 ITERATIONS = 100
+# Fused MC Dropout forward passes hold up to this many times `batch_size` rows.
+BMA_FUSED_BATCH_FACTOR = 4
 
 
 class HFTextClassificationModule(TextClassificationModule):
@@ -72,28 +76,36 @@ class HFTextClassificationModule(TextClassificationModule):
             from baal.active.heuristics import BALD
 
             with MCDropout(hf_pipeline.model):
-                n = self.config.uncertainty.iterations
-                n_predictions = np.stack(
-                    [
-                        self.extract_probs_from_output(
-                            hf_pipeline(
-                                utterances,
-                                num_workers=0,
-                                batch_size=self.config.batch_size,
-                                truncation=True,
+                if isinstance(hf_pipeline, TextClassificationPipeline):
+                    n_predictions = self._get_fused_mc_dropout_probs(hf_pipeline, utterances)
+                else:
+                    n_predictions = np.stack(
+                        [
+                            self.extract_probs_from_output(
+                                hf_pipeline(
+                                    utterances,
+                                    num_workers=0,
+                                    batch_size=self._get_pipeline_batch_size(len(utterances)),
+                                    truncation=True,
+                                )
                             )
-                        )
-                        for _ in range(n)
-                    ],
-                    axis=-1,
-                )
+                            for _ in range(self.config.uncertainty.iterations)
+                        ],
+                        axis=-1,
+                    )
                 epistemic: List[float] = BALD().get_uncertainties(n_predictions)
                 predictions = n_predictions.mean(-1)
 
         else:
             epistemic = [0.0] * len(utterances)
-            predictions = hf_pipeline(
-                utterances, num_workers=0, batch_size=self.config.batch_size, truncation=True
+            predictions = self.get_model_probs(
+                utterances,
+                lambda texts: hf_pipeline(
+                    texts,
+                    num_workers=0,
+                    batch_size=self._get_pipeline_batch_size(len(texts)),
+                    truncation=True,
+                ),
             )
         (
             model_output,
@@ -111,6 +123,93 @@ class HFTextClassificationModule(TextClassificationModule):
             epistemic,
         )
 
+    def _get_pipeline_batch_size(self, num_rows: int) -> int:
+        """Get the batch size of the pipeline for a batch of utterances.
+
+        With length-aware strategies, the batches made by `get_batches` are the forward passes, so
+        the pipeline must not split them again in chunks of `batch_size` rows.
+
+        Args:
+            num_rows: Number of utterances given to the pipeline.
+
+        Returns:
+            Number of utterances per forward pass.
+        """
+        if self.config.batching_strategy == BatchingStrategy.contiguous:
+            return self.config.batch_size
+        return max(num_rows, 1)
+
+    def _get_fused_mc_dropout_probs(
+        self, hf_pipeline: TextClassificationPipeline, utterances: List[str]
+    ) -> np.ndarray:
+        """Get the probabilities of all MC Dropout iterations with few forward passes.
+
+        Utterances are tokenized once and replicated along the batch dimension, so that many
+        iterations run in the same forward pass. Each row gets its own dropout mask, which makes
+        it equivalent to running the pipeline once per iteration.
+
+        Args:
+            hf_pipeline: Pipeline, with its dropout layers already patched.
+            utterances: Utterances to predict on.
+
+        Returns:
+            Probabilities of shape [len(utterances), num_classes, iterations].
+        """
+        iterations = self.config.uncertainty.iterations
+        num_rows = len(utterances)
+        tokenizer = hf_pipeline.tokenizer
+        if tokenizer is None:
+            raise ValueError("The pipeline has no tokenizer to replicate the inputs.")
+        inputs = tokenizer(utterances, return_tensors="pt", padding=True, truncation=True).to(
+            hf_pipeline.device
+        )
+        iterations_per_pass = max(1, self.config.batch_size * BMA_FUSED_BATCH_FACTOR // num_rows)
+
+        logits = []
+        with torch.no_grad():
+            for start in range(0, iterations, iterations_per_pass):
+                replicas = min(iterations_per_pass, iterations - start)
+                fused_inputs = {k: v.repeat(replicas, 1) for k, v in inputs.items()}
+                logits.append(hf_pipeline.model(**fused_inputs)[0].cpu())
+        # Rows are grouped by iteration: [iteration, row, class].
+        all_logits = torch.cat(logits).view(iterations, num_rows, -1)
+
+        probs = self._apply_classification_function(hf_pipeline, all_logits.numpy())
+        return np.transpose(probs, (1, 2, 0))
+
+    @staticmethod
+    def _apply_classification_function(
+        hf_pipeline: TextClassificationPipeline, logits: np.ndarray
+    ) -> np.ndarray:
+        """Convert logits to scores as the pipeline does, from the config of its model.
+
+        Args:
+            hf_pipeline: Pipeline which computed the logits.
+            logits: Logits, with classes on the last axis.
+
+        Returns:
+            Scores of the same shape as `logits`.
+        """
+        model_config = hf_pipeline.model.config
+        if (
+            model_config.problem_type == "multi_label_classification"
+            or model_config.num_labels == 1
+        ):
+            function_to_apply = "sigmoid"
+        elif (
+            model_config.problem_type == "single_label_classification"
+            or model_config.num_labels > 1
+        ):
+            function_to_apply = "softmax"
+        else:
+            function_to_apply = str(getattr(model_config, "function_to_apply", "none")).lower()
+
+        if function_to_apply == "sigmoid":
+            return cast(np.ndarray, expit(logits))
+        if function_to_apply == "softmax":
+            return cast(np.ndarray, softmax(logits, -1))
+        return logits
+
     def saliency(self, batch: Dataset) -> List[SaliencyResponse]:
         """Get saliency maps for a batch of utterances using InputXGrad.
 
@@ -2,7 +2,20 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 import abc
-from typing import Any, Dict, List, Protocol, Tuple, Union, cast, runtime_checkable
+import os
+from os.path import join as pjoin
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+    cast,
+    runtime_checkable,
+)
 
 import numpy as np
 import tensorflow
@@ -17,7 +30,9 @@ from azimuth.modules.base_classes import ModelContractModule
 from azimuth.modules.task_execution import get_task_result
 from azimuth.types import DatasetColumn, InputResponse, ModuleOptions, SupportedMethod
 from azimuth.types.task import PredictionResponse, SaliencyResponse
+from azimuth.utils.conversion import md5_hash
 from azimuth.utils.ml.postprocessing import PostProcessingIO, PostprocessingStep
+from azimuth.utils.ml.prediction_cache import PredictionCache, get_prediction_cache
 from azimuth.utils.ml.preprocessing import PreprocessingStep
 from azimuth.utils.project import postprocessing_editable
 
@@ -102,33 +117,11 @@ class TextClassificationModule(ModelContractModule, abc.ABC):
             Predictions, with the updated postprocess values.
 
         """
-        # Get cached predictions
-        predictions_task = type(self)(
-            dataset_split_name=self.dataset_split_name,
-            config=self.config,
-            mod_options=ModuleOptions(
-                model_contract_method_name=SupportedMethod.Predictions,
-                pipeline_index=self.mod_options.pipeline_index,
-                use_bma=self.mod_options.use_bma,
-                indices=cast(List[int], batch[DatasetColumn.row_idx]),
-            ),
-        )
-        predictions = get_task_result(
-            task_module=predictions_task, result_type=List[PredictionResponse]
-        )
-
+        predictions = self.get_cached_predictions(batch)
         if not postprocessing_editable(self.config, pipeline_index=self.mod_options.pipeline_index):
             return predictions
 
-        # Reconstruct pipeline_out and all_epistemic
-        dm = self.get_dataset_split_manager()
-        pipeline_out = np.zeros(
-            (len(batch[DatasetColumn.row_idx]), dm.get_num_classes(labels_only=True))
-        )
-        epistemic_all = []
-        for idx, pred in enumerate(predictions):
-            pipeline_out[idx, :] = pred.model_output.probs
-            epistemic_all.append(pred.epistemic)
+        pipeline_out, epistemic_all = self.stack_probabilities(predictions)
 
         # Call post_processing and reconstruct product output
         (
@@ -146,6 +139,115 @@ class TextClassificationModule(ModelContractModule, abc.ABC):
             epistemic_all,
         )
 
+    def post_process_preds(self, batch: Dataset) -> Tuple[np.ndarray, np.ndarray]:
+        """Recompute post-processing on the whole batch at once, without building responses.
+
+        Same as `post_process`, but only the predicted classes are returned, which is what most
+        modules need. This avoids creating a `PredictionResponse` per utterance.
+
+        Args:
+            batch: batch of utterances
+
+        Returns:
+            Predicted classes, without and with postprocessing.
+
+        """
+        predictions = self.get_cached_predictions(batch)
+        if not postprocessing_editable(self.config, pipeline_index=self.mod_options.pipeline_index):
+            return (
+                np.array([pred.model_output.preds[0] for pred in predictions], dtype=int),
+                np.array([pred.postprocessed_output.preds[0] for pred in predictions], dtype=int),
+            )
+
+        probs, _ = self.stack_probabilities(predictions)
+        model_output, postprocessed_steps = self.postprocess_probs(
+            batch[self.config.columns.text_input], probs, threshold=self.get_threshold()
+        )
+        postprocessed_output = (
+            postprocessed_steps[-1].output if postprocessed_steps else model_output
+        )
+        return model_output.preds, postprocessed_output.preds
+
+    def get_cached_predictions(self, batch: Dataset) -> List[PredictionResponse]:
+        """Get the cached predictions from the model, without postprocessing changes.
+
+        Args:
+            batch: batch of utterances
+
+        Returns:
+            Predictions for the batch, as computed by the Predictions method.
+
+        """
+        predictions_task = type(self)(
+            dataset_split_name=self.dataset_split_name,
+            config=self.config,
+            mod_options=ModuleOptions(
+                model_contract_method_name=SupportedMethod.Predictions,
+                pipeline_index=self.mod_options.pipeline_index,
+                use_bma=self.mod_options.use_bma,
+                indices=cast(List[int], batch[DatasetColumn.row_idx]),
+            ),
+        )
+        return get_task_result(task_module=predictions_task, result_type=List[PredictionResponse])
+
+    def stack_probabilities(
+        self, predictions: List[PredictionResponse]
+    ) -> Tuple[np.ndarray, List[float]]:
+        """Stack the model probabilities of each prediction in a contiguous array.
+
+        Args:
+            predictions: Predictions for a batch of utterances.
+
+        Returns:
+            Probabilities of shape [N, num_classes] and epistemic uncertainty for each prediction.
+        """
+        num_classes = self.get_dataset_split_manager().get_num_classes(labels_only=True)
+        probs = np.array([pred.model_output.probs[0] for pred in predictions], dtype=float)
+        epistemic = [pred.epistemic for pred in predictions]
+        return probs.reshape(len(predictions), num_classes), epistemic
+
+    def get_prediction_cache(self) -> PredictionCache:
+        """Get the cache of model probabilities for the model of the pipeline.
+
+        Returns:
+            The prediction cache, identified by the hash of the model definition.
+        """
+        cache_dir = pjoin(self.config.get_project_path(), "PredictionCache")
+        os.makedirs(cache_dir, exist_ok=True)
+        model_hash = md5_hash(self.get_pipeline_definition().model.dict())
+        return get_prediction_cache(pjoin(cache_dir, f"{model_hash}.h5"))
+
+    def get_model_probs(
+        self, utterances: List[str], predict_fn: Callable[[List[str]], SupportedOutput]
+    ) -> SupportedOutput:
+        """Get the model probabilities, only running the model on utterances not in the cache.
+
+        Pipelines which return a `PipelineOutputProtocol` do their own postprocessing, so their
+        outputs are returned as is and never cached.
+
+        Args:
+            utterances: Utterances to predict on.
+            predict_fn: Run the model on utterances.
+
+        Returns:
+            Probabilities of shape [N, num_classes], or the output of `predict_fn`.
+        """
+        cache = self.get_prediction_cache()
+        cached_probs = cache.get(utterances)
+        missing = [idx for idx, probs in enumerate(cached_probs) if probs is None]
+        if not missing:
+            return np.stack(cast(List[np.ndarray], cached_probs))
+
+        predictions = predict_fn([utterances[idx] for idx in missing])
+        if isinstance(predictions, PipelineOutputProtocol):
+            # Nothing is cached for those pipelines, so all utterances were predicted.
+            return predictions
+        missing_probs = self.extract_probs_from_output(predictions)
+        cache.put([utterances[idx] for idx in missing], missing_probs)
+        for idx, probs in zip(missing, missing_probs):
+            cached_probs[idx] = probs
+        return np.stack(cast(List[np.ndarray], cached_probs))
+
     def extract_probs_from_output(self, model_out: Any) -> np.ndarray:
         """Extract probabilities from model output.
 
@@ -281,10 +383,29 @@ class TextClassificationModule(ModelContractModule, abc.ABC):
                 postprocessing_steps,
             )
 
-        rejection_class_idx = self.get_dataset_split_manager().rejection_class_idx
-        rejection_class_threshold = self.get_threshold()
-
         probs = self.extract_probs_from_output(model_output)
+        model_out_formatted, postprocessed_steps = self.postprocess_probs(
+            input_batch[self.config.columns.text_input], probs, threshold=self.get_threshold()
+        )
+        postprocessed_output = (
+            postprocessed_steps[-1].output if postprocessed_steps else model_out_formatted
+        )
+        # Preprocessing steps are not supported at the moment for HF pipelines
+        return model_out_formatted, postprocessed_output, [], postprocessed_steps
+
+    def postprocess_probs(
+        self, texts: List[str], probs: np.ndarray, threshold: Optional[float]
+    ) -> Tuple[PostProcessingIO, List[PostprocessingStep]]:
+        """Run the postprocessing steps on the probabilities of all utterances at once.
+
+        Args:
+            texts: Utterances.
+            probs: Model probabilities of shape [N, num_classes].
+            threshold: Threshold for the Thresholding step.
+
+        Returns:
+            Model output and postprocessing steps.
+        """
         logits = (
             np.log(probs + EPSILON)
             if np.allclose(probs.sum(-1), 1.0)
@@ -292,18 +413,14 @@ class TextClassificationModule(ModelContractModule, abc.ABC):
         )
 
         model_out_formatted = PostProcessingIO(
-            texts=input_batch[self.config.columns.text_input],
+            texts=texts,
             logits=logits,
             probs=probs,
             preds=np.argmax(probs, axis=-1),
         )
         postprocessed_steps = self.run_postprocessing(
             model_out_formatted,
-            threshold=rejection_class_threshold,
-            rejection_class_idx=rejection_class_idx,
+            threshold=threshold,
+            rejection_class_idx=self.get_dataset_split_manager().rejection_class_idx,
         )
-        postprocessed_output = (
-            postprocessed_steps[-1].output if postprocessed_steps else model_out_formatted
-        )
-        # Preprocessing steps are not supported at the moment for HF pipelines
-        return model_out_formatted, postprocessed_output, [], postprocessed_steps
+        return model_out_formatted, postprocessed_steps
@@ -1,8 +1,7 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from collections import defaultdict
-from typing import List, cast
+from typing import List
 
 import numpy as np
 from datasets import Dataset
@@ -12,24 +11,59 @@ from azimuth.dataset_split_manager import DatasetSplitManager
 from azimuth.modules.base_classes import DatasetResultModule, FilterableModule
 from azimuth.types import DatasetColumn
 from azimuth.types.model_performance import ConfidenceBinDetails, ConfidenceHistogramResponse
-from azimuth.types.outcomes import ALL_OUTCOMES, OutcomeName
-from azimuth.utils.dataset_operations import get_confidences_from_ds, get_outcomes_from_ds
+from azimuth.types.outcomes import ALL_OUTCOMES
+from azimuth.utils.dataset_operations import get_confidences_from_ds, get_outcome_codes_from_ds
+from azimuth.utils.ml.model_performance import (
+    CONFIDENCE_BINS_COUNT,
+    count_per_group,
+    get_confidence_bin_indices,
+)
 from azimuth.utils.validation import assert_not_none
 
-CONFIDENCE_BINS_COUNT = 20
-
 
 class ConfidenceHistogramModule(FilterableModule[ModelContractConfig]):
     """Return a confidence histogram of the predictions."""
 
     @staticmethod
-    def get_outcome_mask(
-        ds, outcome: OutcomeName, without_postprocessing: bool = False
-    ) -> List[bool]:
-        return [
-            utterance_outcome == outcome
-            for utterance_outcome in get_outcomes_from_ds(ds, without_postprocessing)
+    def bins_from_counts(
+        outcome_count_per_bin: np.ndarray, confidence_sum_per_bin: np.ndarray
+    ) -> List[ConfidenceBinDetails]:
+        """Make the bins from the outcome counts and the sum of the confidences in each bin.
+
+        Args:
+            outcome_count_per_bin: Count of each outcome, of shape
+                [CONFIDENCE_BINS_COUNT, len(ALL_OUTCOMES)].
+            confidence_sum_per_bin: Sum of the confidences in each bin.
+
+        Returns:
+            List of the confidence bins with their confidence and the outcome count.
+        """
+        bins = np.linspace(0, 1, CONFIDENCE_BINS_COUNT + 1)
+        count_per_bin = outcome_count_per_bin.sum(axis=1)
+        mean_confidence_per_bin = np.nan_to_num(
+            np.divide(
+                confidence_sum_per_bin,
+                count_per_bin,
+                out=np.zeros(len(count_per_bin)),
+                where=count_per_bin > 0,
+            )
+        )
+        result = [
+            ConfidenceBinDetails(
+                bin_index=bin_index,
+                bin_confidence=bin_min_value + bins[1] / 2,
+                mean_bin_confidence=mean_confidence,
+                outcome_count=dict(zip(ALL_OUTCOMES, outcome_count)),
+            )
+            for bin_index, (bin_min_value, mean_confidence, outcome_count) in enumerate(
+                zip(
+                    bins[:-1].tolist(),
+                    mean_confidence_per_bin.tolist(),
+                    outcome_count_per_bin.tolist(),
+                )
+            )
         ]
+        return result
 
     @classmethod
     def get_bins(
@@ -53,32 +87,20 @@ class ConfidenceHistogramModule(FilterableModule[ModelContractConfig]):
 
         if len(ds) > 0:
             # Get the bin index for each prediction.
-            confidences = np.max(get_confidences_from_ds(ds, without_postprocessing), axis=1)
-            bin_indices = np.minimum(
-                np.floor(confidences * CONFIDENCE_BINS_COUNT),
-                CONFIDENCE_BINS_COUNT - 1,  # So that 100% falls in the last bin
+            confidences = get_confidences_from_ds(ds, without_postprocessing).max(axis=1)
+            bin_indices = get_confidence_bin_indices(confidences)
+
+            # Count (bin, outcome) pairs and sum the confidences of each bin in a single pass.
+            outcome_count_per_bin = count_per_group(
+                bin_indices,
+                get_outcome_codes_from_ds(ds, without_postprocessing),
+                num_groups=CONFIDENCE_BINS_COUNT,
+                num_codes=len(ALL_OUTCOMES),
             )
-
-            # Create the records. We drop the last bin as it's the maximum.
-            result = []
-            for bin_index, bin_min_value in enumerate(bins[:-1]):
-                bin_mask = bin_indices == bin_index
-                outcome_count = defaultdict(int)
-                for outcome in ALL_OUTCOMES:
-                    outcome_count[outcome] = np.logical_and(
-                        bin_mask, cls.get_outcome_mask(ds, outcome, without_postprocessing)
-                    ).sum()
-                mean_conf = (
-                    0 if bin_mask.sum() == 0 else np.nan_to_num(confidences[bin_mask].mean())
-                )
-                result.append(
-                    ConfidenceBinDetails(
-                        bin_index=bin_index,
-                        bin_confidence=bin_min_value + bins[1] / 2,
-                        mean_bin_confidence=mean_conf,
-                        outcome_count=outcome_count,
-                    )
-                )
+            confidence_sum_per_bin = np.bincount(
+                bin_indices, weights=confidences, minlength=CONFIDENCE_BINS_COUNT
+            )
+            result = cls.bins_from_counts(outcome_count_per_bin, confidence_sum_per_bin)
         else:
             # Create empty bins
             result = [
@@ -100,6 +122,21 @@ class ConfidenceHistogramModule(FilterableModule[ModelContractConfig]):
             Confidence bins and threshold.
 
         """
+        data_action_index = self.get_data_action_filter_index()
+        if data_action_index is not None:
+            # Filtering on a data action only, so its statistics are already up to date.
+            statistics = self.get_data_action_statistics()
+            if statistics.utterance_count[data_action_index] > 0:
+                return [
+                    ConfidenceHistogramResponse(
+                        bins=self.bins_from_counts(
+                            statistics.outcome_count_per_bin[data_action_index],
+                            statistics.confidence_sum_per_bin[data_action_index],
+                        ),
+                        confidence_threshold=self.get_threshold(),
+                    )
+                ]
+
         ds: Dataset = assert_not_none(self.get_dataset_split())
 
         return [
@@ -124,11 +161,9 @@ class ConfidenceBinIndexModule(DatasetResultModule[ModelContractConfig]):
 
         """
         ds = assert_not_none(self.get_dataset_split())
-        postprocessed_confidences = cast(
-            List[List[float]], ds[DatasetColumn.postprocessed_confidences]
-        )
+        postprocessed_confidences = get_confidences_from_ds(ds, without_postprocessing=False)
         bin_indices: List[int] = (
-            np.floor(np.max(postprocessed_confidences, axis=1) * CONFIDENCE_BINS_COUNT)
+            np.floor(postprocessed_confidences.max(axis=1, initial=0) * CONFIDENCE_BINS_COUNT)
             .astype("int")
             .tolist()
         )
@@ -19,6 +19,20 @@ from azimuth.utils.validation import assert_not_none
 MIN_CONFUSION_CUTHILL_MCKEE = 0.1
 
 
+def normalize_confusion_matrix(cf: np.ndarray) -> np.ndarray:
+    """Normalize the confusion matrix over the labels, the same way as sklearn.
+
+    Args:
+        cf: Count of each (label, prediction) pair.
+
+    Returns:
+        Confusion matrix where each row sums to 1, or 0 if there is no utterance with the label.
+    """
+    with np.errstate(all="ignore"):
+        cf_normalized = cf / cf.sum(axis=1, keepdims=True)
+    return np.asarray(np.nan_to_num(cf_normalized))
+
+
 class ConfusionMatrixModule(FilterableModule[ModelContractConfig]):
     """Computes the confusion matrix on the specified dataset split."""
 
@@ -34,11 +48,6 @@ class ConfusionMatrixModule(FilterableModule[ModelContractConfig]):
             Confusion Matrix according to current filters
 
         """
-        ds: Dataset = assert_not_none(self.get_dataset_split())
-        predictions, labels = (
-            get_predictions_from_ds(ds, self.mod_options.without_postprocessing),
-            ds[self.config.columns.label],
-        )
         ds_mng = self.get_dataset_split_manager()
         num_classes = ds_mng.get_num_classes()
         class_ids = list(range(num_classes))
@@ -46,23 +55,22 @@ class ConfusionMatrixModule(FilterableModule[ModelContractConfig]):
         rejection_idx = ds_mng.rejection_class_idx
         rejection_class = class_names[rejection_idx]
 
-        cf = confusion_matrix(
-            y_true=labels,
-            y_pred=predictions,
-            labels=class_ids,
-            normalize="true" if self.mod_options.cf_normalize else None,
-        )
+        data_action_index = self.get_data_action_filter_index()
+        if data_action_index is not None:
+            # Filtering on a data action only, so its statistics are already up to date.
+            cf_count = self.get_data_action_statistics().confusion[data_action_index].copy()
+        else:
+            ds: Dataset = assert_not_none(self.get_dataset_split())
+            cf_count = confusion_matrix(
+                y_true=ds[self.config.columns.label],
+                y_pred=get_predictions_from_ds(ds, self.mod_options.without_postprocessing),
+                labels=class_ids,
+            )
+        cf_normalized = normalize_confusion_matrix(cf_count)
+        cf = cf_normalized if self.mod_options.cf_normalize else cf_count
 
         # Reorder rows and columns so the bandwidth of the matrix is smaller
         if self.mod_options.cf_reorder_classes:
-            # Get a normalized confusion matrix if not already computed
-            if not self.mod_options.cf_normalize:
-                cf_normalized = confusion_matrix(
-                    y_true=labels, y_pred=predictions, labels=class_ids, normalize="true"
-                )
-            else:
-                cf_normalized = cf
-
             # Remove the rejection class so it doesn't influence the algorithm
             cf_no_rejection = np.delete(
                 np.delete(cf_normalized, rejection_idx, 0), rejection_idx, 1
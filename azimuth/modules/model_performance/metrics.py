@@ -4,8 +4,8 @@
 import inspect
 import json
 import warnings
-from collections import Counter
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 from datasets import Dataset, Metric
@@ -14,9 +14,12 @@ from tqdm import tqdm
 
 from azimuth.config import MetricsConfig, MetricsPerFilterConfig
 from azimuth.modules.base_classes import AggregationModule, FilterableModule
-from azimuth.modules.model_performance.confidence_binning import ConfidenceHistogramModule
+from azimuth.modules.model_performance.confidence_binning import (
+    CONFIDENCE_BINS_COUNT,
+    ConfidenceHistogramModule,
+)
 from azimuth.plots.ece import make_ece_figure
-from azimuth.types import DatasetColumn, DatasetFilters
+from azimuth.types import DatasetColumn
 from azimuth.types.model_performance import (
     MetricsAPIResponse,
     MetricsModuleResponse,
@@ -25,19 +28,27 @@ from azimuth.types.model_performance import (
     MetricsPerFilterValue,
 )
 from azimuth.types.outcomes import ALL_OUTCOMES
-from azimuth.types.tag import SMART_TAGS_FAMILY_MAPPING, SmartTag, SmartTagFamily
+from azimuth.types.tag import SMART_TAGS_FAMILY_MAPPING, SmartTag
 from azimuth.utils.dataset_operations import (
-    filter_dataset_split,
+    get_array_from_ds,
+    get_column_from_ds,
     get_confidences_from_ds,
-    get_outcomes_from_ds,
+    get_outcome_codes_from_ds,
     get_predictions_from_ds,
 )
 from azimuth.utils.ml.ece import compute_ece_from_bins
-from azimuth.utils.ml.model_performance import sorted_by_utterance_count_with_last
+from azimuth.utils.ml.model_performance import (
+    count_per_group,
+    get_confidence_bin_indices,
+    sorted_by_utterance_count_with_last,
+)
 from azimuth.utils.validation import assert_not_none
 
 MAX_PRED = 3
 
+# Group of each membership, row of each membership and filter value of each group.
+Grouping = Tuple[np.ndarray, np.ndarray, List[str]]
+
 BASE_RESPONSE = MetricsModuleResponse(
     outcome_count={outcome: 0 for outcome in ALL_OUTCOMES},
     ece=0.0,
@@ -74,46 +85,21 @@ class MetricsModule(FilterableModule[MetricsConfig]):
             return [BASE_RESPONSE]
         else:
             utterance_count = len(ds)
-            outcome_count = Counter(
-                get_outcomes_from_ds(ds, self.mod_options.without_postprocessing)
+            outcome_codes = get_outcome_codes_from_ds(ds, self.mod_options.without_postprocessing)
+            outcome_count = dict(
+                zip(ALL_OUTCOMES, np.bincount(outcome_codes, minlength=len(ALL_OUTCOMES)).tolist())
             )
-            outcome_count.update({outcome: 0 for outcome in ALL_OUTCOMES})
 
             # Compute ECE
             bins = ConfidenceHistogramModule.get_bins(ds, self.mod_options.without_postprocessing)
             ece, acc, expected = compute_ece_from_bins(bins)
             count_per_bin = [sum(b.outcome_count.values()) for b in bins]
 
-            metric_values = {}
-            dm = self.get_dataset_split_manager()
-            for metric_name, metric_obj_def in self.config.metrics.items():
-                met: Metric = self.artifact_manager.get_metric(
-                    self.config,
-                    metric_name,
-                    label_list=dm.get_class_names(),
-                    rejection_class_idx=dm.rejection_class_idx,
-                    force_kwargs=True,  # Set True here as load_metrics has **kwargs.
-                )
-                accept_probabilities = "probabilities" in inspect.signature(met._compute).parameters
-                extra_kwargs = (
-                    dict(probabilities=self.make_probabilities()) if accept_probabilities else {}
-                )
-                extra_kwargs.update(metric_obj_def.additional_kwargs)
-                with warnings.catch_warnings():
-                    # Ignore warnings such as
-                    #   UndefinedMetricWarning: Precision is ill-defined and being set to 0.0
-                    warnings.simplefilter("ignore", category=UndefinedMetricWarning)
-                    metric_values[metric_name] = assert_not_none(
-                        first_value(
-                            met.compute(
-                                predictions=get_predictions_from_ds(
-                                    ds, self.mod_options.without_postprocessing
-                                ),
-                                references=ds[self.config.columns.label],
-                                **extra_kwargs,
-                            )
-                        )
-                    )
+            metric_values = self.compute_custom_metrics(
+                predictions=get_predictions_from_ds(ds, self.mod_options.without_postprocessing),
+                labels=ds[self.config.columns.label],
+                get_probabilities=self.make_probabilities,
+            )
 
             return [
                 MetricsModuleResponse(
@@ -125,6 +111,46 @@ class MetricsModule(FilterableModule[MetricsConfig]):
                 )
             ]
 
+    def compute_custom_metrics(
+        self,
+        predictions: List[int],
+        labels: List[int],
+        get_probabilities: Callable[[], np.ndarray],
+    ) -> Dict[str, float]:
+        """Compute the metrics defined in the config.
+
+        Args:
+            predictions: Predicted class of each utterance.
+            labels: Label of each utterance.
+            get_probabilities: Get the probabilities of each utterance, for metrics that need them.
+
+        Returns:
+            Value of each metric.
+        """
+        metric_values = {}
+        dm = self.get_dataset_split_manager()
+        for metric_name, metric_obj_def in self.config.metrics.items():
+            met: Metric = self.artifact_manager.get_metric(
+                self.config,
+                metric_name,
+                label_list=dm.get_class_names(),
+                rejection_class_idx=dm.rejection_class_idx,
+                force_kwargs=True,  # Set True here as load_metrics has **kwargs.
+            )
+            accept_probabilities = "probabilities" in inspect.signature(met._compute).parameters
+            extra_kwargs = dict(probabilities=get_probabilities()) if accept_probabilities else {}
+            extra_kwargs.update(metric_obj_def.additional_kwargs)
+            with warnings.catch_warnings():
+                # Ignore warnings such as
+                #   UndefinedMetricWarning: Precision is ill-defined and being set to 0.0
+                warnings.simplefilter("ignore", category=UndefinedMetricWarning)
+                metric_values[metric_name] = assert_not_none(
+                    first_value(
+                        met.compute(predictions=predictions, references=labels, **extra_kwargs)
+                    )
+                )
+        return metric_values
+
     def compute_on_dataset_split(self) -> List[MetricsModuleResponse]:  # type: ignore
         """Computes different metrics according to the specified module options."""
         ds: Dataset = assert_not_none(self.get_dataset_split())
@@ -166,13 +192,14 @@ class MetricsModule(FilterableModule[MetricsConfig]):
         num_classes = self.get_dataset_split_manager().get_num_classes(labels_only=True)
 
         probs = np.zeros([len(ds), num_classes])
-        for idx, (confidences, predictions) in enumerate(
-            zip(
+        if len(ds) > 0:
+            # Confidences are sorted, so they are scattered back to their class.
+            np.put_along_axis(
+                probs,
+                get_array_from_ds(ds, DatasetColumn.model_predictions),
                 get_confidences_from_ds(ds, self.mod_options.without_postprocessing),
-                ds[DatasetColumn.model_predictions],
+                axis=1,
             )
-        ):
-            probs[idx] = np.array(confidences)[predictions]
         return probs
 
 
@@ -186,27 +213,87 @@ class MetricsPerFilterModule(AggregationModule[MetricsPerFilterConfig]):
 
     required_mod_options = {"pipeline_index"}
 
-    def get_metrics_for_filter(
-        self, filters_dict: Dict[str, DatasetFilters]
-    ) -> List[MetricsPerFilterValue]:
-        """Get metrics for a list of filters.
+    def get_metrics_per_group(
+        self, ds: Dataset, groupings: List[Grouping]
+    ) -> List[List[MetricsPerFilterValue]]:
+        """Get metrics for groups of rows, aggregating all groups in a single pass.
 
         Args:
-            filters_dict: Dictionary with filter values as keys
-                and the corresponding dataset filters as values.
+            ds: Dataset Split on which to compute the metrics.
+            groupings: For each grouping, the group of each membership as an index in the filter
+                values, the row of each membership and the filter values. A row can be in more
+                than one group.
 
         Returns:
-            Metrics for labels, predictions and smart tags.
+            Metrics for each filter value of each grouping.
         """
-        ds = self.get_dataset_split()
+        without_postprocessing = self.mod_options.without_postprocessing
+        num_outcomes = len(ALL_OUTCOMES)
+        outcome_codes = get_outcome_codes_from_ds(ds, without_postprocessing)
+        confidences = (
+            get_confidences_from_ds(ds, without_postprocessing).max(axis=1)
+            if len(ds) > 0
+            else np.empty(0)
+        )
+        bin_indices = get_confidence_bin_indices(confidences)
+        predictions = np.array(get_predictions_from_ds(ds, without_postprocessing), dtype=int)
+        labels = get_column_from_ds(ds, self.config.columns.label)
+
+        # Groups of all groupings are numbered one after the other.
+        group_offsets = np.cumsum([0, *(len(filter_values) for _, _, filter_values in groupings)])
+        group_ids = np.concatenate(
+            [ids + offset for (ids, _, _), offset in zip(groupings, group_offsets)]
+        ).astype(np.int64)
+        rows = np.concatenate([rows for _, rows, _ in groupings]).astype(np.int64)
+        num_groups = group_offsets[-1]
+
+        # Outcome count and confidence sum per group and per bin, as in ConfidenceHistogramModule.
+        outcome_count_per_bin = count_per_group(
+            group_ids,
+            bin_indices[rows] * num_outcomes + outcome_codes[rows],
+            num_groups,
+            CONFIDENCE_BINS_COUNT * num_outcomes,
+        ).reshape(num_groups, CONFIDENCE_BINS_COUNT, num_outcomes)
+        confidence_sum_per_bin = count_per_group(
+            group_ids,
+            bin_indices[rows],
+            num_groups,
+            CONFIDENCE_BINS_COUNT,
+            weights=confidences[rows],
+        )
+        # Rows of each group, to compute the custom metrics.
+        order = np.argsort(group_ids, kind="stable")
+        rows_per_group = np.split(
+            rows[order], np.cumsum(np.bincount(group_ids, minlength=num_groups))[:-1]
+        )
+
+        metrics_module = MetricsModule(
+            dataset_split_name=self.dataset_split_name,
+            config=self.config,
+            mod_options=self.mod_options,
+        )
+        probabilities = lru_cache(maxsize=None)(metrics_module.make_probabilities)
+        all_filter_values = [value for _, _, filter_values in groupings for value in filter_values]
         accumulator = []
-        for filter_value, filters in filters_dict.items():
-            ds_filtered = filter_dataset_split(ds, filters, config=self.config)
-            metrics = MetricsModule(
-                dataset_split_name=self.dataset_split_name,
-                config=self.config,
-                mod_options=self.mod_options,
-            ).compute_metrics(ds_filtered)[0]
+        for filter_value, group_rows, outcome_count, confidence_sum in zip(
+            all_filter_values, rows_per_group, outcome_count_per_bin, confidence_sum_per_bin
+        ):
+            if len(group_rows) == 0:
+                # Nothing to do, we use an empty response.
+                metrics = BASE_RESPONSE
+            else:
+                bins = ConfidenceHistogramModule.bins_from_counts(outcome_count, confidence_sum)
+                metrics = MetricsModuleResponse(
+                    outcome_count=dict(zip(ALL_OUTCOMES, outcome_count.sum(axis=0).tolist())),
+                    ece=compute_ece_from_bins(bins)[0],
+                    ece_plot_args=None,
+                    utterance_count=len(group_rows),
+                    custom_metrics=metrics_module.compute_custom_metrics(
+                        predictions=predictions[group_rows].tolist(),
+                        labels=labels[group_rows].tolist(),
+                        get_probabilities=lambda: np.asarray(probabilities()[group_rows]),
+                    ),
+                )
             accumulator.append(
                 MetricsPerFilterValue(
                     outcome_count=metrics.outcome_count,
@@ -216,52 +303,58 @@ class MetricsPerFilterModule(AggregationModule[MetricsPerFilterConfig]):
                     filter_value=filter_value,
                 )
             )
-        return accumulator
+        return [
+            accumulator[group_start:group_end]
+            for group_start, group_end in zip(group_offsets[:-1], group_offsets[1:])
+        ]
 
     def compute_on_dataset_split(self) -> List[MetricsPerFilterModuleResponse]:  # type: ignore
         dm = self.get_dataset_split_manager()
         ds = self.get_dataset_split()
+        class_names = dm.get_class_names()
+        all_rows = np.arange(len(ds))
 
-        with tqdm(total=3) as pbar:
+        with tqdm(total=2) as pbar:
             pbar.set_description(
                 f"MetricsPerFilter on {self.dataset_split_name} "
                 f"set for pipeline {self.mod_options.pipeline_index}"
             )
 
-            label_filters = {
-                class_name: self.edit_filter(self.mod_options.filters, label=i)
-                for i, class_name in enumerate(dm.get_class_names())
-            }
-            metrics_per_label = sorted_by_utterance_count_with_last(
-                self.get_metrics_for_filter(label_filters), dm.rejection_class_idx
+            labels = get_column_from_ds(ds, self.config.columns.label)
+            predictions = np.array(
+                get_predictions_from_ds(ds, self.mod_options.without_postprocessing), dtype=int
             )
+            groupings: List[Grouping] = [
+                (labels, all_rows, class_names),
+                (predictions, all_rows, class_names),
+            ]
+            for tags in SMART_TAGS_FAMILY_MAPPING.values():
+                if all(tag in ds.column_names for tag in tags):
+                    tag_matrix = np.column_stack(
+                        [get_column_from_ds(ds, tag).astype(bool) for tag in tags]
+                    ).reshape(len(ds), len(tags))
+                    # The last group has the rows with none of the tags in the family.
+                    tag_matrix = np.column_stack([tag_matrix, ~tag_matrix.any(axis=1)])
+                else:
+                    # The filter does not apply, as in `filter_dataset_split`.
+                    tag_matrix = np.ones((len(ds), len(tags) + 1), dtype=bool)
+                rows, group_ids = np.nonzero(tag_matrix)
+                groupings.append((group_ids, rows, [*tags, SmartTag.no_smart_tag]))
             pbar.update()
 
-            prediction_filters = {
-                class_name: self.edit_filter(self.mod_options.filters, prediction=i)
-                for i, class_name in enumerate(dm.get_class_names())
-            }
-            metrics_per_prediction = sorted_by_utterance_count_with_last(
-                self.get_metrics_for_filter(prediction_filters),
-                dm.rejection_class_idx,
+            per_label, per_prediction, *per_smart_tag_family = self.get_metrics_per_group(
+                ds, groupings
             )
-            pbar.update()
-
-            smart_tag_filters: Dict[SmartTagFamily, Dict[str, DatasetFilters]] = {
-                tag_family: {
-                    smart_tag: self.edit_filter(
-                        self.mod_options.filters, smart_tag={tag_family: [smart_tag]}
-                    )
-                    for smart_tag in tags + [SmartTag.no_smart_tag]
-                }
-                for tag_family, tags in SMART_TAGS_FAMILY_MAPPING.items()
-            }
             metrics_per_smart_tag = {
-                tag_family.value: sorted_by_utterance_count_with_last(
-                    self.get_metrics_for_filter(filters_for_family), -1
-                )
-                for tag_family, filters_for_family in smart_tag_filters.items()
+                tag_family.value: sorted_by_utterance_count_with_last(metrics, -1)
+                for tag_family, metrics in zip(SMART_TAGS_FAMILY_MAPPING, per_smart_tag_family)
             }
+            metrics_per_label = sorted_by_utterance_count_with_last(
+                per_label, dm.rejection_class_idx
+            )
+            metrics_per_prediction = sorted_by_utterance_count_with_last(
+                per_prediction, dm.rejection_class_idx
+            )
             pbar.update()
 
         return [
@@ -274,38 +367,3 @@ class MetricsPerFilterModule(AggregationModule[MetricsPerFilterConfig]):
                 utterance_count=len(ds),
             )
         ]
-
-    def edit_filter(
-        self,
-        initial_filter: DatasetFilters,
-        label=None,
-        prediction=None,
-        data_action=None,
-        outcome=None,
-        smart_tag=None,
-    ):
-        """Edit filters to include an update set.
-
-        Args:
-            initial_filter: Filter to edit.
-            label: label to add to the filters
-            prediction: prediction to add to the filters
-            data_action: data_action to add to the filters
-            outcome: outcome to add to the filters
-            smart_tag: smart_tag to add to the filters
-
-        Returns:
-            An updated version of the filter.
-        """
-        filter_copy = initial_filter.copy(deep=True)
-        if label is not None:
-            filter_copy.label.append(label)
-        if prediction is not None:
-            filter_copy.prediction.append(prediction)
-        if data_action is not None:
-            filter_copy.data_action.append(data_action)
-        if outcome is not None:
-            filter_copy.outcome.append(outcome)
-        if smart_tag is not None:
-            filter_copy.smart_tags.update(smart_tag)
-        return filter_copy
@@ -2,17 +2,18 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 from collections import Counter, defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, cast
 
 import numpy as np
 from datasets import Dataset
 from tqdm import tqdm
 
-from azimuth.config import ModelContractConfig
+from azimuth.config import ModelContractConfig, TemperatureScaling, ThresholdConfig
 from azimuth.dataset_split_manager import DatasetSplitManager
 from azimuth.modules.base_classes import AggregationModule, FilterableModule
-from azimuth.modules.model_performance.outcomes import OutcomesModule
-from azimuth.types import DatasetColumn, ModuleOptions
+from azimuth.modules.model_contract_task_mapping import model_contract_task_mapping
+from azimuth.modules.model_contracts.text_classification import TextClassificationModule
+from azimuth.types import DatasetColumn, DatasetFilters, ModuleOptions, SupportedMethod
 from azimuth.types.model_performance import (
     OutcomeCountPerFilter,
     OutcomeCountPerFilterResponse,
@@ -24,6 +25,8 @@ from azimuth.types.outcomes import ALL_OUTCOMES, OutcomeName
 from azimuth.types.tag import ALL_DATA_ACTION_FILTERS, SMART_TAGS_FAMILY_MAPPING, SmartTag
 from azimuth.utils.dataset_operations import get_outcomes_from_ds
 from azimuth.utils.ml.model_performance import (
+    compute_outcomes,
+    outcome_count_per_threshold,
     sorted_by_utterance_count,
     sorted_by_utterance_count_with_last,
 )
@@ -34,6 +37,11 @@ from azimuth.utils.validation import assert_is_list
 class OutcomeCountPerFilterModule(FilterableModule[ModelContractConfig]):
     """Computes the outcome count for each filter."""
 
+    @property
+    def depends_on_data_actions(self) -> bool:
+        # The outcome count is computed for each data action.
+        return True
+
     def get_outcome_count_per_class(
         self, dm: DatasetSplitManager, ds: Dataset, dataset_column: str
     ) -> List[OutcomeCountPerFilterValue]:
@@ -94,6 +102,35 @@ class OutcomeCountPerFilterModule(FilterableModule[ModelContractConfig]):
             self.get_outcome_count(outcome_count_per_tag, filters), -1
         )
 
+    def get_outcome_count_per_data_action(
+        self, dm: DatasetSplitManager, ds: Dataset
+    ) -> List[OutcomeCountPerFilterValue]:
+        """Get outcome count for each data action, including NO_ACTION.
+
+        Without filters, the counts come from the data action statistics, which are updated
+        incrementally when tags change.
+
+        Args:
+            dm: DatasetSplitManager.
+            ds: Dataset Split.
+
+        Returns:
+            Outcome count per data action.
+        """
+        if self.mod_options.filters != DatasetFilters():
+            return self.get_outcome_count_per_tag(dm, ds, ALL_DATA_ACTION_FILTERS)
+
+        outcome_count = self.get_data_action_statistics().outcome_count
+        metrics = [
+            OutcomeCountPerFilterValue(
+                outcome_count=dict(zip(ALL_OUTCOMES, count)),
+                utterance_count=sum(count),
+                filter_value=data_action,
+            )
+            for data_action, count in zip(ALL_DATA_ACTION_FILTERS, outcome_count.tolist())
+        ]
+        return sorted_by_utterance_count_with_last(metrics, -1)
+
     def get_outcome_count_per_outcome(self, ds: Dataset) -> List[OutcomeCountPerFilterValue]:
         """Compute outcome count per outcome.
 
@@ -160,7 +197,7 @@ class OutcomeCountPerFilterModule(FilterableModule[ModelContractConfig]):
                     prediction=self.get_outcome_count_per_class(
                         dm, ds, DatasetColumn.postprocessed_prediction
                     ),
-                    data_action=self.get_outcome_count_per_tag(dm, ds, ALL_DATA_ACTION_FILTERS),
+                    data_action=self.get_outcome_count_per_data_action(dm, ds),
                     outcome=self.get_outcome_count_per_outcome(ds),
                     **{
                         family.value: self.get_outcome_count_per_tag(
@@ -186,30 +223,63 @@ class OutcomeCountPerThresholdModule(AggregationModule[ModelContractConfig]):
 
         x_ticks_count = self.mod_options.x_ticks_count
         ths = np.linspace(0, 1, x_ticks_count)
-        result = []
-        for th in tqdm(
-            ths,
-            desc=f"{self.task_name} on {self.dataset_split_name} set "
-            f"for pipeline {self.mod_options.pipeline_index}",
-        ):
-            outcomes_mod = OutcomesModule(
+
+        # The model probabilities are fetched once and postprocessed for each threshold.
+        prediction_task = cast(
+            TextClassificationModule,
+            model_contract_task_mapping(
                 dataset_split_name=self.dataset_split_name,
                 config=self.config,
                 mod_options=ModuleOptions(
-                    # Convert to float instead of numpy.float64
-                    threshold=float(th),
+                    model_contract_method_name=SupportedMethod.PostProcess,
                     pipeline_index=self.mod_options.pipeline_index,
                     use_bma=self.mod_options.use_bma,
                 ),
+            ),
+        )
+        ds = self.get_dataset_split()
+        texts = ds[self.config.columns.text_input]
+        labels = np.asarray(ds[self.config.columns.label])
+        probs, _ = prediction_task.stack_probabilities(prediction_task.get_cached_predictions(ds))
+        rejection_class_idx = self.get_dataset_split_manager().rejection_class_idx
+
+        postprocessors = self.get_pipeline_definition().postprocessors or []
+        if postprocessors and (
+            isinstance(postprocessors[-1], ThresholdConfig)
+            and all(isinstance(post, TemperatureScaling) for post in postprocessors[:-1])
+        ):
+            # The threshold only affects the last step, so all thresholds are swept at once.
+            _, steps = prediction_task.postprocess_probs(texts, probs, threshold=0.0)
+            thresholded_probs = steps[-1].output.probs
+            outcome_counts = outcome_count_per_threshold(
+                confidences=thresholded_probs.max(-1),
+                predictions=thresholded_probs.argmax(-1),
+                labels=labels,
+                thresholds=ths,
+                rejection_class_idx=rejection_class_idx,
             )
-            outcomes = outcomes_mod.compute_on_dataset_split()
-            postprocessed_outcomes = [outcome.postprocessed_outcome for outcome in outcomes]
-            result.append(
-                OutcomeCountPerThresholdValue(
-                    threshold=th,
-                    outcome_count=Counter(postprocessed_outcomes),
+        else:
+            outcome_counts = []
+            for th in tqdm(
+                ths,
+                desc=f"{self.task_name} on {self.dataset_split_name} set "
+                f"for pipeline {self.mod_options.pipeline_index}",
+            ):
+                # Convert to float instead of numpy.float64
+                model_output, steps = prediction_task.postprocess_probs(texts, probs, float(th))
+                postprocessed_output = steps[-1].output if steps else model_output
+                outcome_counts.append(
+                    Counter(
+                        compute_outcomes(
+                            np.asarray(postprocessed_output.preds), labels, rejection_class_idx
+                        )
+                    )
                 )
-            )
+
+        result = [
+            OutcomeCountPerThresholdValue(threshold=th, outcome_count=outcome_count)
+            for th, outcome_count in zip(ths, outcome_counts)
+        ]
         return [
             OutcomeCountPerThresholdResponse(
                 outcome_count_per_threshold=result,
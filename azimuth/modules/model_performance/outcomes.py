@@ -1,7 +1,7 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from typing import List
+from typing import List, Tuple, cast
 
 import numpy as np
 from numpy import ndarray
@@ -10,9 +10,10 @@ from azimuth.config import ModelContractConfig
 from azimuth.dataset_split_manager import DatasetSplitManager
 from azimuth.modules.base_classes import DatasetResultModule
 from azimuth.modules.model_contract_task_mapping import model_contract_task_mapping
+from azimuth.modules.model_contracts.text_classification import TextClassificationModule
 from azimuth.types import DatasetColumn, SupportedMethod
-from azimuth.types.outcomes import OutcomeName, OutcomeResponse
-from azimuth.utils.ml.model_performance import compute_outcome
+from azimuth.types.outcomes import OutcomeResponse
+from azimuth.utils.ml.model_performance import compute_outcomes
 from azimuth.utils.validation import assert_not_none
 
 
@@ -22,7 +23,7 @@ class OutcomesModule(DatasetResultModule[ModelContractConfig]):
     required_mod_options = {"pipeline_index"}
     optional_mod_options = DatasetResultModule.optional_mod_options | {"threshold", "use_bma"}
 
-    def _get_predictions(self, without_postprocessing: bool) -> ndarray:
+    def _get_predictions(self) -> Tuple[ndarray, ndarray]:
         mod_options = self.mod_options.copy(deep=True)
         mod_options.model_contract_method_name = SupportedMethod.PostProcess
         mod_options.indices = self.get_indices()
@@ -31,16 +32,10 @@ class OutcomesModule(DatasetResultModule[ModelContractConfig]):
             config=self.config,
             mod_options=mod_options,
         )
-        pred_result = prediction_task.compute_on_dataset_split()
-
-        predictions = np.zeros(len(mod_options.indices))
-        for idx, pred in enumerate(pred_result):
-            if without_postprocessing:
-                predictions[idx] = pred.model_output.preds
-            else:
-                predictions[idx] = pred.postprocessed_output.preds
-
-        return predictions
+        # Postprocessing is applied on all predictions at once.
+        return cast(TextClassificationModule, prediction_task).post_process_preds(
+            prediction_task.get_dataset_split()
+        )
 
     def compute_on_dataset_split(self) -> List[OutcomeResponse]:  # type: ignore
         """Compute outcomes for a set of predictions, both with and without postprocessing.
@@ -51,19 +46,13 @@ class OutcomesModule(DatasetResultModule[ModelContractConfig]):
         """
         dm = self.get_dataset_split_manager()
         ds = assert_not_none(self.get_dataset_split())
-        labels = ds[self.config.columns.label]
+        labels = np.asarray(ds[self.config.columns.label])
 
-        model_predictions = self._get_predictions(without_postprocessing=True)
-        model_outcomes: List[OutcomeName] = [
-            compute_outcome(y_pred, label, dm.rejection_class_idx)
-            for y_pred, label in zip(model_predictions, labels)
-        ]
-
-        postprocessed_predictions = self._get_predictions(without_postprocessing=False)
-        postprocessed_outcomes: List[OutcomeName] = [
-            compute_outcome(y_pred, label, dm.rejection_class_idx)
-            for y_pred, label in zip(postprocessed_predictions, labels)
-        ]
+        model_predictions, postprocessed_predictions = self._get_predictions()
+        model_outcomes = compute_outcomes(model_predictions, labels, dm.rejection_class_idx)
+        postprocessed_outcomes = compute_outcomes(
+            postprocessed_predictions, labels, dm.rejection_class_idx
+        )
 
         return [
             OutcomeResponse(
@@ -1,42 +1,45 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from collections import defaultdict
+import os
+from os.path import join as pjoin
 from typing import Dict, List, Optional, Tuple, cast
 
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datasets import Dataset
+from filelock import FileLock
 
 from azimuth.config import PerturbationTestingConfig
 from azimuth.dataset_split_manager import DatasetSplitManager
 from azimuth.modules.base_classes import DatasetResultModule
 from azimuth.modules.base_classes.dask_module import Worker
 from azimuth.modules.model_contract_task_mapping import model_contract_task_mapping
-from azimuth.types import DatasetColumn, DatasetSplitName, ModuleOptions, SupportedMethod
+from azimuth.modules.task_execution import get_task_result
+from azimuth.types import (
+    DatasetColumn,
+    DatasetSplitName,
+    ModuleOptions,
+    ModuleResponse,
+    SupportedMethod,
+)
 from azimuth.types.perturbation_testing import (
-    PRETTY_PERTURBATION_TYPES,
-    PerturbationTestClass,
     PerturbationTestFamily,
-    PerturbationTestName,
-    PerturbationTestType,
-    PerturbationType,
     PerturbedUtteranceDetails,
     PerturbedUtteranceResult,
 )
 from azimuth.types.tag import SmartTag, Tag
 from azimuth.types.task import PredictionResponse
-from azimuth.utils.conversion import flatten
-from azimuth.utils.ml.perturbation_functions import (
-    add_all_neutral_tokens,
-    remove_or_add_contractions,
-    remove_or_add_final_period,
-    remove_or_add_final_question_mark,
-    remove_or_add_inside_comma,
-    remove_or_add_inside_period,
-    typo,
+from azimuth.utils.ml.perturbation_results import (
+    get_failed_per_row,
+    make_perturbation_results_table,
+)
+from azimuth.utils.ml.perturbation_test import (
+    PerturbationTest,
+    generate_perturbations,
+    get_perturbation_tests,
 )
-from azimuth.utils.ml.perturbation_test import PerturbationTest
-from azimuth.utils.ml.seeding import RandomContext
 from azimuth.utils.validation import assert_not_none
 
 
@@ -46,10 +49,7 @@ class PerturbationTestingModule(DatasetResultModule[PerturbationTestingConfig]):
     provides detailed results on the prediction results for the new perturbed utterances.
 
     Notes:
-        To add a new test:
-            1. In `perturbation_functions.py`, make a new function with the same
-            signature as the `typo` one.
-            2. Add your test in self.perturbation_test with your function.
+        To add a new test, see `get_perturbation_tests`.
 
     """
 
@@ -67,224 +67,168 @@ class PerturbationTestingModule(DatasetResultModule[PerturbationTestingConfig]):
 
         super().__init__(dataset_split_name, config, mod_options)
         self.perturbation_testing_config = assert_not_none(self.config.behavioral_testing)
-        self.perturbation_tests = [
-            PerturbationTest(
-                name=PerturbationTestName.neutral_token,
-                description="{type} a neutral token to the utterance.",
-                test_fn=add_all_neutral_tokens,
-                family=PerturbationTestFamily.fuzzy_matching,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.neutral_token.threshold,
-                expect_flip=False,
-            ),
-            PerturbationTest(
-                name=PerturbationTestName.question_mark,
-                description="{type} question mark at the end of the utterance.",
-                test_fn=remove_or_add_final_question_mark,
-                family=PerturbationTestFamily.punctuation,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.punctuation.threshold,
-                expect_flip=False,
-            ),
-            PerturbationTest(
-                name=PerturbationTestName.ending_period,
-                description="{type} period at the end of the utterance.",
-                test_fn=remove_or_add_final_period,
-                family=PerturbationTestFamily.punctuation,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.punctuation.threshold,
-                expect_flip=False,
-            ),
-            PerturbationTest(
-                name=PerturbationTestName.inner_comma,
-                description="{type} comma inside the utterance.",
-                test_fn=remove_or_add_inside_comma,
-                family=PerturbationTestFamily.punctuation,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.punctuation.threshold,
-                expect_flip=False,
-            ),
-            PerturbationTest(
-                name=PerturbationTestName.inner_period,
-                description="{type} period inside the utterance.",
-                test_fn=remove_or_add_inside_period,
-                family=PerturbationTestFamily.punctuation,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.punctuation.threshold,
-                expect_flip=False,
-            ),
-            PerturbationTest(
-                name=PerturbationTestName.typos,
-                description="{type} characters in the utterance to create typos.",
-                test_fn=typo,
-                family=PerturbationTestFamily.fuzzy_matching,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.typo.threshold,
-                expect_flip=False,
-            ),
-            PerturbationTest(
-                name=PerturbationTestName.contractions,
-                description="{type} expressions in the utterance.",
-                family=PerturbationTestFamily.fuzzy_matching,
-                test_fn=remove_or_add_contractions,
-                test_type=PerturbationTestType.invariant,
-                test_class=PerturbationTestClass.robustness,
-                conf_delta_threshold=self.perturbation_testing_config.fuzzy_matching.threshold,
-                expect_flip=False,
-            ),
-        ]
+        self.perturbation_tests = get_perturbation_tests(self.config)
 
-    def get_preds(self, batch: Dataset) -> List[Tuple[int, float]]:
-        """Calls the prediction task to get new predictions for the perturbed utterances.
+    def get_predict_task(self, indices: Optional[List[int]] = None):
+        """Get the prediction task of the pipeline.
 
         Args:
-            batch: batch of utterances to run inference on.
+            indices: Indices to get the cached predictions for, if any.
 
         Returns:
-            list of predictions Tuple[result, confidence].
-
+            The prediction task.
         """
         # INFO: creating this object cost nothing.
-        predict_task = model_contract_task_mapping(
+        return model_contract_task_mapping(
             dataset_split_name=self.dataset_split_name,
             config=self.config,
             mod_options=ModuleOptions(
                 model_contract_method_name=SupportedMethod.Predictions,
                 pipeline_index=self.mod_options.pipeline_index,
+                indices=indices,
             ),
         )
-        result: List[PredictionResponse] = predict_task.compute(batch)
+
+    @staticmethod
+    def to_preds(result: List[PredictionResponse]) -> List[Tuple[int, float]]:
+        """Get the predicted class and its confidence from predictions.
+
+        Args:
+            result: Predictions.
+
+        Returns:
+            list of predictions Tuple[result, confidence].
+        """
         top_probs = [float(np.max(record.postprocessed_output.probs)) for record in result]
         preds = [int(record.postprocessed_output.preds) for record in result]
         return list(zip(preds, top_probs))
 
+    def get_original_preds(self, row_indices: List[int]) -> List[Tuple[int, float]]:
+        """Get the predictions of the original utterances, from the Predictions module.
+
+        Args:
+            row_indices: Indices of the original utterances.
+
+        Returns:
+            list of predictions Tuple[result, confidence].
+        """
+        predict_task = self.get_predict_task(indices=row_indices)
+        result = get_task_result(task_module=predict_task, result_type=List[PredictionResponse])
+        return self.to_preds(result)
+
+    def get_preds(self, batch: Dataset) -> List[Tuple[int, float]]:
+        """Calls the prediction task to get new predictions for the perturbed utterances.
+
+        Identical utterances are only predicted once, in batches made according to
+        `config.batching_strategy`.
+
+        Args:
+            batch: batch of utterances to run inference on.
+
+        Returns:
+            list of predictions Tuple[result, confidence].
+
+        """
+        predict_task = self.get_predict_task()
+        utterances = cast(List[str], batch[self.config.columns.text_input])
+        first_positions: Dict[str, int] = {}
+        for position, utterance in enumerate(utterances):
+            first_positions.setdefault(utterance, position)
+        unique_batch = batch.select(list(first_positions.values()))
+
+        preds_per_utterance: Dict[str, Tuple[int, float]] = {}
+        for rows in predict_task.get_batches(unique_batch):
+            sub_batch = unique_batch.select(rows)
+            preds_per_utterance.update(
+                zip(
+                    sub_batch[self.config.columns.text_input],
+                    self.to_preds(predict_task.compute(sub_batch)),
+                )
+            )
+        return [preds_per_utterance[utterance] for utterance in utterances]
+
     def get_test_results(
-        self, perturbation_test: PerturbationTest, batch: Dataset
-    ) -> Dict[int, Optional[List[PerturbedUtteranceResult]]]:
+        self,
+        perturbation_test: PerturbationTest,
+        perturbed_utterance_details: List[PerturbedUtteranceDetails],
+        perturbed_utterance_preds: List[Tuple[int, float]],
+        original_pred: Tuple[int, float],
+    ) -> List[PerturbedUtteranceResult]:
         """
-        Calculates the confidence on the newly perturbed utterances, checks whether the
-        test fails and populates the resulting list.
+        Checks whether the test fails on each perturbed utterance of an original utterance and
+        populates the resulting list.
 
         Args:
-            perturbation_test: Perturbation test to create.
-            batch: The original utterances.
+            perturbation_test: Perturbation test that created the perturbed utterances.
+            perturbed_utterance_details: Perturbed utterances.
+            perturbed_utterance_preds: Predictions for the perturbed utterances.
+            original_pred: Prediction for the original utterance.
 
         Returns:
-            results as Dict[int, List[PerturbedUtteranceResult]].
-            For each perturbed_utterance, we have a list of test.
-            A list may be empty if a test case is not available (ex: contractions)
+            Results of the test for each perturbed utterance.
+            The list may be empty if a test case is not available (ex: contractions)
 
         """
-        results: Dict[int, Optional[List[PerturbedUtteranceResult]]] = {}
-        original_preds = self.get_preds(batch=batch)
-        original_labels = batch[self.config.columns.label]
-        row_indices = batch[DatasetColumn.row_idx]
-        original_utterances = cast(List[str], batch[self.config.columns.text_input])
-        # Create perturbed utterances.
-        all_perturbed_utterance_details = self.generate_perturbations(
-            original_utterances, perturbation_test
-        )
-        formatted_indices: List[int] = sum(
-            [
-                [row_indices[i]] * len(all_perturbed_utterance_details[i])
-                for i in range(len(row_indices))
-            ],
-            [],
-        )
-        batch_all_perturbations = Dataset.from_dict(
-            {
-                self.config.columns.text_input: flatten(
-                    [
-                        [test.perturbed_utterance for test in utterance_tests]
-                        for utterance_tests in all_perturbed_utterance_details
-                    ]
-                ),
-                self.config.columns.label: flatten(
-                    [
-                        [original_labels[idx] for _ in range(len(utterance_tests))]
-                        for idx, utterance_tests in enumerate(all_perturbed_utterance_details)
-                    ]
+        # Check if the test has failed or not for each perturbed utterance.
+        test_passed = [
+            perturbation_test.is_failed(perturbed_utterance_pred, original_pred)
+            for perturbed_utterance_pred in perturbed_utterance_preds
+        ]
+        # Create PerturbedUtteranceResult based on the result.
+        return [
+            PerturbedUtteranceResult(
+                name=perturbation_test.name,
+                description=perturbation_test.get_description(
+                    perturbed_utterance_detail.perturbation_type
                 ),
-                DatasetColumn.row_idx: formatted_indices,
-            }
-        )
-        perturbed_predictions = (
-            self.get_preds(batch_all_perturbations)
-            if batch_all_perturbations[DatasetColumn.row_idx]
-            else []
-        )
-        perturbed_predictions_per_indices = defaultdict(list)
-        for row_idx, pred in zip(formatted_indices, perturbed_predictions):
-            perturbed_predictions_per_indices[row_idx].append(pred)
-
-        for idx, (original_pred, perturbed_utterance_details, original_idx) in enumerate(
-            zip(original_preds, all_perturbed_utterance_details, row_indices)
-        ):
-            if perturbed_utterance_details:
-                perturbed_utterance_preds = perturbed_predictions_per_indices[original_idx]
-                # Check if the test has failed or not for each perturbed utterance.
-                test_passed = [
-                    perturbation_test.is_failed(perturbed_utterance_pred, original_pred)
-                    for perturbed_utterance_pred in perturbed_utterance_preds
-                ]
-                # Create PerturbedUtteranceResult based on the result.
-                perturbed_utterance_results = [
-                    PerturbedUtteranceResult(
-                        name=perturbation_test.name,
-                        description=perturbation_test.description.format(
-                            type=PRETTY_PERTURBATION_TYPES[
-                                PerturbationType(perturbed_utterance_detail.perturbation_type)
-                            ]
-                        ),
-                        family=perturbation_test.family,
-                        perturbed_utterance=perturbed_utterance_detail.perturbed_utterance,
-                        perturbations=perturbed_utterance_detail.perturbations,
-                        perturbation_type=perturbed_utterance_detail.perturbation_type,
-                        confidence=new_conf,
-                        confidence_delta=delta,
-                        failed=failed,
-                        failure_reason=reason,
-                        prediction=new_pred,
-                    )
-                    for perturbed_utterance_detail, (new_pred, new_conf), (
-                        failed,
-                        reason,
-                        delta,
-                    ) in zip(perturbed_utterance_details, perturbed_utterance_preds, test_passed)
-                ]
-                results[idx] = perturbed_utterance_results
-            else:
-                results[idx] = None
-        return results
+                family=perturbation_test.family,
+                perturbed_utterance=perturbed_utterance_detail.perturbed_utterance,
+                perturbations=perturbed_utterance_detail.perturbations,
+                perturbation_type=perturbed_utterance_detail.perturbation_type,
+                confidence=new_conf,
+                confidence_delta=delta,
+                failed=failed,
+                failure_reason=reason,
+                prediction=new_pred,
+            )
+            for perturbed_utterance_detail, (new_pred, new_conf), (
+                failed,
+                reason,
+                delta,
+            ) in zip(perturbed_utterance_details, perturbed_utterance_preds, test_passed)
+        ]
 
     def generate_perturbations(
-        self, utterances: List[str], perturbation_test: PerturbationTest
-    ) -> List[List[PerturbedUtteranceDetails]]:
-        """Generate new utterances for a perturbation test for a set of utterances.
+        self,
+        utterances: List[str],
+        perturbation_tests: Optional[List[PerturbationTest]] = None,
+        row_indices: Optional[List[int]] = None,
+    ) -> List[List[List[PerturbedUtteranceDetails]]]:
+        """Generate new utterances for perturbation tests for a set of utterances.
 
         Args:
             utterances: Original utterances.
-            perturbation_test: Test to run.
+            perturbation_tests: Tests to run, all tests of the module by default.
+            row_indices: Indices of the utterances, used to seed their perturbations. Positions in
+                `utterances` by default.
 
         Returns:
-            Perturbed utterances for each utterance.
+            Perturbed utterances for each test and each utterance.
 
         """
-        with RandomContext(self.perturbation_testing_config.seed):
-            all_perturbed_utterance_details = [
-                perturbation_test.test_fn(ut, self.config) for ut in utterances
-            ]
-        return all_perturbed_utterance_details
+        return generate_perturbations(
+            perturbation_tests or self.perturbation_tests,
+            utterances,
+            row_indices if row_indices is not None else list(range(len(utterances))),
+            self.config,
+        )
 
     def compute(self, batch: Dataset) -> List[List[PerturbedUtteranceResult]]:  # type: ignore
         """Calculate all perturbation tests for the given batch.
 
+        The perturbed utterances of all tests are predicted together, and the original utterances
+        are not predicted again.
+
         Args:
             batch: The original batch.
 
@@ -292,38 +236,114 @@ class PerturbationTestingModule(DatasetResultModule[PerturbationTestingConfig]):
             List of results for all perturbation tests per provided batch.
 
         """
-        # Get the results on each test on the batch.
-        results_per_test = [self.get_test_results(test, batch) for test in self.perturbation_tests]
-
-        records = []
-        for idx in range(len(batch[DatasetColumn.row_idx])):
-            record = []
-            for perturbed_utterance_results in results_per_test:
-                perturbed_utterance_result = perturbed_utterance_results[idx]
-                if perturbed_utterance_result:
-                    # We merge the results of perturbation tests for a perturbed_utterance
-                    record.extend(perturbed_utterance_result)
-            # We append the results of the perturbation tests for all utterances in the batch
-            records.append(record)
+        row_indices = cast(List[int], batch[DatasetColumn.row_idx])
+        original_labels = batch[self.config.columns.label]
+        original_utterances = cast(List[str], batch[self.config.columns.text_input])
+        original_preds = self.get_original_preds(row_indices)
+        # Create perturbed utterances for each test.
+        details_per_test = self.generate_perturbations(original_utterances, row_indices=row_indices)
+
+        repeats = [
+            len(perturbed_utterance_details)
+            for all_perturbed_utterance_details in details_per_test
+            for perturbed_utterance_details in all_perturbed_utterance_details
+        ]
+        batch_all_perturbations = Dataset.from_dict(
+            {
+                self.config.columns.text_input: [
+                    perturbed_utterance_detail.perturbed_utterance
+                    for all_perturbed_utterance_details in details_per_test
+                    for perturbed_utterance_details in all_perturbed_utterance_details
+                    for perturbed_utterance_detail in perturbed_utterance_details
+                ],
+                self.config.columns.label: np.repeat(
+                    np.tile(original_labels, len(self.perturbation_tests)), repeats
+                ).tolist(),
+                DatasetColumn.row_idx: np.repeat(
+                    np.tile(row_indices, len(self.perturbation_tests)), repeats
+                ).tolist(),
+            }
+        )
+        perturbed_predictions = iter(
+            self.get_preds(batch_all_perturbations) if sum(repeats) > 0 else []
+        )
+
+        records: List[List[PerturbedUtteranceResult]] = [[] for _ in row_indices]
+        for perturbation_test, all_perturbed_utterance_details in zip(
+            self.perturbation_tests, details_per_test
+        ):
+            for record, original_pred, perturbed_utterance_details in zip(
+                records, original_preds, all_perturbed_utterance_details
+            ):
+                # We merge the results of perturbation tests for a perturbed_utterance
+                record.extend(
+                    self.get_test_results(
+                        perturbation_test,
+                        perturbed_utterance_details,
+                        [next(perturbed_predictions) for _ in perturbed_utterance_details],
+                        original_pred,
+                    )
+                )
 
         return records
 
+    @property
+    def _results_table_path(self) -> str:
+        return pjoin(self.cache_dir, f"{self.name}_results.parquet")
+
+    def get_results_table(self) -> pa.Table:
+        """Get the results on the whole dataset_split as a table.
+
+        The table is saved next to the cache of the module by `save_result`, so that summaries,
+        smart tags and exports don't load every PerturbedUtteranceResult. If it is not saved, it is
+        made from the results of the module, computed if needed.
+
+        Returns:
+            Results of each perturbed utterance. See `make_perturbation_results_table`.
+
+        Raises:
+            ValueError: If the module is restricted to some indices.
+        """
+        if self.mod_options.indices is not None:
+            raise ValueError("The results table is only available for the whole dataset_split.")
+        with FileLock(f"{self._results_table_path}.lock"):
+            if os.path.exists(self._results_table_path):
+                return pq.read_table(self._results_table_path, memory_map=True)
+        res = get_task_result(task_module=self, result_type=List[List[PerturbedUtteranceResult]])
+        return self._write_results_table(res)
+
+    def _write_results_table(self, res: List[List[PerturbedUtteranceResult]]) -> pa.Table:
+        results = make_perturbation_results_table(res, list(range(len(res))))
+        with FileLock(f"{self._results_table_path}.lock"):
+            pq.write_table(results, f"{self._results_table_path}.tmp")
+            os.replace(f"{self._results_table_path}.tmp", self._results_table_path)
+        return results
+
+    def _store_data_in_cache(self, result: List[ModuleResponse], indices: List[int]):
+        # The results table is only valid for the results in the cache, until they are saved again.
+        with FileLock(f"{self._results_table_path}.lock"):
+            if os.path.exists(self._results_table_path):
+                os.remove(self._results_table_path)
+        super()._store_data_in_cache(result, indices)
+
     def _save_result(  # type: ignore
         self, res: List[List[PerturbedUtteranceResult]], dm: DatasetSplitManager
     ):
-        """Compute tags related to Perturbation Tests"""
-        tags = {}
-        for idx, test_results in enumerate(res):
-            tag: Dict[Tag, bool] = {
-                SmartTag.failed_fuzzy_matching: any(
-                    t.failed
-                    for t in test_results
-                    if t.family == PerturbationTestFamily.fuzzy_matching
-                ),
-                SmartTag.failed_punctuation: any(
-                    t.failed for t in test_results if t.family == PerturbationTestFamily.punctuation
-                ),
+        """Compute tags related to Perturbation Tests, and save the results table."""
+        results = self._write_results_table(res)
+        failed_fuzzy_matching = get_failed_per_row(
+            results, PerturbationTestFamily.fuzzy_matching, len(res)
+        )
+        failed_punctuation = get_failed_per_row(
+            results, PerturbationTestFamily.punctuation, len(res)
+        )
+        tags: Dict[int, Dict[Tag, bool]] = {
+            idx: {
+                SmartTag.failed_fuzzy_matching: bool(fuzzy_matching),
+                SmartTag.failed_punctuation: bool(punctuation),
             }
-
-            tags[idx] = tag
+            for idx, (fuzzy_matching, punctuation) in enumerate(
+                zip(failed_fuzzy_matching, failed_punctuation)
+            )
+        }
         dm.add_tags(tags, self._get_table_key())
@@ -2,43 +2,21 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 
-from dataclasses import dataclass
-from typing import List, Optional
+from typing import List
 
 import pandas as pd
 
 from azimuth.config import PerturbationTestingConfig
 from azimuth.modules.base_classes import ComparisonModule
 from azimuth.modules.perturbation_testing import PerturbationTestingModule
-from azimuth.modules.task_execution import get_task_result
 from azimuth.types import DatasetSplitName, ModuleOptions
 from azimuth.types.perturbation_testing import (
-    PerturbationTestFailureReason,
-    PerturbationTestFamily,
     PerturbationTestingMergedResponse,
     PerturbationTestingSummaryResponse,
-    PerturbationTestName,
     PerturbationTestSummary,
-    PerturbationType,
     PerturbedUtteranceExample,
-    PerturbedUtteranceResult,
 )
 
-
-@dataclass
-class PerturbedUtteranceNeededInfo:
-    name: PerturbationTestName
-    description: str
-    family: PerturbationTestFamily
-    perturbation_type: PerturbationType
-    original_utterance: str
-    perturbed_utterance: str
-    confidence_delta: Optional[float]
-    dataset_split_name: DatasetSplitName
-    is_failed: bool
-    failure_reason: PerturbationTestFailureReason
-
-
 PERTURBATION_TEST_GROUPING = ["family", "name", "perturbation_type", "dataset_split_name"]
 
 
@@ -50,49 +28,33 @@ class PerturbationTestingSummaryModule(ComparisonModule[PerturbationTestingConfi
     def compute_on_dataset_split(  # type: ignore
         self,
     ) -> List[PerturbationTestingSummaryResponse]:
-        # Get all the test and make them into a DataFrame
-        all_tests = self.get_all_tests()
-        df = pd.DataFrame(all_tests)
-        grouped = df.groupby(PERTURBATION_TEST_GROUPING)
-        # We select the first example as the test example.
-        examples = grouped.first().reset_index()
-        # Compute failure rate per dataset_split.
-        grouped_with_set = grouped["is_failed"]
-        grouped_with_set_count = grouped_with_set.count().reset_index()
-        grouped_with_set_failed_count = grouped_with_set.sum().reset_index()
-        test_ratio = (grouped_with_set.sum() / grouped_with_set.count()).reset_index()
-        # Average confidence delta, we filter the -1 first
-        not_failed_grouped = df[df["confidence_delta"].notnull()].groupby(
-            PERTURBATION_TEST_GROUPING
-        )
-        average_delta = not_failed_grouped["confidence_delta"].mean().reset_index()
-
-        # Merge everything.
-
-        merged_df = pd.merge(
-            examples, test_ratio, on=PERTURBATION_TEST_GROUPING, suffixes=("", "_ratio")
-        )
-
-        merged_df = pd.merge(
-            merged_df,
-            grouped_with_set_count,
-            on=PERTURBATION_TEST_GROUPING,
-            suffixes=("", "_total_count"),
-        )
-        merged_df = pd.merge(
-            merged_df,
-            grouped_with_set_failed_count,
-            on=PERTURBATION_TEST_GROUPING,
-            suffixes=("", "_count"),
+        # Compute all statistics per test and dataset_split in a single group-by.
+        df = self.get_all_tests()
+        merged_df = (
+            df.assign(
+                confidence_delta_computed=df["confidence_delta"],
+                is_failed_total_count=df["is_failed"],
+                is_failed_count=df["is_failed"],
+            )
+            .groupby(PERTURBATION_TEST_GROUPING)
+            .agg(
+                {
+                    # We select the first example as the test example.
+                    "description": "first",
+                    "perturbed_utterance": "first",
+                    "row_idx": "first",
+                    "is_failed_total_count": "count",
+                    "is_failed_count": "sum",
+                    # Average confidence delta, nulls are ignored.
+                    "confidence_delta_computed": "mean",
+                }
+            )
+            .reset_index()
         )
-        # Merge left because average_delta can be empty.
-        merged_df = pd.merge(
-            merged_df,
-            average_delta,
-            how="left",
-            on=PERTURBATION_TEST_GROUPING,
-            suffixes=("", "_computed"),
+        merged_df["is_failed_ratio"] = (
+            merged_df["is_failed_count"] / merged_df["is_failed_total_count"]
         )
+        merged_df["original_utterance"] = self.get_original_utterances(merged_df)
         test_types_info = merged_df.groupby(PERTURBATION_TEST_GROUPING[:-1])
 
         result = []
@@ -144,55 +106,65 @@ class PerturbationTestingSummaryModule(ComparisonModule[PerturbationTestingConfi
             )
         return [PerturbationTestingSummaryResponse(all_tests_summary=result)]
 
-    def get_all_tests(self) -> List[PerturbedUtteranceNeededInfo]:
+    def get_all_tests(self) -> pd.DataFrame:
         """Get all CheckList test for all indices of all dataset splits.
 
         Returns:
-            A list with all the tests.
+            A DataFrame with a row per perturbed utterance.
         """
-        accumulator = []
+        frames = []
         for dataset_split_name in self.available_dataset_splits:
             all_tests = PerturbationTestingModule(
                 dataset_split_name=dataset_split_name,
                 config=self.config,
                 mod_options=ModuleOptions(pipeline_index=self.mod_options.pipeline_index),
             )
-            result = get_task_result(
-                task_module=all_tests, result_type=List[List[PerturbedUtteranceResult]]
+            df = (
+                all_tests.get_results_table()
+                .select(
+                    [
+                        "row_idx",
+                        "name",
+                        "description",
+                        "family",
+                        "perturbed_utterance",
+                        "perturbation_type",
+                        "confidence_delta",
+                        "failed",
+                    ]
+                )
+                .to_pandas()
             )
-            result_with_utterances = [
-                [
-                    PerturbedUtteranceNeededInfo(
-                        name=perturbed_utterance_result.name,
-                        description=perturbed_utterance_result.description,
-                        family=perturbed_utterance_result.family,
-                        original_utterance=original_utterance,
-                        perturbed_utterance=perturbed_utterance_result.perturbed_utterance,
-                        perturbation_type=perturbed_utterance_result.perturbation_type,
-                        confidence_delta=perturbed_utterance_result.confidence_delta,
-                        dataset_split_name=dataset_split_name,
-                        is_failed=perturbed_utterance_result.failed,
-                        failure_reason=perturbed_utterance_result.failure_reason,
-                    )
-                    for perturbed_utterance_result in perturbed_utterance_results
-                ]
-                for original_utterance, perturbed_utterance_results in zip(
-                    self.get_dataset_split(dataset_split_name)[self.config.columns.text_input],
-                    result,
+            frames.append(
+                df.rename(columns={"failed": "is_failed"}).assign(
+                    dataset_split_name=dataset_split_name
                 )
-            ]
-            # Merge all test
-            merged_result: List[PerturbedUtteranceNeededInfo] = sum(result_with_utterances, [])
-            accumulator += merged_result
-        return accumulator
+            )
+        return pd.concat(frames, ignore_index=True)
+
+    def get_original_utterances(self, df: pd.DataFrame) -> List[str]:
+        """Get the original utterance of each row, from its row_idx and dataset_split_name.
+
+        Args:
+            df: DataFrame with the row_idx and dataset_split_name columns.
+
+        Returns:
+            Original utterance of each row.
+        """
+        utterances = pd.Series(index=df.index, dtype=object)
+        for dataset_split_name, group in df.groupby("dataset_split_name"):
+            utterances[group.index] = self.get_dataset_split(dataset_split_name).select(
+                group["row_idx"].tolist()
+            )[self.config.columns.text_input]
+        result: List[str] = utterances.tolist()
+        return result
 
 
 class PerturbationTestingMergedModule(PerturbationTestingSummaryModule):
     """Failure rate per dataset split for perturbation tests."""
 
     def compute_on_dataset_split(self) -> List[PerturbationTestingMergedResponse]:  # type: ignore
-        all_tests = self.get_all_tests()
-        df = pd.DataFrame(all_tests)
+        df = self.get_all_tests()
 
         # Compute failure rate per dataset_split.
         grouped_with_set = df.groupby("dataset_split_name")["is_failed"]
@@ -2,8 +2,7 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 
-from functools import reduce
-from typing import List, Tuple, cast
+from typing import Any, List, Optional, cast
 
 from datasets import Dataset
 
@@ -14,6 +13,7 @@ from azimuth.modules.task_execution import get_task_result
 from azimuth.types import DatasetColumn, ModuleOptions, SupportedMethod
 from azimuth.types.task import SaliencyResponse
 from azimuth.types.word_analysis import TokensToWordsResponse
+from azimuth.utils.ml.tokens_to_words import join_word_pieces, merge_tokens
 
 
 class TokensToWordsModule(IndexableModule[ModelContractConfig]):
@@ -44,6 +44,31 @@ class TokensToWordsModule(IndexableModule[ModelContractConfig]):
         result = get_task_result(task_module=saliency_task, result_type=List[SaliencyResponse])
         return result
 
+    def get_word_ids(
+        self, batch: Dataset, tokens_saliencies: List[SaliencyResponse], tokenizer: Any
+    ) -> List[Optional[List[Optional[int]]]]:
+        """Get the word index of each token, from the fast tokenizer of the model.
+
+        Args:
+            batch: Batch of utterances.
+            tokens_saliencies: Tokens of each utterance, as given with the saliency.
+            tokenizer: Tokenizer of the model, if any.
+
+        Returns:
+            Word index of each token, or None for utterances whose tokens could not be matched.
+        """
+        if tokenizer is None or not tokenizer.is_fast:
+            return [None] * len(tokens_saliencies)
+        encodings = tokenizer(batch[self.config.columns.text_input], truncation=True)
+        return [
+            encodings.word_ids(idx)
+            if tokenizer.convert_ids_to_tokens(input_ids) == record.tokens
+            else None
+            for idx, (input_ids, record) in enumerate(
+                zip(encodings["input_ids"], tokens_saliencies)
+            )
+        ]
+
     def compute(self, batch: Dataset) -> List[TokensToWordsResponse]:  # type: ignore
         """Get words and their saliencies for a given set of indices.
 
@@ -54,35 +79,20 @@ class TokensToWordsModule(IndexableModule[ModelContractConfig]):
             Words and their Saliencies for utterances associated to indices.
 
         """
-        TokenSaliency = Tuple[str, float]
-
-        def make_words(results: List[TokenSaliency], x: TokenSaliency) -> List[TokenSaliency]:
-            tok, sal = x
-            if tok.startswith("##"):
-                if len(results) == 0:
-                    raise ValueError("First token is not a word.")
-                (l_tok, l_sal), rest = results[-1], results[:-1]
-                l_tok = l_tok + tok.lstrip("##")
-                l_sal = l_sal + sal
-                return rest + [(l_tok, l_sal)]
-            else:
-                return results + [x]
-
         tokens_saliencies = self.get_tokens_saliencies(
             cast(List[int], batch[DatasetColumn.row_idx])
         )
-        get_words_responses: List[TokensToWordsResponse] = []
-        for idx, record in enumerate(tokens_saliencies):
-            tokens = record.tokens
-            saliencies = record.saliency
-
-            words_saliencies: List[TokenSaliency] = reduce(make_words, zip(tokens, saliencies), [])
-            if words_saliencies:
-                all_words, saliency_per_word = list(map(list, zip(*words_saliencies)))
-            else:
-                all_words, saliency_per_word = [], []
-            get_words_responses.append(
-                TokensToWordsResponse(words=all_words, saliency=saliency_per_word)
-            )
-
-        return get_words_responses
+        tokenizer = getattr(self.get_model(), "tokenizer", None)
+        word_ids = self.get_word_ids(batch, tokens_saliencies, tokenizer)
+        all_words, saliency_per_word = merge_tokens(
+            [record.tokens for record in tokens_saliencies],
+            [record.saliency for record in tokens_saliencies],
+            word_ids,
+            tokens_to_string=(
+                tokenizer.convert_tokens_to_string if tokenizer is not None else join_word_pieces
+            ),
+        )
+        return [
+            TokensToWordsResponse(words=words, saliency=saliency)
+            for words, saliency in zip(all_words, saliency_per_word)
+        ]
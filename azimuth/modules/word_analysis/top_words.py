@@ -1,18 +1,20 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
+import os
 from collections import Counter
+from os.path import join as pjoin
 from typing import Dict, List, Tuple
 
 import numpy as np
-import spacy
+from filelock import FileLock
 
 from azimuth.config import TopWordsConfig
 from azimuth.modules.base_classes import FilterableModule
 from azimuth.modules.base_classes.dask_module import Worker
 from azimuth.modules.task_execution import get_task_result
 from azimuth.modules.word_analysis.tokens_to_words import TokensToWordsModule
-from azimuth.types import ModuleOptions
+from azimuth.types import DatasetColumn, ModuleOptions
 from azimuth.types.word_analysis import (
     TokensToWordsResponse,
     TopWordsImportanceCriteria,
@@ -20,8 +22,8 @@ from azimuth.types.word_analysis import (
     TopWordsResult,
 )
 from azimuth.utils.dataset_operations import get_predictions_from_ds
+from azimuth.utils.ml.word_saliency import WordSaliency
 from azimuth.utils.project import saliency_available
-from azimuth.utils.utterance import clean_utterance
 
 MIN_SALIENCY = 0.01
 
@@ -78,6 +80,34 @@ class TopWordsModule(FilterableModule[TopWordsConfig]):
         )
         return result
 
+    def get_word_saliency(self) -> WordSaliency:
+        """Get the saliency of the words of all utterances, computed the first time it is requested.
+
+        The table is saved next to the cache of TokensToWordsModule, so that it is computed once per
+        pipeline and dataset_split, whatever the filters.
+
+        Returns:
+            Saliency of the words, without cls/sep tokens.
+        """
+        words_task = TokensToWordsModule(
+            self.dataset_split_name,
+            self.config,
+            mod_options=ModuleOptions(pipeline_index=self.mod_options.pipeline_index),
+        )
+        path = pjoin(words_task.cache_dir, f"{words_task.name}_word_saliency.npz")
+        with FileLock(f"{path}.lock"):
+            if not os.path.exists(path):
+                indices = list(range(self.get_dataset_split_manager().num_rows))
+                words_saliencies = self.get_words_saliencies(indices)
+                tokenizer = self.get_model().tokenizer
+                WordSaliency.from_words(
+                    indices,
+                    [record.words for record in words_saliencies],
+                    [record.saliency for record in words_saliencies],
+                    excluded_words=[tokenizer.cls_token, tokenizer.sep_token],
+                ).save(path)
+        return WordSaliency.load(path)
+
     def compute_on_dataset_split(self) -> List[TopWordsResponse]:  # type: ignore
         """
         Compute most important words according to saliency maps, if available, or frequency for the
@@ -103,43 +133,52 @@ class TopWordsModule(FilterableModule[TopWordsConfig]):
                 )
             ]
 
-        important_words_per_idx: Dict[int, List[str]] = {}
+        is_error = np.array(
+            get_predictions_from_ds(ds, self.mod_options.without_postprocessing)
+        ) != np.array(ds[self.config.columns.label])
+        top_x = self.mod_options.top_x
+
         if importance_criteria == TopWordsImportanceCriteria.salient:
-            words_saliencies = self.get_words_saliencies(self.get_indices())
-            tokenizer = self.get_model().tokenizer
-            for idx, record in enumerate(words_saliencies):
-                # Put everything to lower case and remove cls/sep tokens.
-                words, saliencies = zip(
-                    *[
-                        (word.lower(), saliency_value)
-                        for word, saliency_value in zip(record.words, record.saliency)
-                        if word not in [tokenizer.cls_token, tokenizer.sep_token]
-                    ]
-                )
-                if words:
-                    importance_saliency = max(
-                        self.mod_options.th_importance * max(record.saliency), MIN_SALIENCY
+            word_saliency = self.get_word_saliency()
+            row_indices = np.array(ds[DatasetColumn.row_idx])
+
+            def most_important_words(indices: np.ndarray) -> List[TopWordsResult]:
+                return [
+                    TopWordsResult(word=word, count=count)
+                    for word, count in word_saliency.most_important_words(
+                        indices, self.mod_options.th_importance, MIN_SALIENCY, top_x
                     )
-                    important_words_per_idx[idx] = [
-                        word
-                        for word, _ in filter(
-                            lambda s: s[1] > importance_saliency, zip(words, saliencies)
-                        )
-                    ]
-        # If saliency is not available, we proxy important words as any word that is neither
-        # punctuation nor a stop word.
-        else:
-            spacy_model = spacy.load(self.config.syntax.spacy_model)
-            utterances = ds[self.config.columns.text_input]
-            for idx, utterance in enumerate(utterances):
-                doc = spacy_model(clean_utterance(utterance))
-                important_words_per_idx[idx] = [
-                    token.text for token in doc if not token.is_stop and not token.is_punct
                 ]
 
-        is_error = np.array(
-            get_predictions_from_ds(ds, self.mod_options.without_postprocessing)
-        ) != np.array(ds[self.config.columns.label])
+            return [
+                TopWordsResponse(
+                    all=most_important_words(row_indices),
+                    right=most_important_words(row_indices[~is_error]),
+                    errors=most_important_words(row_indices[is_error]),
+                    importance_criteria=importance_criteria,
+                )
+            ]
+
+        # If saliency is not available, we proxy important words as any word that is neither
+        # punctuation nor a stop word.
+        important_words_per_idx: Dict[int, List[str]] = {}
+        analysis = (
+            self.get_dataset_split_manager()
+            .get_linguistic_analysis(self.config.syntax.spacy_model)
+            .take(ds[DatasetColumn.row_idx])
+        )
+        for idx, (tokens, is_stop, is_punct) in enumerate(
+            zip(
+                analysis.column("tokens").to_pylist(),
+                analysis.column("is_stop").to_pylist(),
+                analysis.column("is_punct").to_pylist(),
+            )
+        ):
+            important_words_per_idx[idx] = [
+                token
+                for token, token_is_stop, token_is_punct in zip(tokens, is_stop, is_punct)
+                if not token_is_stop and not token_is_punct
+            ]
 
         important_words_all = []
         important_words_errors = []
@@ -151,8 +190,6 @@ class TopWordsModule(FilterableModule[TopWordsConfig]):
             else:
                 important_words_right.extend(important_words)
 
-        top_x = self.mod_options.top_x
-
         return [
             TopWordsResponse(
                 all=self.count_words(important_words_all, top_x),
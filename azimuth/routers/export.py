@@ -5,11 +5,13 @@
 import os
 import time
 from os.path import join as pjoin
-from typing import Dict, Generator, List, Optional
+from typing import Dict, Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from starlette.status import HTTP_404_NOT_FOUND
 
 from azimuth.app import (
@@ -20,14 +22,27 @@ from azimuth.app import (
 )
 from azimuth.config import AzimuthConfig
 from azimuth.dataset_split_manager import DatasetSplitManager, PredictionTableKey
+from azimuth.modules.perturbation_testing import PerturbationTestingModule
 from azimuth.task_manager import TaskManager
-from azimuth.types import DatasetColumn, DatasetSplitName, ModuleOptions, SupportedModule
+from azimuth.types import (
+    DatasetColumn,
+    DatasetSplitName,
+    ExportFormat,
+    ModuleOptions,
+    SupportedModule,
+)
 from azimuth.types.perturbation_testing import (
     PerturbationTestSummary,
     PerturbedUtteranceDetailedResult,
-    PerturbedUtteranceResult,
 )
-from azimuth.utils.conversion import orjson_dumps
+from azimuth.utils.dataset_operations import get_arrow_table
+from azimuth.utils.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_MEDIA_TYPES,
+    class_ids_to_names,
+    iter_export_bytes,
+)
+from azimuth.utils.ml.perturbation_results import get_results_column
 from azimuth.utils.project import perturbation_testing_available
 from azimuth.utils.routers import (
     get_last_update,
@@ -44,24 +59,28 @@ router = APIRouter()
 @router.get(
     "/dataset_splits/{dataset_split_name}/utterances",
     summary="Export dataset_split as csv.",
-    description="Export the dataset_split to a CSV file and returns it.",
-    response_class=FileResponse,
+    description="Export the dataset_split to a CSV (optionally compressed) or Parquet file and "
+    "streams it.",
+    response_class=StreamingResponse,
 )
 def export_dataset(
     dataset_split_manager: DatasetSplitManager = Depends(get_dataset_split_manager),
     pipeline_index: Optional[int] = Depends(query_pipeline_index),
     config: AzimuthConfig = Depends(get_config),
     use_bma: bool = Query(False, title="Use Bayesian Model Averaging for better estimation."),
-) -> FileResponse:
+    export_format: ExportFormat = Query(ExportFormat.csv, title="Format of the exported file."),
+) -> StreamingResponse:
     table_key = (
         None
         if pipeline_index is None
         else PredictionTableKey.from_pipeline_index(pipeline_index, config, use_bma=use_bma)
     )
-    path = dataset_split_manager.save_csv(table_key=table_key)
-
-    filename = os.path.basename(path)
-    return FileResponse(path=path, filename=filename)
+    filename = dataset_split_manager.get_export_filename(export_format)
+    return StreamingResponse(
+        dataset_split_manager.iter_export(table_key=table_key, export_format=export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get(
@@ -124,9 +143,9 @@ def get_export_perturbation_testing_summary(
 @router.get(
     "/dataset_splits/{dataset_split_name}/perturbed_utterances",
     summary="Export perturbed dataset split as json.",
-    description="Export the perturbed dataset split (training or evaluation) to a JSON file and "
-    "returns it.",
-    response_class=FileResponse,
+    description="Export the perturbed dataset split (training or evaluation) to a JSON, JSON Lines "
+    "or Parquet file and streams it.",
+    response_class=StreamingResponse,
     dependencies=[Depends(require_available_model)],
 )
 def get_export_perturbed_set(
@@ -136,69 +155,97 @@ def get_export_perturbed_set(
     pipeline_index: int = Depends(require_pipeline_index),
     config: AzimuthConfig = Depends(get_config),
     use_bma: bool = Query(False, title="Use Bayesian Model Averaging for better estimation."),
-) -> FileResponse:
+    export_format: ExportFormat = Query(ExportFormat.json, title="Format of the exported file."),
+) -> StreamingResponse:
     pipeline_index_not_null = assert_not_none(pipeline_index)
     file_label = time.strftime("%Y%m%d_%H%M%S", time.localtime())
 
-    filename = f"azimuth_export_modified_set_{config.name}_{dataset_split_name}_{file_label}.json"
-    path = pjoin(config.get_project_path(), filename)
+    filename = (
+        f"azimuth_export_modified_set_{config.name}_{dataset_split_name}_{file_label}"
+        f".{export_format.value}"
+    )
 
-    task_result: List[List[PerturbedUtteranceResult]] = get_standard_task_result(
-        SupportedModule.PerturbationTesting,
-        dataset_split_name,
-        task_manager,
+    _, task = task_manager.get_task(
+        task_name=SupportedModule.PerturbationTesting,
+        dataset_split_name=dataset_split_name,
         mod_options=ModuleOptions(pipeline_index=pipeline_index_not_null),
     )
-
-    output = list(
-        make_utterance_level_result(
-            dataset_split_manager,
-            task_result,
-            pipeline_index=pipeline_index_not_null,
-            config=config,
-            use_bma=use_bma,
+    if not isinstance(task, PerturbationTestingModule):
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail=f"Task not found {SupportedModule.PerturbationTesting}",
         )
+    # Wait for the results and the smart tags. The results table is read from disk, or made from
+    # `task.result()` if it was not saved, such as for results cached before the table existed.
+    task.wait()
+    results = task.get_results_table()
+    task.clear()
+
+    tables = make_utterance_level_result(
+        dataset_split_manager,
+        results,
+        table_key=PredictionTableKey.from_pipeline_index(
+            pipeline_index_not_null, config, use_bma=use_bma
+        ),
+    )
+    return StreamingResponse(
+        iter_export_bytes(tables, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    with open(path, "w") as f:
-        f.write(orjson_dumps(output).decode())
-    return FileResponse(path=path, filename=filename)
 
 
 def make_utterance_level_result(
     dm: DatasetSplitManager,
-    results: List[List[PerturbedUtteranceResult]],
-    pipeline_index: int,
-    config: AzimuthConfig,
-    use_bma: bool,
-) -> Generator[Dict, None, None]:
-    """Massage perturbation testing results for the frontend.
+    results: pa.Table,
+    table_key: PredictionTableKey,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[pa.Table]:
+    """Massage perturbation testing results for the export, chunk by chunk.
+
+    Only a chunk of perturbed utterances and their original utterances are gathered at a time, so
+    the memory used doesn't grow with the number of perturbed utterances.
 
     Args:
         dm: Current DatasetSplitManager.
-        results: Output of Perturbation Testing.
-        pipeline_index: Index of the pipeline that made the results.
-        config: Azimuth config
-        use_bma: Use Bayesian Model Averaging for better estimation.
+        results: Results of Perturbation Testing, as made by `make_perturbation_results_table`.
+        table_key: Which pipeline predictions to use for the original utterances.
+        chunk_size: Number of perturbed utterances to convert at once.
 
     Returns:
-        Generator that yield json-able object for the frontend.
-
+        Tables with the columns of PerturbedUtteranceDetailedResult, and class names instead of
+            class ids.
     """
-    for idx, (utterance, test_results) in enumerate(
-        zip(
-            dm.get_dataset_split(
-                PredictionTableKey.from_pipeline_index(pipeline_index, config, use_bma=use_bma)
+    ds = dm.get_dataset_split(table_key)
+    class_names = np.array(dm.get_class_names(), dtype=object)
+    for start in range(0, max(results.num_rows, 1), chunk_size):
+        chunk = results.slice(start, chunk_size)
+        row_indices = get_results_column(chunk, "row_idx")
+        originals = get_arrow_table(ds, row_indices)
+        confidences = (
+            originals.column(DatasetColumn.postprocessed_confidences).combine_chunks().flatten()
+        )
+        columns = {
+            **{name: chunk.column(name) for name in chunk.column_names},
+            "prediction": class_ids_to_names(
+                chunk.column("prediction").combine_chunks(), class_names
+            ),
+            "original_prediction": class_ids_to_names(
+                originals.column(DatasetColumn.postprocessed_prediction).combine_chunks(),
+                class_names,
+            ),
+            # The confidence of the predicted class comes first.
+            "original_confidence": pa.array(
+                confidences.to_numpy().reshape(len(row_indices), -1)[:, 0]
+                if len(row_indices)
+                else [],
+                type=pa.float64(),
+            ),
+            "label": class_ids_to_names(
+                originals.column(dm.config.columns.label).combine_chunks(), class_names
             ),
-            results,
+            "original_utterance": originals.column(dm.config.columns.text_input),
+        }
+        yield pa.table(
+            {name: columns[name] for name in PerturbedUtteranceDetailedResult.__fields__}
         )
-    ):
-        for test in test_results:
-            yield PerturbedUtteranceDetailedResult(
-                original_prediction=dm.get_class_names()[
-                    utterance[DatasetColumn.postprocessed_prediction]
-                ],
-                original_utterance=utterance[dm.config.columns.text_input],
-                original_confidence=utterance[DatasetColumn.postprocessed_confidences][0],
-                label=dm.get_class_names()[utterance[dm.config.columns.label]],
-                **{**test.dict(), "prediction": dm.get_class_names()[test.prediction]},
-            ).dict()
@@ -46,6 +46,7 @@ def get_confidence_histogram(
         task_manager=task_manager,
         mod_options=mod_options,
         last_update=dataset_split_manager.last_update,
+        last_update_excluding_data_actions=dataset_split_manager.last_update_excluding_data_actions,
     )[0]
 
     return result
@@ -54,6 +54,7 @@ def get_metrics(
         task_manager,
         mod_options=mod_options,
         last_update=dataset_split_manager.last_update,
+        last_update_excluding_data_actions=dataset_split_manager.last_update_excluding_data_actions,
     )
 
     api_response = MetricsModule.module_to_api_response(module_response)
@@ -88,6 +89,7 @@ def get_metrics_per_filter(
         task_manager,
         mod_options=mod_options,
         last_update=dataset_split_manager.last_update,
+        last_update_excluding_data_actions=dataset_split_manager.last_update_excluding_data_actions,
     )[0]
 
     api_result = MetricsPerFilterAPIResponse(
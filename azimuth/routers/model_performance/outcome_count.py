@@ -79,6 +79,7 @@ def get_outcome_count_per_filter(
         task_manager,
         mod_options=mod_options,
         last_update=dataset_split_manager.last_update,
+        last_update_excluding_data_actions=dataset_split_manager.last_update_excluding_data_actions,
     )[0]
 
     return task_result
@@ -53,7 +53,14 @@ def get_count_per_filter(
     config: AzimuthConfig = Depends(get_config),
 ) -> UtteranceCountPerFilterResponse:
     full_ds = dataset_split_manager.get_dataset_split_with_class_names()
-    ds = filter_dataset_split(full_ds, named_filters, config)
+    ds = filter_dataset_split(
+        full_ds,
+        named_filters,
+        config,
+        utterance_index=dataset_split_manager.get_utterance_index()
+        if named_filters.utterance is not None
+        else None,
+    )
     class_names = dataset_split_manager.get_class_names()
 
     label_counter = merge_counters(
@@ -5,6 +5,7 @@ from copy import copy
 from enum import Enum
 from typing import Dict, List, Optional
 
+import numpy as np
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from starlette.status import HTTP_404_NOT_FOUND
 
@@ -22,6 +23,7 @@ from azimuth.types import (
     DatasetSplitName,
     ModuleOptions,
     NamedDatasetFilters,
+    PaginationCursor,
     PaginationParams,
     SupportedMethod,
     SupportedModule,
@@ -45,7 +47,7 @@ from azimuth.types.utterance import (
     Utterance,
     UtterancePatch,
 )
-from azimuth.utils.dataset_operations import filter_dataset_split
+from azimuth.utils.dataset_operations import get_filters_mask
 from azimuth.utils.project import (
     perturbation_testing_available,
     postprocessing_known,
@@ -55,7 +57,10 @@ from azimuth.utils.project import (
 )
 from azimuth.utils.routers import (
     build_named_dataset_filters,
+    get_cursor_position,
+    get_first_rows_in_mask,
     get_pagination,
+    get_sort_key,
     get_standard_task_result,
     query_pipeline_index,
     require_available_model,
@@ -107,49 +112,95 @@ def get_utterances(
         threshold, table_key = None, None
 
     ds = dataset_split_manager.get_dataset_split(table_key)
-    if indices is not None:
-        ds = ds.select(indices)
-    ds = filter_dataset_split(
-        ds,
-        named_filters.to_dataset_filters(dataset_split_manager.get_class_names()),
-        config,
-        without_postprocessing,
-    )
-    ds = dataset_split_manager.get_dataset_split_with_class_names(table_key=table_key).select(
-        ds[DatasetColumn.row_idx]
+    dataset_filters = named_filters.to_dataset_filters(dataset_split_manager.get_class_names())
+    utterance_index = (
+        dataset_split_manager.get_utterance_index() if named_filters.utterance is not None else None
     )
+    cursor = pagination.cursor if pagination is not None else None
 
-    # We create _top_conf and _top_prediction because we can't sort on columns made of lists.
-    # They start with an underscore to emphasize that they are not saved and that therefore they
-    # should not be used anywhere else.
+    sort_by_column: str
     if sort_by == UtterancesSortableColumn.confidence and pipeline_index is not None:
-        sort_by_column = "_top_conf"
-        column = (
+        sort_by_column = (
             DatasetColumn.model_confidences
             if without_postprocessing
             else DatasetColumn.postprocessed_confidences
         )
-        ds = ds.map(lambda i: {sort_by_column: i[column][0]})
     elif sort_by == UtterancesSortableColumn.prediction and pipeline_index is not None:
-        if without_postprocessing:
-            sort_by_column = "_top_prediction"
-            ds = ds.map(lambda i: {sort_by_column: i[DatasetColumn.model_predictions][0]})
-        else:
-            sort_by_column = DatasetColumn.postprocessed_prediction
+        sort_by_column = (
+            DatasetColumn.model_predictions
+            if without_postprocessing
+            else DatasetColumn.postprocessed_prediction
+        )
     elif sort_by == UtterancesSortableColumn.utterance:
         sort_by_column = config.columns.text_input
     elif sort_by == UtterancesSortableColumn.label:
         sort_by_column = config.columns.label
     else:
         sort_by_column = DatasetColumn.row_idx
-    ds = ds.sort(sort_by_column, reverse=descending)
+    # The order of all rows is computed once per version of the tables. Keeping the rows in the
+    # mask keeps them sorted, so only the rows of the page are selected.
+    row_indices = dataset_split_manager.get_sorted_row_indices(
+        sort_by_column, table_key=table_key, descending=descending
+    )
+    sort_version = dataset_split_manager.get_sort_version(table_key)
+    has_next_page = False
+    if pagination is not None and cursor is not None:
+
+        def get_mask(rows: np.ndarray) -> Optional[np.ndarray]:
+            return get_filters_mask(
+                ds.select(rows, keep_in_memory=True),
+                dataset_filters,
+                config,
+                without_postprocessing,
+                utterance_index=utterance_index,
+            )
 
-    utterance_count = len(ds)  # Before pagination to get the full length.
-    if pagination is not None:
-        indices = ds[DatasetColumn.row_idx][
-            pagination.offset : pagination.offset + pagination.limit
-        ]
-        ds = ds.filter(lambda i: i in indices, input_columns=DatasetColumn.row_idx)
+        # Resume after the row of the cursor, only filtering the next rows.
+        start = get_cursor_position(
+            cursor, ds, row_indices, sort_by_column, descending, sort_version
+        )
+        row_indices = row_indices[start:]
+        if indices is None:
+            # The count does not depend on the cursor, so it is computed once per version.
+            utterance_count = dataset_split_manager.get_filtered_count(
+                dataset_filters, table_key, without_postprocessing
+            )
+        else:
+            row_indices = row_indices[np.isin(row_indices, indices)]
+            indices_mask = get_mask(np.unique(indices))
+            utterance_count = (
+                len(np.unique(indices)) if indices_mask is None else int(indices_mask.sum())
+            )
+        row_indices = get_first_rows_in_mask(row_indices, get_mask, pagination.limit + 1)
+        has_next_page = len(row_indices) > pagination.limit
+        row_indices = row_indices[: pagination.limit]
+    else:
+        mask = get_filters_mask(
+            ds, dataset_filters, config, without_postprocessing, utterance_index=utterance_index
+        )
+        if indices is not None:
+            in_indices = np.zeros(len(ds), dtype=bool)
+            in_indices[indices] = True
+            mask = in_indices if mask is None else mask & in_indices
+        utterance_count = len(row_indices) if mask is None else int(mask.sum())
+        if mask is not None:
+            row_indices = row_indices[mask[row_indices]]
+        if pagination is not None:
+            has_next_page = pagination.offset + pagination.limit < utterance_count
+            row_indices = row_indices[pagination.offset : pagination.offset + pagination.limit]
+    next_cursor = (
+        PaginationCursor(
+            column=sort_by_column,
+            descending=descending,
+            sort_key=get_sort_key(ds, row_indices[-1], sort_by_column),
+            row_idx=row_indices[-1],
+            version=list(sort_version),
+        ).encode()
+        if has_next_page
+        else None
+    )
+    # Class names are only decoded for the returned rows.
+    ds = dataset_split_manager.decode_class_names(ds.select(row_indices))
 
     if utterance_count == 0:
         # No utterances, empty response.
@@ -213,7 +264,10 @@ def get_utterances(
     ]
 
     return GetUtterancesResponse(
-        utterances=utterances, utterance_count=utterance_count, confidence_threshold=threshold
+        utterances=utterances,
+        utterance_count=utterance_count,
+        confidence_threshold=threshold,
+        next_cursor=next_cursor,
     )
 
 
@@ -340,18 +394,12 @@ def get_similar(
         else None
     )
 
-    neighbors_ds_with_class_names = neighbors_ds.get_dataset_split_with_class_names(table_key)
-
-    # We need to get the pipeline_index for full output with predicted class and confidence.
-    source_ds = dataset_split_manager.get_dataset_split(table_key=table_key)
-
     # Get a list of indices and scores.
-    item_scores = dict(
-        source_ds.select([index])[f"neighbors_{neighbors_dataset_split_name}"][0][:limit]
-    )
-    items: Dict[int, Dict] = {
-        idx: neighbors_ds_with_class_names[int(idx)] for idx in item_scores.keys()
-    }
+    (source_row,) = dataset_split_manager.get_rows([index], with_class_names=False)
+    item_scores = dict(source_row[f"neighbors_{neighbors_dataset_split_name}"][:limit])
+    # We need to get the pipeline_index for full output with predicted class and confidence.
+    neighbor_rows = neighbors_ds.get_rows([int(idx) for idx in item_scores], table_key=table_key)
+    items: Dict[int, Dict] = dict(zip(item_scores.keys(), neighbor_rows))
     # Build utterances from `items`
     similar_utterances = [
         SimilarUtterance(
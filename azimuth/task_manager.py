@@ -99,6 +99,7 @@ class TaskManager:
         mod_options: Optional[ModuleOptions] = None,
         last_update: float = -1,
         dependencies: Optional[List[DaskModule]] = None,
+        last_update_excluding_data_actions: Optional[float] = None,
     ) -> Tuple[str, Optional[DaskModule]]:
         """Get the task `name` run on indices.
 
@@ -110,6 +111,8 @@ class TaskManager:
             mod_options: Options for the module.
             last_update: Last known update of the dataset_split.
             dependencies: Which Modules should complete before this one.
+            last_update_excluding_data_actions: Last known update of the dataset_split, ignoring
+                updates where only data actions changed.
 
         Returns:
             Key and task.
@@ -140,7 +143,9 @@ class TaskManager:
             key = task.task_id
             task = self.current_tasks.setdefault(key, task)
 
-            is_expired = isinstance(task, ExpirableMixin) and task.is_expired(last_update)
+            is_expired = isinstance(task, ExpirableMixin) and task.is_expired(
+                last_update, last_update_excluding_data_actions
+            )
             if task.should_be_started() or is_expired:
                 if dependencies is not None:
                     dependencies = [d for d in dependencies if not d.done()]
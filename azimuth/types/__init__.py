@@ -3,11 +3,12 @@ from azimuth.types.general.alias_model import (
     AliasModel,
     InputResponse,
     ModuleResponse,
+    PaginationCursor,
     PaginationParams,
     PlotSpecification,
 )
 from azimuth.types.general.array_type import Array
-from azimuth.types.general.dataset import DatasetColumn, DatasetSplitName
+from azimuth.types.general.dataset import DatasetColumn, DatasetSplitName, ExportFormat
 from azimuth.types.general.modules import (
     SupportedMethod,
     SupportedModelContract,
@@ -2,11 +2,19 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 
-from typing import Dict, List
+import base64
+from typing import Dict, List, Optional, Union
 
 import numpy as np
 import orjson
-from pydantic import BaseModel, Extra, Field
+from pydantic import (
+    BaseModel,
+    Extra,
+    Field,
+    StrictFloat,
+    StrictInt,
+    StrictStr,
+)
 
 from azimuth.utils.conversion import orjson_dumps
 from azimuth.utils.openapi import fix_union_types
@@ -56,7 +64,44 @@ class InputResponse(ModuleResponse):
 
 class PaginationParams(AliasModel):
     limit: int = Field(..., title="Limit")
-    offset: int = Field(..., title="Offset")
+    offset: int = Field(0, title="Offset")
+    cursor: Optional[str] = Field(None, title="Cursor", nullable=True)
+
+
+class PaginationCursor(AliasModel):
+    """Position after the last row of a page, in the order of the rows.
+
+    It is sent to clients as an opaque string, from `PaginationCursor.encode()`.
+    """
+
+    column: str = Field(..., title="Column the rows are sorted by")
+    descending: bool = Field(..., title="Descending")
+    sort_key: Union[StrictInt, StrictFloat, StrictStr, None] = Field(
+        ..., title="Sort key of the last row"
+    )
+    row_idx: int = Field(..., title="row_idx of the last row")
+    version: List[Optional[float]] = Field(..., title="Version of the sort order")
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(orjson.dumps(self.dict())).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "PaginationCursor":
+        """Get back a cursor from its opaque string.
+
+        Args:
+            cursor: String from `PaginationCursor.encode()`.
+
+        Returns:
+            The cursor.
+
+        Raises:
+            ValueError: If the string is not a cursor.
+        """
+        try:
+            return cls.parse_obj(orjson.loads(base64.urlsafe_b64decode(cursor.encode())))
+        except ValueError as e:  # Includes errors from base64, JSON and validation.
+            raise ValueError("Invalid cursor.") from e
 
 
 class PlotSpecification(AliasModel):
@@ -23,3 +23,11 @@ class DatasetColumn(str, Enum):
     word_count = "word_count"
     neighbors_train = f"neighbors_{DatasetSplitName.train}"
     neighbors_eval = f"neighbors_{DatasetSplitName.eval}"
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    csv_gz = "csv.gz"
+    parquet = "parquet"
+    json = "json"
+    jsonl = "jsonl"
@@ -64,6 +64,9 @@ class GetUtterancesResponse(AliasModel):
     confidence_threshold: Optional[float] = Field(
         ..., title="Confidence threshold in the selected pipeline (if any)", nullable=True
     )
+    next_cursor: Optional[str] = Field(
+        None, title="Cursor to the next page (if any), when paginating", nullable=True
+    )
 
     class Config:
         schema_extra = {
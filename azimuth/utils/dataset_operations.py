@@ -1,21 +1,30 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from typing import List, Union, cast
+from typing import List, Optional, Sequence, Union, cast
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from datasets import Dataset
 
 from azimuth.config import ProjectConfig
 from azimuth.types import DatasetColumn, DatasetFilters, NamedDatasetFilters
 from azimuth.types.outcomes import OutcomeName
 from azimuth.types.tag import (
+    ALL_DATA_ACTION_FILTERS,
     ALL_DATA_ACTIONS,
     SMART_TAGS_FAMILY_MAPPING,
     DataAction,
     SmartTag,
     SmartTagFamily,
 )
+from azimuth.utils.ml.model_performance import get_outcome_codes
 from azimuth.utils.utterance import clean_utterance
+from azimuth.utils.utterance_index import UtteranceIndex
+
+# Above this number of selected rows, they are taken from whole columns instead of gathered.
+GATHER_MAX_ROWS = 1_000
 
 
 def filter_dataset_split(
@@ -23,107 +32,197 @@ def filter_dataset_split(
     filters: Union[DatasetFilters, NamedDatasetFilters],
     config: ProjectConfig,
     without_postprocessing: bool = False,
+    utterance_index: Optional[UtteranceIndex] = None,
 ) -> Dataset:
     """Filter dataset_split according to a filter component.
 
+    All filters are combined in a single boolean mask, computed on whole columns, and the rows are
+    selected once.
+
     Args:
         dataset_split: examples to filter.
         filters: On what to filter on.
         config: Azimuth Config.
         without_postprocessing: Filter on columns without_postprocessing (model)
+        utterance_index: Index of the utterances to search, instead of scanning all rows.
 
     Returns:
         Filtered dataset_split.
 
-    Raises:
-        ValueError, if required column to filter by is not in the dataset_split's columns.
+    """
+    mask = get_filters_mask(dataset_split, filters, config, without_postprocessing, utterance_index)
+    if mask is None:
+        return dataset_split
+    return cast(Dataset, dataset_split.select(np.flatnonzero(mask), keep_in_memory=True))
+
+
+def get_filters_mask(
+    dataset_split: Dataset,
+    filters: Union[DatasetFilters, NamedDatasetFilters],
+    config: ProjectConfig,
+    without_postprocessing: bool = False,
+    utterance_index: Optional[UtteranceIndex] = None,
+) -> Optional[np.ndarray]:
+    """Get the boolean mask of the rows matching all filters.
+
+    Filters on columns that are not in the dataset_split are ignored.
+
+    Args:
+        dataset_split: examples to filter.
+        filters: On what to filter on.
+        config: Azimuth Config.
+        without_postprocessing: Filter on columns without_postprocessing (model)
+        utterance_index: Index of the utterances to search, instead of scanning all rows.
+
+    Returns:
+        Mask of shape [len(dataset_split)], or None if no filter applies.
 
     """
+    if filters == type(filters)():
+        return None
+    columns = set(dataset_split.column_names)
+    masks = []
     if filters.confidence_min > 0 or filters.confidence_max < 1:
         confidence_column = (
             DatasetColumn.model_confidences
             if without_postprocessing
             else DatasetColumn.postprocessed_confidences
         )
-        if confidence_column in dataset_split.column_names:
-            dataset_split = dataset_split.filter(
-                lambda x: filters.confidence_min <= x[0] <= filters.confidence_max,
-                input_columns=confidence_column,
+        if confidence_column in columns:
+            confidences = get_array_from_ds(dataset_split, confidence_column)[:, 0]
+            masks.append(
+                (filters.confidence_min <= confidences) & (confidences <= filters.confidence_max)
             )
-    if len(filters.label) > 0 and dataset_split.num_rows != 0:
-        dataset_split = dataset_split.filter(
-            lambda x: x in filters.label, input_columns=config.columns.label
+    if len(filters.label) > 0:
+        masks.append(
+            np.isin(get_column_from_ds(dataset_split, config.columns.label), filters.label)
         )
-    if filters.utterance is not None and dataset_split.num_rows != 0:
+    if filters.utterance is not None and utterance_index is not None:
+        matches = utterance_index.search(filters.utterance)
+        masks.append(np.isin(get_column_from_ds(dataset_split, DatasetColumn.row_idx), matches))
+    elif filters.utterance is not None:
         cleaned_utterance = clean_utterance(filters.utterance)
         # Filter in utterances or if string matches a known row_idx or persistent_id
-        dataset_split = dataset_split.filter(
-            lambda text, idx, persistent_id: cleaned_utterance in clean_utterance(text)
-            or filters.utterance == str(idx)
-            or filters.utterance == str(persistent_id),
-            input_columns=[
-                config.columns.text_input,
-                DatasetColumn.row_idx,
-                config.columns.persistent_id,
-            ],
-        )
-    if len(filters.prediction) > 0 and dataset_split.num_rows != 0:
-        prediction_column = (
-            DatasetColumn.model_predictions
-            if without_postprocessing
-            else DatasetColumn.postprocessed_prediction
+        masks.append(
+            np.array(
+                [
+                    cleaned_utterance in clean_utterance(text)
+                    for text in get_column_from_ds(dataset_split, config.columns.text_input)
+                ],
+                dtype=bool,
+            )
+            | (
+                get_column_from_ds(dataset_split, DatasetColumn.row_idx).astype(str)
+                == filters.utterance
+            )
+            | (
+                get_column_from_ds(dataset_split, config.columns.persistent_id).astype(str)
+                == filters.utterance
+            )
         )
-        if prediction_column in dataset_split.column_names:
-            if without_postprocessing:
-                dataset_split = dataset_split.filter(
-                    lambda x: x[0] in filters.prediction,
-                    input_columns=DatasetColumn.model_predictions,
-                )
-            else:
-                dataset_split = dataset_split.filter(
-                    lambda x: x in filters.prediction,
-                    input_columns=DatasetColumn.postprocessed_prediction,
-                )
-    if len(filters.data_action) > 0 and dataset_split.num_rows != 0:
+    if len(filters.prediction) > 0:
+        if without_postprocessing and DatasetColumn.model_predictions in columns:
+            predictions = get_array_from_ds(dataset_split, DatasetColumn.model_predictions)[:, 0]
+            masks.append(np.isin(predictions, filters.prediction))
+        elif not without_postprocessing and DatasetColumn.postprocessed_prediction in columns:
+            predictions = get_column_from_ds(dataset_split, DatasetColumn.postprocessed_prediction)
+            masks.append(np.isin(predictions, filters.prediction))
+    if len(filters.data_action) > 0:
         # We do OR for data_action tags.
-        dataset_split = dataset_split.filter(
-            lambda x: any(
-                ((not any(x[v] for v in ALL_DATA_ACTIONS)) if v == DataAction.no_action else x[v])
-                for v in filters.data_action
+        masks.append(
+            _get_tags_mask(
+                dataset_split,
+                selected_tags=filters.data_action,
+                family=ALL_DATA_ACTIONS,
+                no_tag=DataAction.no_action,
             )
         )
-    if len(filters.outcome) > 0 and dataset_split.num_rows != 0:
+    if len(filters.outcome) > 0:
         outcome_column = (
             DatasetColumn.model_outcome
             if without_postprocessing
             else DatasetColumn.postprocessed_outcome
         )
-        if outcome_column in dataset_split.column_names:
-            # We do OR for outcomes.
-            dataset_split = dataset_split.filter(
-                lambda x: x in filters.outcome, input_columns=outcome_column
-            )
+        if outcome_column in columns:
+            # We do OR for outcomes. Compared in Arrow, without converting to Python strings.
+            outcomes = get_arrow_column(dataset_split, outcome_column)
+            value_set = pa.array([outcome.value for outcome in filters.outcome], type=pa.string())
+            masks.append(np.asarray(pc.is_in(outcomes, value_set=value_set).to_numpy()))
     for key, tags_in_family in filters.smart_tags.items():
         # For each smart tag family, we do OR, but AND between families
         # If NO_SMART_TAGS, it is none of them.
-        family = cast(SmartTagFamily, key)
-        if (
-            len(tags_in_family) > 0
-            and all(tag in dataset_split.column_names for tag in SMART_TAGS_FAMILY_MAPPING[family])
-            and dataset_split.num_rows != 0
-        ):
-            dataset_split = dataset_split.filter(
-                lambda x: any(
-                    (
-                        (not any(x[tag] for tag in SMART_TAGS_FAMILY_MAPPING[family]))
-                        if tag_f == SmartTag.no_smart_tag
-                        else x[tag_f]
-                    )
-                    for tag_f in tags_in_family
+        family = SMART_TAGS_FAMILY_MAPPING[cast(SmartTagFamily, key)]
+        if len(tags_in_family) > 0 and all(tag in columns for tag in family):
+            masks.append(
+                _get_tags_mask(
+                    dataset_split,
+                    selected_tags=tags_in_family,
+                    family=family,
+                    no_tag=SmartTag.no_smart_tag,
                 )
             )
 
-    return dataset_split
+    if not masks:
+        return None
+    return cast(np.ndarray, np.logical_and.reduce(masks))
+
+
+def _get_tags_mask(
+    dataset_split: Dataset, selected_tags: Sequence[str], family: Sequence[str], no_tag: str
+) -> np.ndarray:
+    """Get the rows with any of the selected tags.
+
+    Args:
+        dataset_split: Dataset Split with the tag columns.
+        selected_tags: Tags to select.
+        family: All tags of the family, such as ALL_DATA_ACTIONS.
+        no_tag: Tag selecting the rows with none of the family tags.
+
+    Returns:
+        Boolean mask of shape [len(dataset_split)].
+    """
+    tags = {tag: get_column_from_ds(dataset_split, tag).astype(bool) for tag in family}
+    mask = np.zeros(len(dataset_split), dtype=bool)
+    for tag in selected_tags:
+        if tag == no_tag:
+            mask |= ~np.logical_or.reduce(list(tags.values()), initial=False)
+        else:
+            mask |= (
+                tags[tag] if tag in tags else get_column_from_ds(dataset_split, tag).astype(bool)
+            )
+    return mask
+
+
+def get_data_action_memberships(dataset_split: Dataset) -> np.ndarray:
+    """Get whether each row has each data action, including NO_ACTION.
+
+    Args:
+        dataset_split: Dataset Split with the data action columns.
+
+    Returns:
+        Boolean array of shape [len(dataset_split), len(ALL_DATA_ACTION_FILTERS)].
+    """
+    tags = {tag: get_column_from_ds(dataset_split, tag).astype(bool) for tag in ALL_DATA_ACTIONS}
+    no_action = ~np.logical_or.reduce(list(tags.values()), initial=False)
+    return np.column_stack(
+        [
+            no_action if data_action == DataAction.no_action else tags[data_action]
+            for data_action in ALL_DATA_ACTION_FILTERS
+        ]
+    ).reshape(len(dataset_split), len(ALL_DATA_ACTION_FILTERS))
+
+
+def get_column_from_ds(ds: Dataset, column: str) -> np.ndarray:
+    """Get a column of scalars as an array, without converting each row to a Python object.
+
+    Args:
+        ds: Dataset Split from which to get the column.
+        column: Column of scalars, such as the labels or a tag.
+
+    Returns:
+        Array of shape [len(ds)].
+    """
+    return cast(np.ndarray, get_arrow_column(ds, column).to_numpy())
 
 
 def get_predictions_from_ds(ds: Dataset, without_postprocessing: bool = False) -> List[int]:
@@ -136,12 +235,14 @@ def get_predictions_from_ds(ds: Dataset, without_postprocessing: bool = False) -
     Returns: List of Predictions
     """
     if without_postprocessing:
-        return cast(List[int], [preds[0] for preds in ds[DatasetColumn.model_predictions]])
+        return cast(
+            List[int], get_array_from_ds(ds, DatasetColumn.model_predictions)[:, 0].tolist()
+        )
     else:
         return cast(List[int], ds[DatasetColumn.postprocessed_prediction])
 
 
-def get_confidences_from_ds(ds: Dataset, without_postprocessing: bool = False) -> List[List[float]]:
+def get_confidences_from_ds(ds: Dataset, without_postprocessing: bool = False) -> np.ndarray:
     """Get confidences, with or without postprocessing.
 
     Notes: Confidences are sorted according to their values (not the class id).
@@ -150,14 +251,134 @@ def get_confidences_from_ds(ds: Dataset, without_postprocessing: bool = False) -
         ds: Dataset Split for which to get confidences.
         without_postprocessing: Determine which column to use.
 
-    Returns: List of Confidences
+    Returns: Array of Confidences, with shape [len(ds), num_classes]
     """
-    confidences = (
-        ds[DatasetColumn.model_confidences]
+    confidence_column = (
+        DatasetColumn.model_confidences
         if without_postprocessing
-        else ds[DatasetColumn.postprocessed_confidences]
+        else DatasetColumn.postprocessed_confidences
+    )
+    return get_array_from_ds(ds, confidence_column)
+
+
+def get_array_from_ds(ds: Dataset, column: str) -> np.ndarray:
+    """Get a column where all rows have the same length as a 2D array.
+
+    The values are read from the Arrow buffers, without converting each row to a Python list. When
+    `ds` is not a selection of rows, the array is a read-only view on the dataset.
+
+    Args:
+        ds: Dataset Split from which to get the column.
+        column: Column of lists, such as `DatasetColumn.model_confidences`.
+
+    Returns:
+        Array of shape [len(ds), width], with NaN on null rows.
+
+    Raises:
+        ValueError: If the rows have different lengths.
+    """
+    return _arrow_lists_to_array(get_arrow_column(ds, column))
+
+
+def _arrow_lists_to_array(chunked_array: pa.ChunkedArray) -> np.ndarray:
+    """Convert a column of lists of the same length to a 2D array.
+
+    Args:
+        chunked_array: Column of lists, with possibly null rows.
+
+    Returns:
+        Array of shape [len(chunked_array), width], with NaN on null rows.
+
+    Raises:
+        ValueError: If the rows have different lengths.
+    """
+    if pa.types.is_fixed_size_list(chunked_array.type):
+        width = chunked_array.type.list_size
+    else:
+        # The width is checked on all rows, as any of them can be null.
+        lengths = pc.min_max(pc.list_value_length(chunked_array)).as_py()
+        if lengths["min"] != lengths["max"]:
+            raise ValueError("All rows must have the same length to get a 2D array.")
+        width = lengths["max"] or 0
+    valid = chunked_array
+    if chunked_array.null_count:
+        valid = chunked_array.filter(pc.is_valid(chunked_array))
+    chunks = [chunk.flatten().to_numpy() for chunk in valid.chunks]
+    values: np.ndarray = (
+        chunks[0] if len(chunks) == 1 else np.concatenate(chunks) if chunks else np.empty(0)
     )
-    return cast(List[List[float]], confidences)
+    values = values.reshape(len(valid), width)
+    if not chunked_array.null_count:
+        return values
+    result = np.full((len(chunked_array), width), np.nan)
+    result[pc.is_valid(chunked_array).to_numpy(zero_copy_only=False)] = values
+    return result
+
+
+def get_indices_mapping(ds: Dataset) -> Optional[np.ndarray]:
+    """Get the position in `ds.data` of each row of `ds`, when rows were selected.
+
+    Rows selected with `select`, `sort`, `shuffle` or `filter` are only referenced by an indices
+    mapping. The public API of `datasets` 2.1.0 reads it one row at a time, so this reads the
+    private `Dataset._indices` instead. `datasets` is pinned in pyproject.toml for this reason, and
+    `test_arrow_access_matches_datasets` compares the results with the public API.
+
+    Args:
+        ds: Dataset Split, with or without selected rows.
+
+    Returns:
+        Positions of the rows of `ds` in `ds.data`, or None if `ds` has all rows in order.
+    """
+    indices_table = ds._indices
+    return None if indices_table is None else indices_table.column(0).to_numpy()
+
+
+def get_arrow_column(ds: Dataset, column: str) -> pa.ChunkedArray:
+    """Get a column as Arrow arrays, without converting rows to Python objects.
+
+    Same as `ds.with_format("arrow")[column]`, without copying the dataset to format it.
+
+    Args:
+        ds: Dataset Split from which to get the column.
+        column: Name of the column.
+
+    Returns:
+        Values of the column, in the order of the rows of `ds`.
+    """
+    chunked_array = ds.data.column(column)
+    mapping = get_indices_mapping(ds)
+    if mapping is not None:
+        chunked_array = chunked_array.take(mapping)
+    return chunked_array
+
+
+def get_arrow_table(
+    ds: Dataset, indices: Optional[Union[Sequence[int], np.ndarray]] = None
+) -> pa.Table:
+    """Get rows of a dataset as an Arrow table, without converting them to Python objects.
+
+    A few rows selected from a large dataset are gathered from the record batches holding them, as
+    taking them from columns with many chunks would concatenate the chunks first.
+
+    Args:
+        ds: Dataset Split from which to get the rows.
+        indices: Positions in `ds` of the rows to get. If None, all rows are returned.
+
+    Returns:
+        Table with the rows, in order.
+    """
+    mapping = get_indices_mapping(ds)
+    if mapping is not None:
+        positions = mapping if indices is None else mapping[np.asarray(indices, dtype=np.int64)]
+    elif indices is None:
+        return ds.data.table
+    else:
+        positions = np.asarray(indices, dtype=np.int64)
+    if len(positions) == 0:
+        return ds.data.table.slice(0, 0)
+    if len(positions) <= GATHER_MAX_ROWS:
+        return ds.data.fast_gather(positions)
+    return ds.data.table.take(positions)
 
 
 def get_outcomes_from_ds(ds: Dataset, without_postprocessing: bool = False) -> List[OutcomeName]:
@@ -175,3 +396,27 @@ def get_outcomes_from_ds(ds: Dataset, without_postprocessing: bool = False) -> L
         else ds[DatasetColumn.postprocessed_outcome]
     )
     return cast(List[OutcomeName], outcomes)
+
+
+def get_outcome_codes_from_ds(ds: Dataset, without_postprocessing: bool = False) -> np.ndarray:
+    """Get outcomes as their index in ALL_OUTCOMES, with or without postprocessing.
+
+    The outcome column is dictionary-encoded by Arrow, so only the distinct outcomes are converted.
+
+    Args:
+        ds: Dataset Split for which to get outcomes.
+        without_postprocessing: Determine which column to use.
+
+    Returns:
+        Array of shape [len(ds)] with the index of each outcome in ALL_OUTCOMES.
+    """
+    column = (
+        DatasetColumn.model_outcome
+        if without_postprocessing
+        else DatasetColumn.postprocessed_outcome
+    )
+    codes = [
+        get_outcome_codes(chunk.dictionary.to_pylist())[chunk.indices.to_numpy()]
+        for chunk in get_arrow_column(ds, column).dictionary_encode().chunks
+    ]
+    return np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
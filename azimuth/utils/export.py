@@ -0,0 +1,149 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import io
+import zlib
+from typing import Iterable, Iterator, List, cast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from azimuth.types import ExportFormat
+from azimuth.utils.conversion import orjson_dumps
+
+# Number of rows converted and written at once.
+EXPORT_CHUNK_SIZE = 10_000
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.csv_gz: "application/gzip",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+    ExportFormat.json: "application/json",
+    ExportFormat.jsonl: "application/jsonl",
+}
+
+
+def class_ids_to_names(array: pa.Array, class_names: np.ndarray) -> pa.Array:
+    """Replace class ids by their name, with a lookup in a NumPy array.
+
+    Negative ids count from the end, so that -1 is the rejection class when it is appended.
+
+    Args:
+        array: Class ids, or lists of class ids.
+        class_names: Name of each class id, as an array of objects.
+
+    Returns:
+        Class names, with the same nesting as `array`.
+    """
+    if pa.types.is_fixed_size_list(array.type):
+        names = class_ids_to_names(array.flatten(), class_names)
+        return pa.FixedSizeListArray.from_arrays(names, array.type.list_size)
+    if pa.types.is_list(array.type):
+        lengths = pc.list_value_length(array).to_numpy(zero_copy_only=False)
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int32)
+        names = class_ids_to_names(array.flatten(), class_names)
+        return pa.ListArray.from_arrays(pa.array(offsets), names)
+    class_ids = array.to_numpy(zero_copy_only=False).astype(np.int64)
+    return pa.array(class_names[class_ids], type=pa.string())
+
+
+def iter_export_bytes(tables: Iterable[pa.Table], export_format: ExportFormat) -> Iterator[bytes]:
+    """Serialize tables one after the other, as a single file.
+
+    Args:
+        tables: Chunks of rows to export, all with the same columns.
+        export_format: Format of the file.
+
+    Returns:
+        Content of the file, chunk by chunk.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if export_format == ExportFormat.csv:
+        for idx, table in enumerate(tables):
+            yield _to_csv(table, header=idx == 0)
+    elif export_format == ExportFormat.csv_gz:
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+        for idx, table in enumerate(tables):
+            yield compressor.compress(_to_csv(table, header=idx == 0))
+        yield compressor.flush()
+    elif export_format == ExportFormat.parquet:
+        sink = _StreamingSink()
+        writer = None
+        for table in tables:
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema)
+            writer.write_table(table)
+            yield sink.pop()
+        if writer is not None:
+            writer.close()
+        yield sink.pop()
+    elif export_format == ExportFormat.json:
+        yield from iter_json_array(_to_json_rows(table) for table in tables)
+    elif export_format == ExportFormat.jsonl:
+        for table in tables:
+            yield b"".join(row + b"\n" for row in _to_json_rows(table))
+    else:
+        raise ValueError(f"Unknown export format {export_format}.")
+
+
+def iter_json_array(chunks: Iterable[List[bytes]]) -> Iterator[bytes]:
+    """Write serialized rows as a single JSON array, without joining all of them in memory.
+
+    Args:
+        chunks: Rows serialized as JSON, a chunk at a time.
+
+    Returns:
+        Content of the JSON array, chunk by chunk.
+    """
+    yield b"["
+    is_first_row = True
+    for rows in chunks:
+        if rows:
+            yield (b"" if is_first_row else b",") + b",".join(rows)
+            is_first_row = False
+    yield b"]"
+
+
+def _to_csv(table: pa.Table, header: bool) -> bytes:
+    # Through Python objects so that lists are written as lists, not as NumPy arrays.
+    df = pd.DataFrame(table.to_pydict(), columns=table.column_names)
+    return cast(str, df.to_csv(index=False, header=header)).encode("utf-8")
+
+
+def _to_json_rows(table: pa.Table) -> List[bytes]:
+    return [orjson_dumps(row) for row in table.to_pylist()]
+
+
+class _StreamingSink(io.RawIOBase):
+    """File object keeping what was written until it is popped.
+
+    The position keeps counting the bytes that were popped, since the Parquet footer refers to
+    positions in the whole file.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position: int = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
@@ -0,0 +1,72 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+from typing import List, Sequence
+
+import numpy as np
+
+from azimuth.config import BatchingStrategy
+
+
+def make_batches(
+    lengths: Sequence[int],
+    batch_size: int,
+    strategy: BatchingStrategy = BatchingStrategy.contiguous,
+) -> List[List[int]]:
+    """Group rows in batches according to a batching strategy.
+
+    Batches are lists of row positions. Callers are responsible for putting the results back in
+    the original order, as rows are not contiguous when sorting by length.
+
+    Args:
+        lengths: Length of each row, usually the number of characters of the utterance.
+        batch_size: Number of rows per batch. For `token_budget`, the budget is `batch_size` times
+            the average length.
+        strategy: How to group rows together.
+
+    Returns:
+        Row positions for each batch.
+
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+    num_rows = len(lengths)
+    if num_rows == 0:
+        return []
+    if strategy == BatchingStrategy.contiguous:
+        rows = list(range(num_rows))
+        return [rows[i : i + batch_size] for i in range(0, num_rows, batch_size)]
+
+    lengths_arr = np.asarray(lengths, dtype=np.int64)
+    # Stable sort so rows of the same length keep their relative order.
+    order = np.argsort(lengths_arr, kind="stable")
+    if strategy == BatchingStrategy.sorted_by_length:
+        return [order[i : i + batch_size].tolist() for i in range(0, num_rows, batch_size)]
+    if strategy == BatchingStrategy.token_budget:
+        return _split_by_budget(order, lengths_arr[order], budget=batch_size * lengths_arr.mean())
+    raise ValueError(f"Unknown batching strategy {strategy}.")
+
+
+def _split_by_budget(
+    order: np.ndarray, sorted_lengths: np.ndarray, budget: float
+) -> List[List[int]]:
+    """Split rows sorted by length so the padded size of each batch stays within a budget.
+
+    Args:
+        order: Row positions, sorted by length.
+        sorted_lengths: Length of each row in `order`.
+        budget: Maximum padded size of a batch. Batches always have at least one row.
+
+    Returns:
+        Row positions for each batch.
+    """
+    # Since lengths are sorted, the padded size of a batch is its row count times its last length.
+    batches = []
+    start = 0
+    for end in range(1, len(order) + 1):
+        padded_size = (end - start) * max(int(sorted_lengths[end - 1]), 1)
+        if padded_size > budget and end - start > 1:
+            batches.append(order[start : end - 1].tolist())
+            start = end - 1
+    batches.append(order[start:].tolist())
+    return batches
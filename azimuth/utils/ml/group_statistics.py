@@ -0,0 +1,84 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import numpy as np
+
+from azimuth.types.outcomes import ALL_OUTCOMES
+from azimuth.utils.ml.model_performance import CONFIDENCE_BINS_COUNT, get_confidence_bin_indices
+
+
+class GroupStatistics:
+    """Sufficient statistics of the predictions in groups of rows, updated incrementally.
+
+    A row can be in many groups, such as the data action tags of an utterance. The statistics of
+    each group are the confusion matrix and the outcome count and confidence sum per confidence
+    bin. When the groups of a few rows change, only these rows are removed from their previous
+    groups and added to their new ones.
+
+    Args:
+        labels: Class index of the label of each row.
+        predictions: Class index of the prediction of each row.
+        outcome_codes: Index in ALL_OUTCOMES of the outcome of each row.
+        confidences: Confidence of the prediction of each row.
+        memberships: Whether each row is in each group, of shape [num_rows, num_groups].
+        num_classes: Number of classes.
+    """
+
+    def __init__(
+        self,
+        labels: np.ndarray,
+        predictions: np.ndarray,
+        outcome_codes: np.ndarray,
+        confidences: np.ndarray,
+        memberships: np.ndarray,
+        num_classes: int,
+    ):
+        self._labels = np.asarray(labels, dtype=np.int64)
+        self._predictions = np.asarray(predictions, dtype=np.int64)
+        self._outcome_codes = np.asarray(outcome_codes, dtype=np.int64)
+        self._confidences = np.asarray(confidences, dtype=np.float64)
+        self._bin_indices = get_confidence_bin_indices(self._confidences)
+
+        num_rows, num_groups = memberships.shape
+        self._memberships = np.zeros((num_rows, num_groups), dtype=bool)
+        self.confusion = np.zeros((num_groups, num_classes, num_classes), dtype=np.int64)
+        self.outcome_count_per_bin = np.zeros(
+            (num_groups, CONFIDENCE_BINS_COUNT, len(ALL_OUTCOMES)), dtype=np.int64
+        )
+        self.confidence_sum_per_bin = np.zeros((num_groups, CONFIDENCE_BINS_COUNT))
+        self.update_memberships(memberships)
+
+    @property
+    def outcome_count(self) -> np.ndarray:
+        """Count of each outcome, of shape [num_groups, len(ALL_OUTCOMES)]."""
+        return np.asarray(self.outcome_count_per_bin.sum(axis=1))
+
+    @property
+    def utterance_count(self) -> np.ndarray:
+        """Number of rows in each group."""
+        return np.asarray(self.outcome_count_per_bin.sum(axis=(1, 2)))
+
+    def update_memberships(self, memberships: np.ndarray) -> int:
+        """Update the groups of each row, only applying the changes to the statistics.
+
+        Args:
+            memberships: Whether each row is in each group, of shape [num_rows, num_groups].
+
+        Returns:
+            Number of rows whose groups changed.
+        """
+        memberships = np.asarray(memberships, dtype=bool)
+        changed_rows = np.flatnonzero((memberships != self._memberships).any(axis=1))
+        previous, current = self._memberships[changed_rows], memberships[changed_rows]
+        removed_rows, removed_groups = np.nonzero(previous & ~current)
+        added_rows, added_groups = np.nonzero(current & ~previous)
+        self._accumulate(changed_rows[removed_rows], removed_groups, sign=-1)
+        self._accumulate(changed_rows[added_rows], added_groups, sign=1)
+        self._memberships[changed_rows] = current
+        return len(changed_rows)
+
+    def _accumulate(self, rows: np.ndarray, groups: np.ndarray, sign: int):
+        bins = self._bin_indices[rows]
+        np.add.at(self.confusion, (groups, self._labels[rows], self._predictions[rows]), sign)
+        np.add.at(self.outcome_count_per_bin, (groups, bins, self._outcome_codes[rows]), sign)
+        np.add.at(self.confidence_sum_per_bin, (groups, bins), sign * self._confidences[rows])
@@ -0,0 +1,121 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pyarrow as pa
+import spacy
+from spacy.lang.en import English
+from spacy.language import Language
+
+from azimuth.utils.utterance import clean_utterance
+
+# Components of the spaCy pipelines that are not needed for the linguistic analysis.
+SPACY_UNUSED_COMPONENTS = ["ner", "lemmatizer"]
+# Number of utterances given at once to each spaCy process.
+SPACY_BATCH_SIZE = 256
+# The cores are shared by the 2 workers of the default cluster.
+SPACY_MAX_PROCESSES = max(1, (os.cpu_count() or 1) // 2)
+
+LINGUISTIC_ANALYSIS_SCHEMA = pa.schema(
+    [
+        ("tokens", pa.list_(pa.string())),
+        ("is_punct", pa.list_(pa.bool_())),
+        ("is_stop", pa.list_(pa.bool_())),
+        ("pos", pa.list_(pa.string())),
+        ("dep", pa.list_(pa.string())),
+        ("sentence_count", pa.int32()),
+    ]
+)
+
+# Some issues occur with other languages such as french if using doc.sents directly.
+# Hence, we use an English sentencizer that seems to work better for similar languages.
+spacy_sentencizer_en = English()
+spacy_sentencizer_en.add_pipe("sentencizer")
+
+
+@lru_cache(maxsize=None)
+def load_spacy_model(spacy_model: str) -> Language:
+    """Load a spaCy model once per process, without the components unused by the analysis.
+
+    Args:
+        spacy_model: Name of the spaCy model.
+
+    Returns:
+        spaCy pipeline with a tokenizer, a tagger and a parser.
+    """
+    return spacy.load(spacy_model, exclude=SPACY_UNUSED_COMPONENTS)
+
+
+def get_spacy_n_process(num_utterances: int) -> int:
+    """Get the number of spaCy processes to use, so that each process gets at least 2 batches.
+
+    Args:
+        num_utterances: Number of utterances to process.
+
+    Returns:
+        Number of processes, between 1 and SPACY_MAX_PROCESSES.
+    """
+    return max(1, min(SPACY_MAX_PROCESSES, num_utterances // (2 * SPACY_BATCH_SIZE)))
+
+
+def analyze_utterances(utterances: Sequence[str], spacy_model: str) -> pa.Table:
+    """Tokenize and parse utterances with spaCy, after cleaning them with `clean_utterance`.
+
+    Each row has the tokens of an utterance with whether they are punctuation or stop words, their
+    part-of-speech and dependency tags, and the number of sentences in the utterance.
+
+    Args:
+        utterances: Utterances to analyze.
+        spacy_model: Name of the spaCy model used to tokenize and parse.
+
+    Returns:
+        Analysis of each utterance, with the schema LINGUISTIC_ANALYSIS_SCHEMA.
+    """
+    cleaned = [clean_utterance(utterance) for utterance in utterances]
+    docs = load_spacy_model(spacy_model).pipe(
+        cleaned, batch_size=SPACY_BATCH_SIZE, n_process=get_spacy_n_process(len(cleaned))
+    )
+    docs_sentencizer_en = spacy_sentencizer_en.pipe(cleaned, batch_size=SPACY_BATCH_SIZE)
+    columns: Dict[str, List[Any]] = {name: [] for name in LINGUISTIC_ANALYSIS_SCHEMA.names}
+    for doc, doc_sentencizer_en in zip(docs, docs_sentencizer_en):
+        columns["tokens"].append([token.text for token in doc])
+        columns["is_punct"].append([token.is_punct for token in doc])
+        columns["is_stop"].append([token.is_stop for token in doc])
+        columns["pos"].append([token.pos_ for token in doc])
+        columns["dep"].append([token.dep_ for token in doc])
+        columns["sentence_count"].append(len(list(doc_sentencizer_en.sents)))
+    return pa.table(columns, schema=LINGUISTIC_ANALYSIS_SCHEMA)
+
+
+def get_token_row_indices(analysis: pa.Table) -> np.ndarray:
+    """Get the row of each token, in the order of the flattened token columns.
+
+    Args:
+        analysis: Linguistic analysis, as returned by `analyze_utterances`.
+
+    Returns:
+        Position in `analysis` of the row of each token.
+    """
+    token_counts = (
+        analysis.column("tokens").combine_chunks().value_lengths().to_numpy(zero_copy_only=False)
+    )
+    return np.repeat(np.arange(analysis.num_rows), token_counts)
+
+
+def flatten_token_column(analysis: pa.Table, column: str) -> np.ndarray:
+    """Get the values of a token column for all rows, in a single array.
+
+    Args:
+        analysis: Linguistic analysis, as returned by `analyze_utterances`.
+        column: Name of the token column, such as "tokens" or "is_punct".
+
+    Returns:
+        Values of all tokens, in the order of `get_token_row_indices`.
+    """
+    return np.asarray(
+        analysis.column(column).combine_chunks().flatten().to_numpy(zero_copy_only=False)
+    )
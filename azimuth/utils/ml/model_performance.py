@@ -1,13 +1,17 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from typing import List, TypeVar
+from typing import Dict, List, Optional, Sequence, TypeVar
+
+import numpy as np
 
 from azimuth.types.model_performance import UtteranceCountPerFilterValue
-from azimuth.types.outcomes import OutcomeName
+from azimuth.types.outcomes import ALL_OUTCOMES, OutcomeName
 
 T = TypeVar("T", bound=UtteranceCountPerFilterValue)
 
+CONFIDENCE_BINS_COUNT = 20
+
 
 def sorted_by_utterance_count(
     metrics: List[T],
@@ -48,3 +52,126 @@ def compute_outcome(prediction: int, label: int, rejection_class_idx) -> Outcome
         return OutcomeName.CorrectAndRejected if rejected else OutcomeName.CorrectAndPredicted
     else:
         return OutcomeName.IncorrectAndRejected if rejected else OutcomeName.IncorrectAndPredicted
+
+
+def compute_outcomes(
+    predictions: np.ndarray, labels: np.ndarray, rejection_class_idx
+) -> List[OutcomeName]:
+    """Compute prediction outcomes for many utterances at once.
+
+    Args:
+        predictions: Class index of the predictions.
+        labels: Class index of the labels.
+        rejection_class_idx: Class index of the rejection class
+
+    Returns:
+        Outcome value for each utterance.
+    """
+    predictions, labels = np.asarray(predictions), np.asarray(labels)
+    rejected = predictions == rejection_class_idx
+    # Index in ALL_OUTCOMES: 0/1 when correct, 2/3 when incorrect, odd values when rejected.
+    outcome_idx = 2 * (predictions != labels) + rejected
+    return [ALL_OUTCOMES[idx] for idx in outcome_idx]
+
+
+def outcome_count_per_threshold(
+    confidences: np.ndarray,
+    predictions: np.ndarray,
+    labels: np.ndarray,
+    thresholds: np.ndarray,
+    rejection_class_idx: int,
+) -> List[Dict[OutcomeName, int]]:
+    """Count outcomes for all thresholds at once, by sorting the confidences a single time.
+
+    Utterances keep their prediction when their confidence is above the threshold, otherwise they
+    are predicted as the rejection class, the same way as `Thresholding`.
+
+    Args:
+        confidences: Confidence of the predicted class, before thresholding.
+        predictions: Class index of the predictions, before thresholding.
+        labels: Class index of the labels.
+        thresholds: Thresholds for which to count outcomes.
+        rejection_class_idx: Class index of the rejection class
+
+    Returns:
+        Count of each outcome for each threshold. Outcomes with no utterance are omitted.
+    """
+    predictions, labels = np.asarray(predictions), np.asarray(labels)
+    # Index in ALL_OUTCOMES: 0/1 when correct, 2/3 when incorrect, odd values when rejected.
+    predicted_outcomes = 2 * (predictions != labels) + (predictions == rejection_class_idx)
+    rejected_outcomes = 2 * (labels != rejection_class_idx) + 1
+
+    order = np.argsort(confidences, kind="stable")
+    # Number of utterances that are rejected for each threshold.
+    rejected_count = np.searchsorted(np.asarray(confidences)[order], thresholds, side="right")
+
+    # Row k counts the outcomes of the k least confident utterances.
+    one_hot = np.eye(len(ALL_OUTCOMES), dtype=np.int64)
+    zeros = np.zeros((1, len(ALL_OUTCOMES)), dtype=np.int64)
+    predicted_cumsum = np.concatenate([zeros, one_hot[predicted_outcomes[order]].cumsum(0)])
+    rejected_cumsum = np.concatenate([zeros, one_hot[rejected_outcomes[order]].cumsum(0)])
+    counts = (
+        rejected_cumsum[rejected_count] + predicted_cumsum[-1] - predicted_cumsum[rejected_count]
+    )
+    return [
+        {outcome: int(count) for outcome, count in zip(ALL_OUTCOMES, row) if count}
+        for row in counts
+    ]
+
+
+def get_outcome_codes(outcomes: Sequence[OutcomeName]) -> np.ndarray:
+    """Get the index in ALL_OUTCOMES of each outcome.
+
+    Args:
+        outcomes: Outcome of each utterance.
+
+    Returns:
+        Index of each outcome in ALL_OUTCOMES.
+    """
+    codes = {outcome: idx for idx, outcome in enumerate(ALL_OUTCOMES)}
+    return np.array([codes[outcome] for outcome in outcomes], dtype=np.int64)
+
+
+def count_per_group(
+    group_ids: np.ndarray,
+    codes: np.ndarray,
+    num_groups: int,
+    num_codes: int,
+    weights: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Count the codes in each group, in a single pass.
+
+    A row can be in more than one group by repeating it in `group_ids` and `codes`.
+
+    Args:
+        group_ids: Group of each row.
+        codes: Code of each row, such as its outcome or its confidence bin.
+        num_groups: Number of groups.
+        num_codes: Number of possible codes.
+        weights: Sum these values instead of counting rows.
+
+    Returns:
+        Count, or sum of weights, of shape [num_groups, num_codes].
+    """
+    flat_counts = np.bincount(
+        np.asarray(group_ids, dtype=np.int64) * num_codes + codes,
+        weights=weights,
+        minlength=num_groups * num_codes,
+    )
+    return flat_counts.reshape(num_groups, num_codes)
+
+
+def get_confidence_bin_indices(confidences: np.ndarray) -> np.ndarray:
+    """Get the confidence bin of each utterance, out of CONFIDENCE_BINS_COUNT bins.
+
+    Args:
+        confidences: Confidence of the predicted class.
+
+    Returns:
+        Bin index of each utterance.
+    """
+    bin_indices: np.ndarray = np.minimum(
+        np.floor(np.asarray(confidences) * CONFIDENCE_BINS_COUNT),
+        CONFIDENCE_BINS_COUNT - 1,  # So that 100% falls in the last bin
+    ).astype(np.int64)
+    return bin_indices
@@ -3,8 +3,9 @@
 # in the root directory of this source tree.
 import contextlib
 import re
+from functools import lru_cache
 from itertools import zip_longest
-from typing import List
+from typing import List, Tuple
 
 import nlpaug.augmenter.char as nac
 
@@ -267,6 +268,60 @@ def get_utterances_diff(original_utterance: str, perturbed_utterance: str) -> Li
     return list(set(perturbed_utterance.split()).difference(set(original_utterance.split())))
 
 
+@lru_cache(maxsize=None)
+def get_typo_augmenters(
+    nb_typos_per_utterance: int,
+) -> List[Tuple[nac.CharAugmenter, PerturbationType]]:
+    """Create the nlpaug augmenters used by `typo`, once per process.
+
+    Augmenters are slow to create, but they don't hold any random state, so they can be reused
+    for all utterances.
+
+    Args:
+        nb_typos_per_utterance: Maximum number of typos per perturbed utterance.
+
+    Returns:
+        Augmenters, with the type of perturbation they make.
+    """
+    augmenters = []
+    # Special chars limited for all augs to facilitate cleaning up nac spacing/punctuation below
+    for nb_typo in range(1, nb_typos_per_utterance + 1):
+        augmenters.extend(
+            [
+                (
+                    nac.KeyboardAug(
+                        min_char=4,
+                        aug_word_max=nb_typo,
+                        aug_char_p=0.1 * nb_typo,
+                        include_special_char=False,
+                    ),
+                    PerturbationType.Replacement,
+                ),
+                (
+                    nac.RandomCharAug(
+                        action="swap",
+                        min_char=4,
+                        aug_word_max=nb_typo,
+                        aug_char_p=0.1 * nb_typo,
+                        spec_char="_",  # Breaks/includes others if min_char=1; nlpaug issue #315
+                    ),
+                    PerturbationType.Swap,
+                ),
+                (
+                    nac.RandomCharAug(
+                        action="delete",
+                        min_char=4,
+                        aug_word_max=nb_typo,
+                        aug_char_p=0.1 * nb_typo,
+                        spec_char="_",  # Breaks/includes others if min_char=1; nlpaug issue #315
+                    ),
+                    PerturbationType.Deletion,
+                ),
+            ]
+        )
+    return augmenters
+
+
 def typo(original: str, config: PerturbationTestingConfig) -> List[PerturbedUtteranceDetails]:
     """Create different types of typos in an utterance.
 
@@ -283,42 +338,11 @@ def typo(original: str, config: PerturbationTestingConfig) -> List[PerturbedUtte
        List of perturbed utterance details.
 
     """
-
-    augmentations = []
-    perturbation_types = []
     behavioral_testing_config = assert_not_none(config.behavioral_testing)
-    # Special chars limited for all augs to facilitate cleaning up nac spacing/punctuation below
-    for nb_typo in range(1, behavioral_testing_config.typo.nb_typos_per_utterance + 1):
-        augmentations.extend(
-            [
-                nac.KeyboardAug(
-                    min_char=4,
-                    aug_word_max=nb_typo,
-                    aug_char_p=0.1 * nb_typo,
-                    include_special_char=False,
-                ),
-                nac.RandomCharAug(
-                    action="swap",
-                    min_char=4,
-                    aug_word_max=nb_typo,
-                    aug_char_p=0.1 * nb_typo,
-                    spec_char="_",  # Breaks/includes others if min_char=1; nlpaug issue #315
-                ),
-                nac.RandomCharAug(
-                    action="delete",
-                    min_char=4,
-                    aug_word_max=nb_typo,
-                    aug_char_p=0.1 * nb_typo,
-                    spec_char="_",  # Breaks/includes others if min_char=1; nlpaug issue #315
-                ),
-            ]
-        )
-        perturbation_types.extend(
-            [PerturbationType.Replacement, PerturbationType.Swap, PerturbationType.Deletion]
-        )
-
     results = []
-    for aug, perturbation_type in zip(augmentations, perturbation_types):
+    for aug, perturbation_type in get_typo_augmenters(
+        behavioral_testing_config.typo.nb_typos_per_utterance
+    ):
         with contextlib.redirect_stdout(None):
             # While nlpaug fixes their useless print, we ignore it.
             perturbed_utterance = aug.augment(original, n=1)
@@ -0,0 +1,87 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pyarrow as pa
+
+from azimuth.types.perturbation_testing import PerturbationTestFamily, PerturbedUtteranceResult
+
+# One row per perturbed utterance, with the row_idx of its original utterance.
+PERTURBATION_RESULTS_SCHEMA = pa.schema(
+    [
+        ("row_idx", pa.int64()),
+        ("name", pa.string()),
+        ("description", pa.string()),
+        ("family", pa.string()),
+        ("perturbed_utterance", pa.string()),
+        ("perturbations", pa.list_(pa.string())),
+        ("perturbation_type", pa.string()),
+        ("confidence", pa.float64()),
+        ("confidence_delta", pa.float64()),
+        ("failed", pa.bool_()),
+        ("failure_reason", pa.string()),
+        ("prediction", pa.int64()),
+    ]
+)
+
+
+def make_perturbation_results_table(
+    results: Sequence[List[PerturbedUtteranceResult]], row_indices: Sequence[int]
+) -> pa.Table:
+    """Flatten the results of PerturbationTestingModule in a table.
+
+    Args:
+        results: Results of the perturbation tests, for each original utterance.
+        row_indices: row_idx of each original utterance.
+
+    Returns:
+        Results of each perturbed utterance, with the schema PERTURBATION_RESULTS_SCHEMA.
+    """
+    columns: Dict[str, List[Any]] = {
+        name: [] for name in PERTURBATION_RESULTS_SCHEMA.names if name != "row_idx"
+    }
+    for utterance_results in results:
+        for result in utterance_results:
+            for name, values in columns.items():
+                values.append(getattr(result, name))
+    lengths = [len(utterance_results) for utterance_results in results]
+    data: Dict[str, Any] = {
+        "row_idx": np.repeat(np.asarray(row_indices, dtype=np.int64), lengths),
+        **columns,
+    }
+    return pa.table(data, schema=PERTURBATION_RESULTS_SCHEMA)
+
+
+def get_results_column(results: pa.Table, column: str) -> np.ndarray:
+    """Get a column of the results table as an array.
+
+    Args:
+        results: Results of the perturbation tests, as made by `make_perturbation_results_table`.
+        column: Name of the column.
+
+    Returns:
+        Values of the column.
+    """
+    values: np.ndarray = results.column(column).combine_chunks().to_numpy(zero_copy_only=False)
+    return values
+
+
+def get_failed_per_row(
+    results: pa.Table, family: PerturbationTestFamily, num_rows: int
+) -> np.ndarray:
+    """Get whether any test of a family failed on each original utterance.
+
+    Args:
+        results: Results of the perturbation tests, as made by `make_perturbation_results_table`.
+        family: Family of tests.
+        num_rows: Number of rows in the dataset_split.
+
+    Returns:
+        Boolean array indexed by row_idx.
+    """
+    row_indices = get_results_column(results, "row_idx")
+    failed = get_results_column(results, "failed")
+    in_family = get_results_column(results, "family") == family.value
+    return np.bincount(row_indices[failed & in_family], minlength=num_rows) > 0
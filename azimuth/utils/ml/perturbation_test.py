@@ -1,19 +1,42 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple
+from functools import lru_cache, partial
+from typing import Callable, List, Optional, Sequence, Tuple
 
 from azimuth.config import PerturbationTestingConfig
 from azimuth.types.perturbation_testing import (
+    PRETTY_PERTURBATION_TYPES,
     PerturbationTestClass,
     PerturbationTestFailureReason,
     PerturbationTestFamily,
     PerturbationTestName,
     PerturbationTestType,
+    PerturbationType,
     PerturbedUtteranceDetails,
 )
+from azimuth.utils.ml.perturbation_functions import (
+    add_all_neutral_tokens,
+    remove_or_add_contractions,
+    remove_or_add_final_period,
+    remove_or_add_final_question_mark,
+    remove_or_add_inside_comma,
+    remove_or_add_inside_period,
+    typo,
+)
+from azimuth.utils.ml.seeding import RandomContext, get_row_seed, set_seed
+from azimuth.utils.validation import assert_not_none
+
+# Number of utterances given at once to each perturbation process.
+PERTURBATION_BATCH_SIZE = 256
+# The cores are shared by the 2 workers of the default cluster.
+PERTURBATION_MAX_PROCESSES = max(1, (os.cpu_count() or 1) // 2)
 
 
 @dataclass
@@ -59,3 +82,231 @@ class PerturbationTest:
         else:
             # if the delta of confidence is not applicable we report the conf.
             return False, PerturbationTestFailureReason.NA, delta_conf
+
+    def get_description(self, perturbation_type: str) -> str:
+        """Get the description of the test for a type of perturbation.
+
+        Args:
+            perturbation_type: Type of the perturbation, such as `PerturbationType.Insertion`.
+
+        Returns:
+            Description of the test.
+        """
+        return self.description.format(
+            type=PRETTY_PERTURBATION_TYPES[PerturbationType(perturbation_type)]
+        )
+
+
+def get_perturbation_tests(config: PerturbationTestingConfig) -> List[PerturbationTest]:
+    """Get the perturbation tests to run, with the thresholds of the config.
+
+    The tests are only created once for each set of thresholds, so that they can be requested for
+    every call, without any module.
+
+    Notes:
+        To add a new test:
+            1. In `perturbation_functions.py`, make a new function with the same
+            signature as the `typo` one.
+            2. Add your test in `_get_perturbation_tests` with your function.
+
+    Args:
+        config: Azimuth Config.
+
+    Returns:
+        Perturbation tests.
+    """
+    behavioral_testing = assert_not_none(config.behavioral_testing)
+    return list(
+        _get_perturbation_tests(
+            neutral_token_threshold=behavioral_testing.neutral_token.threshold,
+            punctuation_threshold=behavioral_testing.punctuation.threshold,
+            typo_threshold=behavioral_testing.typo.threshold,
+            fuzzy_matching_threshold=behavioral_testing.fuzzy_matching.threshold,
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_perturbation_tests(
+    neutral_token_threshold: float,
+    punctuation_threshold: float,
+    typo_threshold: float,
+    fuzzy_matching_threshold: float,
+) -> Tuple[PerturbationTest, ...]:
+    return (
+        PerturbationTest(
+            name=PerturbationTestName.neutral_token,
+            description="{type} a neutral token to the utterance.",
+            test_fn=add_all_neutral_tokens,
+            family=PerturbationTestFamily.fuzzy_matching,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=neutral_token_threshold,
+            expect_flip=False,
+        ),
+        PerturbationTest(
+            name=PerturbationTestName.question_mark,
+            description="{type} question mark at the end of the utterance.",
+            test_fn=remove_or_add_final_question_mark,
+            family=PerturbationTestFamily.punctuation,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=punctuation_threshold,
+            expect_flip=False,
+        ),
+        PerturbationTest(
+            name=PerturbationTestName.ending_period,
+            description="{type} period at the end of the utterance.",
+            test_fn=remove_or_add_final_period,
+            family=PerturbationTestFamily.punctuation,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=punctuation_threshold,
+            expect_flip=False,
+        ),
+        PerturbationTest(
+            name=PerturbationTestName.inner_comma,
+            description="{type} comma inside the utterance.",
+            test_fn=remove_or_add_inside_comma,
+            family=PerturbationTestFamily.punctuation,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=punctuation_threshold,
+            expect_flip=False,
+        ),
+        PerturbationTest(
+            name=PerturbationTestName.inner_period,
+            description="{type} period inside the utterance.",
+            test_fn=remove_or_add_inside_period,
+            family=PerturbationTestFamily.punctuation,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=punctuation_threshold,
+            expect_flip=False,
+        ),
+        PerturbationTest(
+            name=PerturbationTestName.typos,
+            description="{type} characters in the utterance to create typos.",
+            test_fn=typo,
+            family=PerturbationTestFamily.fuzzy_matching,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=typo_threshold,
+            expect_flip=False,
+        ),
+        PerturbationTest(
+            name=PerturbationTestName.contractions,
+            description="{type} expressions in the utterance.",
+            family=PerturbationTestFamily.fuzzy_matching,
+            test_fn=remove_or_add_contractions,
+            test_type=PerturbationTestType.invariant,
+            test_class=PerturbationTestClass.robustness,
+            conf_delta_threshold=fuzzy_matching_threshold,
+            expect_flip=False,
+        ),
+    )
+
+
+def get_perturbation_n_process(num_utterances: int) -> int:
+    """Get the number of processes to use, so that each process gets at least 2 batches.
+
+    Args:
+        num_utterances: Number of utterances to perturb.
+
+    Returns:
+        Number of processes, between 1 and PERTURBATION_MAX_PROCESSES.
+    """
+    return max(1, min(PERTURBATION_MAX_PROCESSES, num_utterances // (2 * PERTURBATION_BATCH_SIZE)))
+
+
+_perturbation_executors: List[ProcessPoolExecutor] = []
+
+
+@lru_cache(maxsize=None)
+def get_perturbation_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Get the pool of perturbation processes, created once and kept for the whole process.
+
+    Spawning processes and importing the augmenters in them is slower than perturbing a batch,
+    so the pool is reused by all perturbation tests and custom utterances.
+
+    Args:
+        max_workers: Number of processes of the pool.
+
+    Returns:
+        The pool of processes.
+    """
+    # Spawn rather than fork, as the parent process can hold a model and its threads.
+    executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+    _perturbation_executors.append(executor)
+    return executor
+
+
+@atexit.register
+def shutdown_perturbation_executors():
+    """Shut down the pools of perturbation processes, so that the next call creates new ones."""
+    get_perturbation_executor.cache_clear()
+    while _perturbation_executors:
+        _perturbation_executors.pop().shutdown()
+
+
+def _perturb_batch(
+    utterances_and_row_indices: Sequence[Tuple[str, int]],
+    perturbation_tests: List[PerturbationTest],
+    config: PerturbationTestingConfig,
+) -> List[List[List[PerturbedUtteranceDetails]]]:
+    seed = assert_not_none(config.behavioral_testing).seed
+    results = []
+    with RandomContext(seed):
+        for utterance, row_idx in utterances_and_row_indices:
+            row_seed = get_row_seed(seed, row_idx)
+            results_per_test = []
+            for perturbation_test in perturbation_tests:
+                # Each test starts from the seed of the row, so it doesn't depend on other tests.
+                set_seed(row_seed)
+                results_per_test.append(perturbation_test.test_fn(utterance, config))
+            results.append(results_per_test)
+    return results
+
+
+def generate_perturbations(
+    perturbation_tests: List[PerturbationTest],
+    utterances: List[str],
+    row_indices: List[int],
+    config: PerturbationTestingConfig,
+) -> List[List[List[PerturbedUtteranceDetails]]]:
+    """Generate perturbed utterances for some perturbation tests and utterances.
+
+    The random generators are seeded for each utterance from the seed in the config and the row
+    index, so that results don't depend on the batches nor on the number of processes. Large sets
+    of utterances are perturbed in a pool of processes, kept for the whole process.
+
+    Args:
+        perturbation_tests: Tests to run.
+        utterances: Original utterances.
+        row_indices: Index of each utterance.
+        config: Azimuth Config.
+
+    Returns:
+        Perturbed utterances for each test and each utterance.
+    """
+    pairs = list(zip(utterances, row_indices))
+    batch_size = PERTURBATION_BATCH_SIZE
+    batches = [pairs[i : i + batch_size] for i in range(0, len(pairs), batch_size)]
+    perturb_batch = partial(_perturb_batch, perturbation_tests=perturbation_tests, config=config)
+    n_process = get_perturbation_n_process(len(pairs))
+    if n_process == 1:
+        results_per_batch = list(map(perturb_batch, batches))
+    else:
+        executor = get_perturbation_executor(PERTURBATION_MAX_PROCESSES)
+        try:
+            results_per_batch = list(executor.map(perturb_batch, batches))
+        except BrokenProcessPool:
+            # A process died, so the next call creates a new pool.
+            shutdown_perturbation_executors()
+            raise
+
+    results_per_utterance = [results for batch in results_per_batch for results in batch]
+    return [
+        [results_per_test[test_idx] for results_per_test in results_per_utterance]
+        for test_idx in range(len(perturbation_tests))
+    ]
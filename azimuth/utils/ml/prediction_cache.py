@@ -0,0 +1,186 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import hashlib
+import os
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import h5py
+import numpy as np
+import structlog
+from filelock import FileLock
+from retrying import retry
+
+log = structlog.get_logger(__name__)
+
+CACHE_ID = "cache_id"
+KEYS = "keys"
+PROBS = "probs"
+
+
+class PredictionCache:
+    """Model probabilities of utterances, before postprocessing, saved in a HDF5 file per model.
+
+    Utterances are identified by the hash of their text, so an utterance is only predicted once,
+    whatever its dataset_split, row or perturbation. As postprocessing is not cached, the cache
+    stays valid when thresholds or temperatures change.
+
+    The probabilities are the rows of a single resizable dataset, appended in bulk, and the hashes
+    are saved in a parallel dataset. Each process indexes the row of each hash, only reading the
+    hashes appended since its last lookup. Lookups read the file in SWMR mode, without the lock.
+    A file that can't be read, such as after a writer crashed, is recreated on the next append.
+
+    Args:
+        path: Path of the HDF5 file.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = f"{path}.lock"
+        self._cache_id: Optional[str] = None
+        self._rows: Dict[bytes, int] = {}
+        self._num_indexed = 0
+        self.hits = 0
+        self.lookups = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Proportion of the utterances looked up so far that were in the cache."""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @staticmethod
+    def _get_key(text: str) -> bytes:
+        return hashlib.md5(text.encode()).hexdigest().encode()  # nosec
+
+    def _update_index(self, handle: h5py.File, locked: bool = False):
+        """Index the rows appended to the file since the last update, by any process.
+
+        Args:
+            handle: Opened HDF5 file.
+            locked: Whether the lock is held, so that no rows are being appended.
+        """
+        if KEYS not in handle:
+            return
+        if handle.attrs.get(CACHE_ID) != self._cache_id:
+            # The file was recreated, so rows of the previous file are not valid anymore.
+            self._cache_id = handle.attrs.get(CACHE_ID)
+            self._rows, self._num_indexed = {}, 0
+        for key in handle[KEYS][self._num_indexed :].tolist():
+            if not key and not locked:
+                # Rows being appended by another process are indexed on a later lookup.
+                break
+            if key:
+                self._rows[key] = self._num_indexed
+            self._num_indexed += 1
+
+    @retry(stop_max_attempt_number=5, wait_fixed=0.5)
+    def _read(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        result: List[Optional[np.ndarray]] = [None] * len(keys)
+        if not os.path.exists(self._path):
+            return result
+        with h5py.File(self._path, "r", libver="latest", swmr=True) as handle:
+            self._update_index(handle)
+            positions = [idx for idx, key in enumerate(keys) if key in self._rows]
+            if positions:
+                # Rows are read at once, and h5py requires increasing and unique rows.
+                rows, inverse = np.unique(
+                    [self._rows[keys[idx]] for idx in positions], return_inverse=True
+                )
+                probs = handle[PROBS][rows.tolist()]
+                for idx, row_probs in zip(positions, probs[inverse]):
+                    result[idx] = row_probs
+        return result
+
+    def get(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Get the cached probabilities of some utterances.
+
+        Args:
+            texts: Utterances.
+
+        Returns:
+            Probabilities of each utterance, None if it is not in the cache.
+        """
+        result: List[Optional[np.ndarray]] = [None] * len(texts)
+        if texts:
+            try:
+                result = self._read([self._get_key(text) for text in texts])
+            except (OSError, KeyError) as e:
+                log.warning("Can't read the prediction cache.", path=self._path, error=str(e))
+
+        hits = sum(probs is not None for probs in result)
+        self.hits += hits
+        self.lookups += len(texts)
+        log.debug(
+            "Prediction cache lookup",
+            hits=hits,
+            lookups=len(texts),
+            hit_rate=round(self.hit_rate, 4),
+        )
+        return result
+
+    def put(self, texts: Sequence[str], probs: np.ndarray):
+        """Append the probabilities of the utterances that are not in the cache yet.
+
+        Args:
+            texts: Utterances.
+            probs: Probabilities of each utterance, of shape [len(texts), num_classes].
+        """
+        if not texts:
+            return
+        with FileLock(self._lock):
+            try:
+                self._append(texts, np.asarray(probs))
+            except (OSError, KeyError) as e:
+                log.warning("Recreating the prediction cache.", path=self._path, error=str(e))
+                if os.path.exists(self._path):
+                    os.remove(self._path)
+                self._append(texts, np.asarray(probs))
+
+    @retry(stop_max_attempt_number=5, wait_fixed=0.5)
+    def _append(self, texts: Sequence[str], probs: np.ndarray):
+        # Only called with the lock.
+        with h5py.File(self._path, "a", libver="latest") as handle:
+            if KEYS not in handle:
+                handle.attrs[CACHE_ID] = uuid.uuid4().hex
+                handle.create_dataset(KEYS, shape=(0,), maxshape=(None,), dtype="S32", chunks=True)
+                handle.create_dataset(
+                    PROBS,
+                    shape=(0, probs.shape[1]),
+                    maxshape=(None, probs.shape[1]),
+                    dtype=probs.dtype,
+                    chunks=True,
+                )
+            handle.swmr_mode = True
+            self._update_index(handle, locked=True)
+            new_rows: Dict[bytes, int] = {}
+            for idx, text in enumerate(texts):
+                key = self._get_key(text)
+                if key not in self._rows and key not in new_rows:
+                    new_rows[key] = idx
+            if not new_rows:
+                return
+            keys_ds, probs_ds = handle[KEYS], handle[PROBS]
+            start = len(keys_ds)
+            # Probabilities are written before their keys, so lookups only find complete rows.
+            probs_ds.resize(start + len(new_rows), axis=0)
+            probs_ds[start:] = probs[list(new_rows.values())]
+            probs_ds.flush()
+            keys_ds.resize(start + len(new_rows), axis=0)
+            keys_ds[start:] = np.array(list(new_rows), dtype="S32")
+            keys_ds.flush()
+            self._update_index(handle, locked=True)
+
+
+@lru_cache(maxsize=None)
+def get_prediction_cache(path: str) -> PredictionCache:
+    """Get the prediction cache saved at `path`, with hit-rate metrics shared by the process.
+
+    Args:
+        path: Path of the HDF5 file.
+
+    Returns:
+        The prediction cache.
+    """
+    return PredictionCache(path)
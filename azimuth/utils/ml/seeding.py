@@ -6,6 +6,29 @@ import random
 import numpy as np
 
 
+def set_seed(seed: int):
+    """Set seed for `random` and `numpy`.
+
+    Args:
+        seed: seed for the random generator.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def get_row_seed(seed: int, row_idx: int) -> int:
+    """Derive a seed for a row from a global seed, independently of the other rows.
+
+    Args:
+        seed: Global seed, such as the one from the config.
+        row_idx: Index of the row.
+
+    Returns:
+        Seed for the row.
+    """
+    return int(np.random.SeedSequence([seed, row_idx]).generate_state(1)[0])
+
+
 class RandomContext:
     """
     Set seed for `random` and `numpy` and when exiting set the original back.
@@ -20,8 +43,7 @@ class RandomContext:
         self.np_ctx = np.random.get_state()
 
     def __enter__(self):
-        random.seed(self.seed)
-        np.random.seed(self.seed)
+        set_seed(self.seed)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         random.setstate(self.rnd_ctx)
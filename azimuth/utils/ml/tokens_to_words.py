@@ -0,0 +1,87 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+WORDPIECE_PREFIX = "##"
+
+
+def join_word_pieces(tokens: List[str]) -> str:
+    """Join WordPiece tokens, where tokens continuing a word start with `##`."""
+    return tokens[0] + "".join(token.lstrip(WORDPIECE_PREFIX) for token in tokens[1:])
+
+
+def merge_tokens(
+    tokens: Sequence[List[str]],
+    saliencies: Sequence[List[float]],
+    word_ids: Optional[Sequence[Optional[List[Optional[int]]]]] = None,
+    tokens_to_string: Callable[[List[str]], str] = join_word_pieces,
+) -> Tuple[List[List[str]], List[List[float]]]:
+    """Merge the tokens of a batch of utterances into words, summing their saliency.
+
+    Words are delimited with the word index of each token, as given by `word_ids()` of fast
+    tokenizers, whatever the tokenizer family. Special tokens, without a word index, are words of
+    their own. For utterances without word indices, a token starting with `##` continues the
+    previous word, as with WordPiece.
+
+    Args:
+        tokens: Tokens of each utterance.
+        saliencies: Saliency of each token of each utterance.
+        word_ids: Word index of each token of each utterance, if available.
+        tokens_to_string: Make a word from its tokens, when word indices are available.
+
+    Returns:
+        Words of each utterance, and their saliency.
+
+    Raises:
+        ValueError: If an utterance without word indices starts with a `##` token.
+    """
+    word_ids = word_ids if word_ids is not None else [None] * len(tokens)
+    lengths = np.array([len(utterance_tokens) for utterance_tokens in tokens], dtype=np.int64)
+    if lengths.sum() == 0:
+        return [[] for _ in tokens], [[] for _ in tokens]
+
+    all_tokens = [token for utterance_tokens in tokens for token in utterance_tokens]
+    all_saliencies = np.array(
+        [saliency for utterance in saliencies for saliency in utterance], dtype=np.float64
+    )
+    has_word_ids = np.repeat(np.array([ids is not None for ids in word_ids]), lengths)
+    row_starts: np.ndarray = np.concatenate((np.zeros(1, dtype=np.int64), np.cumsum(lengths)[:-1]))
+    is_row_start = np.zeros(len(all_tokens), dtype=bool)
+    is_row_start[row_starts[lengths > 0]] = True
+
+    # Special tokens get -1, and are never merged with the previous token.
+    all_word_ids = np.array(
+        [
+            -1 if word_id is None else word_id
+            for ids, length in zip(word_ids, lengths)
+            for word_id in (ids if ids is not None else [0] * length)
+        ],
+        dtype=np.int64,
+    )
+    continues_word_id = np.zeros(len(all_tokens), dtype=bool)
+    continues_word_id[1:] = (all_word_ids[1:] == all_word_ids[:-1]) & (all_word_ids[1:] >= 0)
+    is_word_piece = np.char.startswith(np.array(all_tokens, dtype=str), WORDPIECE_PREFIX)
+    if (is_word_piece & is_row_start & ~has_word_ids).any():
+        raise ValueError("First token is not a word.")
+
+    is_word_start = is_row_start | ~np.where(has_word_ids, continues_word_id, is_word_piece)
+    word_starts = np.flatnonzero(is_word_start)
+    word_ends = np.append(word_starts[1:], len(all_tokens))
+    word_saliencies = np.add.reduceat(all_saliencies, word_starts)
+    all_words = [
+        tokens_to_string(all_tokens[start:end]).strip()
+        if has_word_ids[start]
+        else join_word_pieces(all_tokens[start:end])
+        for start, end in zip(word_starts, word_ends)
+    ]
+
+    # Number of words of each utterance, to split the words back per utterance.
+    token_rows = np.repeat(np.arange(len(tokens)), lengths)
+    split_positions = np.cumsum(np.bincount(token_rows[word_starts], minlength=len(tokens)))[:-1]
+    return (
+        [list(words) for words in np.split(np.array(all_words, dtype=object), split_positions)],
+        [sal.tolist() for sal in np.split(word_saliencies, split_positions)],
+    )
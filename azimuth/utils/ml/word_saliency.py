@@ -0,0 +1,140 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import os
+from typing import Collection, List, Sequence, Tuple
+
+import numpy as np
+
+
+class WordSaliency:
+    """Saliency of the words of each utterance, as a sparse table of (row, word_id, saliency).
+
+    Words are lower-cased and identified by their index in a vocabulary. The important words of any
+    group of rows are then selected and counted on whole arrays, with a single `bincount`.
+
+    Args:
+        rows: row_idx of the utterance of each word.
+        word_ids: Index in `vocabulary` of each word.
+        saliencies: Saliency of each word.
+        vocabulary: Sorted distinct words.
+        max_saliency_per_row: Highest saliency in each utterance, indexed by row_idx.
+    """
+
+    def __init__(
+        self,
+        rows: np.ndarray,
+        word_ids: np.ndarray,
+        saliencies: np.ndarray,
+        vocabulary: np.ndarray,
+        max_saliency_per_row: np.ndarray,
+    ):
+        self._rows = np.asarray(rows, dtype=np.int64)
+        self._word_ids = np.asarray(word_ids, dtype=np.int64)
+        self._saliencies = np.asarray(saliencies, dtype=np.float64)
+        self._vocabulary = np.asarray(vocabulary, dtype=str)
+        self._max_saliency_per_row = np.asarray(max_saliency_per_row, dtype=np.float64)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @classmethod
+    def from_words(
+        cls,
+        row_indices: Sequence[int],
+        words: Sequence[List[str]],
+        saliencies: Sequence[List[float]],
+        excluded_words: Collection[str] = (),
+    ) -> "WordSaliency":
+        """Build the table from the words of each utterance and their saliency.
+
+        Args:
+            row_indices: row_idx of each utterance.
+            words: Words of each utterance.
+            saliencies: Saliency of each word of each utterance.
+            excluded_words: Words to leave out of the table, such as special tokens. They still
+                count in the highest saliency of their utterance.
+
+        Returns:
+            Saliency of the words.
+        """
+        lengths = np.array([len(utterance_words) for utterance_words in words], dtype=np.int64)
+        rows = np.repeat(np.asarray(row_indices, dtype=np.int64), lengths)
+        all_words = np.array(
+            [word for utterance_words in words for word in utterance_words], dtype=str
+        )
+        all_saliencies = np.array(
+            [saliency for utterance in saliencies for saliency in utterance], dtype=np.float64
+        )
+
+        max_saliency_per_row = np.zeros(max(row_indices, default=-1) + 1)
+        non_empty = lengths > 0
+        if non_empty.any():
+            starts = np.concatenate((np.zeros(1, dtype=np.int64), np.cumsum(lengths)[:-1]))
+            starts = starts[non_empty]
+            max_saliency_per_row[np.asarray(row_indices)[non_empty]] = np.maximum.reduceat(
+                all_saliencies, starts
+            )
+
+        kept = ~np.isin(all_words, list(excluded_words))
+        vocabulary, word_ids = np.unique(np.char.lower(all_words[kept]), return_inverse=True)
+        return cls(rows[kept], word_ids, all_saliencies[kept], vocabulary, max_saliency_per_row)
+
+    @classmethod
+    def load(cls, path: str) -> "WordSaliency":
+        """Load a table saved with `save`.
+
+        Args:
+            path: Path of the .npz file.
+
+        Returns:
+            Saliency of the words.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def save(self, path: str):
+        """Save the table as a .npz file, atomically.
+
+        Args:
+            path: Path of the .npz file.
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            rows=self._rows,
+            word_ids=self._word_ids,
+            saliencies=self._saliencies,
+            vocabulary=self._vocabulary,
+            max_saliency_per_row=self._max_saliency_per_row,
+        )
+        os.replace(tmp_path, path)
+
+    def most_important_words(
+        self, row_indices: np.ndarray, th_importance: float, min_saliency: float, top_x: int
+    ) -> List[Tuple[str, int]]:
+        """Count the important words of some utterances, and get the most common ones.
+
+        A word is important if its saliency is above `th_importance` times the highest saliency in
+        its utterance, and above `min_saliency`.
+
+        Args:
+            row_indices: row_idx of the utterances.
+            th_importance: Threshold relative to the highest saliency in the utterance.
+            min_saliency: Minimum saliency of an important word.
+            top_x: Number of words to return.
+
+        Returns:
+            Most common important words and their count, ties ordered by first occurrence.
+        """
+        row_mask = np.zeros(len(self._max_saliency_per_row), dtype=bool)
+        row_mask[np.asarray(row_indices, dtype=np.int64)] = True
+        thresholds = np.maximum(
+            th_importance * self._max_saliency_per_row[self._rows], min_saliency
+        )
+        word_ids = self._word_ids[row_mask[self._rows] & (self._saliencies > thresholds)]
+
+        counts = np.bincount(word_ids, minlength=len(self._vocabulary))
+        present, first_positions = np.unique(word_ids, return_index=True)
+        order = np.lexsort((first_positions, -counts[present]))[:top_x]
+        return [(str(self._vocabulary[idx]), int(counts[idx])) for idx in present[order]]
@@ -2,8 +2,10 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 from threading import Event
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
+from datasets import Dataset
 from fastapi import Depends, HTTPException, Query
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_503_SERVICE_UNAVAILABLE
 
@@ -16,11 +18,13 @@ from azimuth.types import (
     DatasetSplitName,
     ModuleOptions,
     NamedDatasetFilters,
+    PaginationCursor,
     PaginationParams,
     SupportedTask,
 )
 from azimuth.types.outcomes import OutcomeName
 from azimuth.types.tag import DataAction, SmartTag, SmartTagFamily
+from azimuth.utils.dataset_operations import get_indices_mapping
 from azimuth.utils.project import predictions_available
 
 
@@ -94,6 +98,7 @@ def get_standard_task_result(
     task_manager: TaskManager,
     mod_options: Optional[ModuleOptions] = None,
     last_update: float = -1,
+    last_update_excluding_data_actions: Optional[float] = None,
 ):
     """Generate the task object and get the result for standard tasks.
 
@@ -103,6 +108,8 @@ def get_standard_task_result(
         task_manager: The task manager
         mod_options: Module options to pass to the task launcher
         last_update: The last known update for this dataset_split, to know if we need to recompute.
+        last_update_excluding_data_actions: Same as `last_update`, ignoring updates where only
+            data actions changed, for tasks that don't depend on them.
 
     Returns:
         The task result
@@ -116,6 +123,7 @@ def get_standard_task_result(
         dataset_split_name=dataset_split_name,
         mod_options=mod_options,
         last_update=last_update,
+        last_update_excluding_data_actions=last_update_excluding_data_actions,
     )
 
     if not task:
@@ -254,20 +262,30 @@ def require_application_ready(
 def get_pagination(
     limit: Optional[int] = Query(None, title="Limit", ge=1),
     offset: Optional[int] = Query(None, title="Offset", ge=0),
+    cursor: Optional[str] = Query(None, title="Cursor from the previous page, instead of offset"),
 ) -> Optional[PaginationParams]:
     """Get the pagination parameters if available.
 
     Args:
         limit: How many items to return.
         offset: Starting point.
+        cursor: Position after the previous page, instead of `offset`.
 
     Raises:
         HTTPException if not all params are supplied.
 
     Returns:
-        If limit and offset are provided, returns a PaginationParams otherwise None.
+        If limit and offset or cursor are provided, returns a PaginationParams otherwise None.
 
     """
+    if cursor is not None:
+        if limit is None or offset is not None:
+            raise HTTPException(
+                HTTP_400_BAD_REQUEST,
+                detail=f"`cursor` must be set with `limit` and without `offset`. Got {limit} and "
+                f"{offset}",
+            )
+        return PaginationParams(limit=limit, cursor=cursor)
     if (limit is None) ^ (offset is None):
         raise HTTPException(
             HTTP_400_BAD_REQUEST,
@@ -277,3 +295,92 @@ def get_pagination(
         return None
     else:
         return PaginationParams(limit=limit, offset=offset)
+
+
+def get_sort_key(ds: Dataset, row_idx: int, column: str) -> Any:
+    """Get the value a row is sorted by, the first value for columns of lists.
+
+    Only the sort column of the row is read, not the other columns.
+
+    Args:
+        ds: Dataset split, with the prediction table if the column comes from it.
+        row_idx: Row to get the value of.
+        column: Column the rows are sorted by.
+
+    Returns:
+        Value of the row in the column.
+    """
+    indices_mapping = get_indices_mapping(ds)
+    position = int(row_idx) if indices_mapping is None else int(indices_mapping[int(row_idx)])
+    value = ds.data.column(column)[position].as_py()
+    return value[0] if isinstance(value, list) else value
+
+
+def get_cursor_position(
+    cursor: str,
+    ds: Dataset,
+    sorted_row_indices: np.ndarray,
+    column: str,
+    descending: bool,
+    version: Tuple[float, Optional[float]],
+) -> int:
+    """Get the position of the first row after a cursor, in the order of the rows.
+
+    Args:
+        cursor: Cursor from the previous page.
+        ds: Dataset split, with the prediction table if the column comes from it.
+        sorted_row_indices: row_idx of all rows, in the order of the pages.
+        column: Column the rows are sorted by.
+        descending: Whether the rows are sorted from the largest value.
+        version: Version of the order of the rows.
+
+    Returns:
+        Position of the first row of the page in `sorted_row_indices`.
+
+    Raises:
+        HTTPException: If the cursor is invalid, or expired since the dataset split changed.
+    """
+    try:
+        pagination_cursor = PaginationCursor.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(HTTP_400_BAD_REQUEST, detail=str(e))
+    if pagination_cursor.column != column or pagination_cursor.descending != descending:
+        raise HTTPException(HTTP_400_BAD_REQUEST, detail="The cursor is for another sort order.")
+    row_idx = pagination_cursor.row_idx
+    if (
+        tuple(pagination_cursor.version) != version
+        or not 0 <= row_idx < len(ds)
+        or get_sort_key(ds, row_idx, column) != pagination_cursor.sort_key
+    ):
+        raise HTTPException(
+            HTTP_400_BAD_REQUEST,
+            detail="The cursor expired since the dataset split changed. Reload the first page.",
+        )
+    return int(np.flatnonzero(sorted_row_indices == row_idx)[0]) + 1
+
+
+def get_first_rows_in_mask(
+    row_indices: np.ndarray, get_mask: Callable[[np.ndarray], Optional[np.ndarray]], count: int
+) -> np.ndarray:
+    """Get the first rows in a mask, computing the mask on chunks of rows until there are enough.
+
+    Args:
+        row_indices: row_idx of the rows, in order.
+        get_mask: Function computing the mask of the rows to keep among some row_idx, or None to
+            keep all of them.
+        count: Maximum number of rows to get.
+
+    Returns:
+        row_idx of the first `count` rows in the mask, in order.
+    """
+    chunks = []
+    found, start, chunk_size = 0, 0, max(count, 1)
+    while found < count and start < len(row_indices):
+        rows = row_indices[start : start + chunk_size]
+        mask = get_mask(rows)
+        chunks.append(rows if mask is None else rows[mask])
+        found += len(chunks[-1])
+        start += chunk_size
+        chunk_size *= 2
+    first_rows: np.ndarray = np.concatenate(chunks)[:count] if chunks else row_indices[:0]
+    return first_rows
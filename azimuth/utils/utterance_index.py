@@ -0,0 +1,143 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+from collections import defaultdict
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from azimuth.utils.utterance import clean_utterance
+
+# Code point separating utterances in the concatenated text. It is never part of a trigram.
+SEPARATOR = "\x00"
+# Code points are below 2**21, so a trigram fits in 63 bits.
+CODE_POINT_BITS = 21
+
+
+class UtteranceIndex:
+    """Trigram inverted index to search utterances by substring, row_idx or persistent_id.
+
+    The cleaned utterances are concatenated and each trigram maps to the sorted positions of the
+    utterances containing it. A substring query intersects the posting lists of its trigrams and
+    only checks the remaining candidates. Queries shorter than a trigram are matched on the code
+    points of the concatenated text.
+
+    Args:
+        utterances: Utterances to index.
+        row_indices: row_idx of each utterance.
+        persistent_ids: Persistent id of each utterance.
+    """
+
+    def __init__(
+        self,
+        utterances: Sequence[str],
+        row_indices: Sequence[int],
+        persistent_ids: Sequence[Union[int, str]],
+    ):
+        self._row_indices = np.asarray(row_indices, dtype=np.int64)
+        self._exact_matches: Dict[str, List[int]] = defaultdict(list)
+        for position, (row_idx, persistent_id) in enumerate(zip(row_indices, persistent_ids)):
+            self._exact_matches[str(row_idx)].append(position)
+            self._exact_matches[str(persistent_id)].append(position)
+
+        cleaned = [clean_utterance(utterance).replace(SEPARATOR, " ") for utterance in utterances]
+        self._text = SEPARATOR.join(cleaned)
+        lengths = np.array([len(utterance) for utterance in cleaned], dtype=np.int64)
+        first = np.zeros(1, dtype=np.int64)
+        self._starts = np.concatenate((first, np.cumsum(lengths + 1)[:-1])).astype(np.int64)
+        self._ends = self._starts + lengths
+        self._code_points = np.frombuffer(self._text.encode("utf-32-le"), dtype=np.uint32)
+
+        trigrams = _trigram_codes(self._code_points)
+        valid = np.flatnonzero(
+            (self._code_points[:-2] != 0)
+            & (self._code_points[1:-1] != 0)
+            & (self._code_points[2:] != 0)
+        )
+        codes = trigrams[valid]
+        positions = np.searchsorted(self._starts, valid, side="right") - 1
+        # A stable sort keeps the positions sorted within each trigram.
+        order = np.argsort(codes, kind="stable")
+        codes, positions = codes[order], positions[order]
+        # Remove repeated trigrams in the same utterance.
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (positions[1:] != positions[:-1])
+        codes, self._postings = codes[keep], positions[keep]
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        self._trigrams = codes[np.concatenate((first, boundaries))] if len(codes) else codes
+        self._offsets: np.ndarray = np.concatenate(
+            (first, boundaries, np.array([len(codes)], dtype=np.int64))
+        )
+
+    def __len__(self):
+        return len(self._row_indices)
+
+    def search(self, query: str) -> np.ndarray:
+        """Get the rows whose utterance contains the query, or whose row_idx or persistent_id is it.
+
+        The substring search is done on cleaned utterances, as in `clean_utterance`.
+
+        Args:
+            query: Substring, row_idx or persistent_id to search for.
+
+        Returns:
+            Sorted row_idx of the matching rows.
+        """
+        positions = np.union1d(
+            self._search_substring(clean_utterance(query)),
+            np.array(self._exact_matches.get(query, []), dtype=np.int64),
+        ).astype(np.int64)
+        return np.sort(self._row_indices[positions])
+
+    def _search_substring(self, query: str) -> np.ndarray:
+        if SEPARATOR in query:
+            return np.empty(0, dtype=np.int64)
+        if len(query) < 3:
+            return self._scan_code_points(query)
+
+        query_code_points = np.frombuffer(query.encode("utf-32-le"), dtype=np.uint32)
+        query_trigrams = np.unique(_trigram_codes(query_code_points))
+        slots = np.searchsorted(self._trigrams, query_trigrams)
+        if np.any(slots == len(self._trigrams)) or np.any(
+            self._trigrams[np.minimum(slots, len(self._trigrams) - 1)] != query_trigrams
+        ):
+            return np.empty(0, dtype=np.int64)
+        postings = sorted(
+            (self._postings[self._offsets[slot] : self._offsets[slot + 1]] for slot in slots),
+            key=len,
+        )
+        candidates: np.ndarray = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        if len(query) == 3:
+            return candidates
+        # Trigrams can be in the utterance without being contiguous, so candidates are checked.
+        return np.array(
+            [
+                position
+                for position in candidates
+                if query in self._text[self._starts[position] : self._ends[position]]
+            ],
+            dtype=np.int64,
+        )
+
+    def _scan_code_points(self, query: str) -> np.ndarray:
+        if not query:
+            return np.arange(len(self._row_indices))
+        if len(query) > len(self._code_points):
+            return np.empty(0, dtype=np.int64)
+        match = np.ones(len(self._code_points) - len(query) + 1, dtype=bool)
+        for offset, character in enumerate(query):
+            match &= self._code_points[offset : len(match) + offset] == ord(character)
+        positions = np.searchsorted(self._starts, np.flatnonzero(match), side="right") - 1
+        return np.asarray(np.unique(positions))
+
+
+def _trigram_codes(code_points: np.ndarray) -> np.ndarray:
+    code_points = code_points.astype(np.int64)
+    codes: np.ndarray = (
+        (code_points[:-2] << (2 * CODE_POINT_BITS))
+        | (code_points[1:-1] << CODE_POINT_BITS)
+        | code_points[2:]
+    )
+    return codes
@@ -12,10 +12,20 @@ import pandas as pd
 import pytest
 from datasets import ClassLabel, Dataset, Features, Value
 
+from azimuth import dataset_split_manager
 from azimuth.config import AzimuthValidationError
 from azimuth.dataset_split_manager import DatasetSplitManager, PredictionTableKey
-from azimuth.types import DatasetColumn, DatasetSplitName
-from azimuth.types.tag import ALL_STANDARD_TAGS, ALL_TAGS
+from azimuth.types import DatasetColumn, DatasetFilters, DatasetSplitName, ExportFormat
+from azimuth.types.tag import (
+    ALL_DATA_ACTION_FILTERS,
+    ALL_DATA_ACTIONS,
+    ALL_STANDARD_TAGS,
+    ALL_TAGS,
+    DataAction,
+    SmartTag,
+)
+from azimuth.utils.dataset_operations import get_array_from_ds
+from azimuth.utils.ml.linguistic_analysis import analyze_utterances
 from azimuth.utils.project import load_dataset_from_config
 from tests.test_loading_resources import load_sst2_dataset
 from tests.utils import generate_mocked_dm, get_table_key
@@ -158,6 +168,145 @@ def test_to_csv(simple_text_config):
     )
 
 
+@pytest.mark.parametrize("export_format", [ExportFormat.csv_gz, ExportFormat.parquet])
+def test_export_formats(simple_text_config, export_format):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+    expected = pd.read_csv(dm.save_csv(table_key))
+
+    path = dm.save_csv(table_key, export_format=export_format)
+    assert path.endswith(f".{export_format.value}")
+    df = pd.read_parquet(path) if export_format == ExportFormat.parquet else pd.read_csv(path)
+    assert df.columns.tolist() == expected.columns.tolist()
+    assert df["label"].tolist() == expected["label"].tolist()
+    assert (
+        df[DatasetColumn.postprocessed_prediction].tolist()
+        == expected[DatasetColumn.postprocessed_prediction].tolist()
+    )
+
+
+def test_export_in_chunks(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+    assert b"".join(dm.iter_export(table_key, chunk_size=7)) == b"".join(dm.iter_export(table_key))
+
+
+def test_class_names(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+    class_names = [*dm.get_class_names(), "REJECTION_CLASS"]
+    ds = dm.get_dataset_split(table_key)
+
+    ds_with_class_names = dm.get_dataset_split_with_class_names(table_key)
+    assert ds_with_class_names.column_names == ds.column_names
+    assert ds_with_class_names["label"] == [class_names[label] for label in ds["label"]]
+    assert ds_with_class_names[DatasetColumn.postprocessed_prediction] == [
+        class_names[pred] for pred in ds[DatasetColumn.postprocessed_prediction]
+    ]
+    assert ds_with_class_names[DatasetColumn.model_predictions] == [
+        [class_names[pred] for pred in preds] for preds in ds[DatasetColumn.model_predictions]
+    ]
+    text_input = simple_text_config.columns.text_input
+    assert ds_with_class_names[text_input] == ds[text_input]
+
+    # Cached until the tables are updated.
+    assert dm.get_dataset_split_with_class_names(table_key) is ds_with_class_names
+    dm.add_tags({0: {DataAction.relabel: True}})
+    new_ds_with_class_names = dm.get_dataset_split_with_class_names(table_key)
+    assert new_ds_with_class_names is not ds_with_class_names
+    assert new_ds_with_class_names[0][DataAction.relabel]
+
+    # Only the selected rows are decoded, in their order.
+    rows = dm.decode_class_names(ds.select([5, 2]))
+    assert rows.to_dict() == new_ds_with_class_names.select([5, 2]).to_dict()
+
+
+def test_get_rows(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+
+    rows = dm.get_rows([5, 2, 5], table_key)
+    ds_with_class_names = dm.get_dataset_split_with_class_names(table_key)
+    assert rows == [ds_with_class_names[5], ds_with_class_names[2], ds_with_class_names[5]]
+
+    ds = dm.get_dataset_split(table_key)
+    assert dm.get_rows([3], table_key, with_class_names=False) == [ds[3]]
+    # Without a table key, only the base dataset_split is used.
+    assert dm.get_rows([3], with_class_names=False) == [dm.get_dataset_split()[3]]
+    assert dm.get_rows([]) == []
+
+
+def test_linguistic_analysis(simple_text_config, monkeypatch):
+    dm = generate_mocked_dm(simple_text_config)
+    utterances = dm.get_dataset_split()[simple_text_config.columns.text_input]
+
+    analysis = dm.get_linguistic_analysis("en_core_web_sm")
+    assert analysis.equals(analyze_utterances(utterances, "en_core_web_sm"))
+    assert dm.get_linguistic_analysis("en_core_web_sm") is analysis
+
+    # Saved next to the dataset_split for other processes, and still valid after adding tags.
+    dm.add_tags({0: {DataAction.relabel: True}})
+    monkeypatch.setattr(dataset_split_manager, "analyze_utterances", None)  # Not called again
+    new_dm = DatasetSplitManager(
+        dm.name, simple_text_config, initial_tags=[], initial_prediction_tags=[]
+    )
+    assert new_dm.get_linguistic_analysis("en_core_web_sm").equals(analysis)
+
+
+def test_sorted_row_indices(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+    ds = dm.get_dataset_split_with_class_names(table_key)
+
+    label = simple_text_config.columns.label
+    row_indices = dm.get_sorted_row_indices(label, table_key)
+    assert sorted(row_indices.tolist()) == list(range(dm.num_rows))
+    labels = [ds[int(idx)][label] for idx in row_indices]
+    assert labels == sorted(labels)  # Sorted by class name
+    # Ties are sorted by row_idx.
+    assert list(row_indices) == sorted(row_indices, key=lambda idx: (ds[int(idx)][label], idx))
+
+    row_indices = dm.get_sorted_row_indices(
+        DatasetColumn.postprocessed_confidences, table_key, descending=True
+    )
+    confidences = [ds[int(idx)][DatasetColumn.postprocessed_confidences][0] for idx in row_indices]
+    assert confidences == sorted(confidences, reverse=True)
+    assert dm.get_sorted_row_indices(DatasetColumn.row_idx, descending=True).tolist() == list(
+        reversed(range(dm.num_rows))
+    )
+
+    # Cached until something else than data actions is updated.
+    assert dm.get_sorted_row_indices(label, table_key) is dm.get_sorted_row_indices(
+        label, table_key
+    )
+    cached = dm.get_sorted_row_indices(label, table_key)
+    version = dm.get_sort_version(table_key)
+    dm.add_tags({0: {DataAction.relabel: True}})
+    assert dm.get_sorted_row_indices(label, table_key) is cached
+    assert dm.get_sort_version(table_key) == version
+    dm.add_tags({0: {SmartTag.long: True}})
+    assert dm.get_sorted_row_indices(label, table_key) is not cached
+    assert dm.get_sort_version(table_key) != version
+
+
+def test_filtered_count(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+    assert dm.get_filtered_count(DatasetFilters(), table_key) == dm.num_rows
+    filters = DatasetFilters(data_action=[DataAction.relabel])
+    ds = dm.get_dataset_split(table_key)
+    expected = sum(ds[DataAction.relabel])
+    assert dm.get_filtered_count(filters, table_key) == expected
+
+    # Cached until the tables are updated, including data actions.
+    cached = dm._filtered_counts[(filters.json(), table_key, False)]
+    assert dm.get_filtered_count(filters, table_key) == expected
+    assert dm._filtered_counts[(filters.json(), table_key, False)] is cached
+    row_idx = ds[DataAction.relabel].index(False)
+    dm.add_tags({row_idx: {DataAction.relabel: True}})
+    assert dm.get_filtered_count(filters, table_key) == expected + 1
+
+
 def test_to_csv_no_model(simple_text_config):
     dm = generate_mocked_dm(simple_text_config)
     dm.config.name = "newName"
@@ -285,6 +434,42 @@ def test_multi_tables(a_text_dataset, simple_text_config):
         dm.add_column("is_potato2", [])
 
 
+def test_prediction_arrays(a_text_dataset, simple_text_config):
+    table_key = get_table_key(simple_text_config)
+    dm = DatasetSplitManager(
+        name="potato",
+        config=simple_text_config,
+        initial_tags=["a", "b", "c"],
+        dataset_split=a_text_dataset,
+    )
+    confidences = np.random.rand(dm.num_rows, 3)
+    dm.add_array_to_prediction_table("confidences", confidences, table_key)
+
+    ds = dm.get_dataset_split(table_key)
+    assert ds.features["confidences"].length == 3
+    assert np.allclose(ds["confidences"], confidences)
+    array = dm.get_prediction_array("confidences", table_key)
+    assert array.shape == (dm.num_rows, 3) and np.allclose(array, confidences)
+    # Selections of rows are supported.
+    assert np.allclose(get_array_from_ds(ds.select([4, 2]), "confidences"), confidences[[4, 2]])
+
+    # Variable-length columns with rows of the same length are supported too.
+    dm.add_column_to_prediction_table("confidences_list", confidences.tolist(), table_key)
+    assert np.allclose(dm.get_prediction_array("confidences_list", table_key), confidences)
+    # Null rows are NaN, even if the first rows are null.
+    with_nulls = Dataset.from_dict({"confidences": [None, [0.1, 0.9], None, [0.6, 0.4]]})
+    assert np.allclose(
+        get_array_from_ds(with_nulls, "confidences"),
+        [[np.nan, np.nan], [0.1, 0.9], [np.nan, np.nan], [0.6, 0.4]],
+        equal_nan=True,
+    )
+    with pytest.raises(ValueError, match="same length"):
+        get_array_from_ds(Dataset.from_dict({"confidences": [[0.1], [0.6, 0.4]]}), "confidences")
+
+    with pytest.raises(ValueError, match="Can't add an array"):
+        dm.add_array_to_prediction_table("confidences", confidences[1:], table_key)
+
+
 def test_caching(a_text_dataset, simple_text_config):
     simple_table_key = get_table_key(simple_text_config)
     dm1 = DatasetSplitManager(
@@ -459,3 +644,34 @@ def test_export_proposed_actions(simple_text_config, a_text_dataset):
     assert list(df.columns) == [simple_text_config.columns.persistent_id, "proposed_action"]
     assert list(df[simple_text_config.columns.persistent_id]) == [0, 2]
     assert list(df["proposed_action"]) == ["remove", "relabel"]
+
+
+def test_data_action_statistics(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    table_key = get_table_key(simple_text_config)
+    last_update = dm.last_update_excluding_data_actions
+    relabel_idx = ALL_DATA_ACTION_FILTERS.index(DataAction.relabel)
+    no_action_idx = ALL_DATA_ACTION_FILTERS.index(DataAction.no_action)
+
+    statistics = dm.get_data_action_statistics(table_key)
+    initial_relabel_count = statistics.utterance_count[relabel_idx]
+    initial_no_action_count = statistics.utterance_count[no_action_idx]
+    assert statistics.confusion[relabel_idx].sum() == initial_relabel_count
+
+    # Only data actions changed, the same statistics are updated.
+    row_idx = next(
+        idx for idx, tags in dm.get_tags().items() if not any(tags[t] for t in ALL_DATA_ACTIONS)
+    )
+    dm.add_tags({row_idx: {DataAction.relabel: True}})
+    assert dm.last_update > last_update
+    assert dm.last_update_excluding_data_actions == last_update
+    assert dm.get_data_action_statistics(table_key) is statistics
+    assert statistics.utterance_count[relabel_idx] == initial_relabel_count + 1
+    assert statistics.utterance_count[no_action_idx] == initial_no_action_count - 1
+
+    # Other changes recompute the statistics.
+    dm.add_tags({row_idx: {SmartTag.long: True}})
+    assert dm.last_update_excluding_data_actions > last_update
+    new_statistics = dm.get_data_action_statistics(table_key)
+    assert new_statistics is not statistics
+    assert np.array_equal(new_statistics.confusion, statistics.confusion)
@@ -63,6 +63,8 @@ def test_syntax_tagging(tiny_text_config):
     json_output_all = mod.compute_on_dataset_split()
     ds = mod.get_dataset_split()
     assert len(json_output_all) == len(ds)
+    # The shared linguistic analysis gives the same tags as analyzing the utterances directly.
+    assert json_output_all == mod.compute(ds)
 
 
 def test_syntax_tagging_french(simple_text_config_french):
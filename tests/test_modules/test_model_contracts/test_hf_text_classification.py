@@ -1,17 +1,20 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
+from types import SimpleNamespace
 from typing import List, cast
 
 import numpy as np
 import pytest
 import torch
 from datasets import Dataset
+from scipy.special import expit, softmax
 
 from azimuth.modules.model_contracts import HFTextClassificationModule
 from azimuth.types import DatasetSplitName, ModuleOptions, SupportedMethod
 from azimuth.types.general.module_arguments import GradientCalculation
 from azimuth.types.task import PredictionResponse, SaliencyResponse
+from azimuth.utils.ml.mc_dropout import MCDropout
 from azimuth.utils.ml.saliency import find_word_embeddings_layer
 
 
@@ -106,6 +109,57 @@ def test_prediction(simple_text_config):
         assert pred_res.postprocessed_output.probs.shape == (1, 2)
 
 
+def test_prediction_cache(simple_text_config):
+    mod = HFTextClassificationModule(
+        DatasetSplitName.eval,
+        simple_text_config,
+        mod_options=ModuleOptions(
+            model_contract_method_name=SupportedMethod.Predictions, pipeline_index=0
+        ),
+    )
+    batch = Dataset.from_dict(
+        {
+            simple_text_config.columns.text_input: ["cached red", "cached blue", "cached red"],
+            simple_text_config.columns.label: [1, 0, 1],
+        }
+    )
+    cache = mod.get_prediction_cache()
+    hits = cache.hits
+    res = cast(List[PredictionResponse], mod.compute(batch))
+    assert cache.hits == hits
+
+    # The model only runs on utterances which are not in the cache.
+    predicted = []
+    hf_pipeline = mod.get_model()
+
+    def predict_fn(texts):
+        predicted.extend(texts)
+        return hf_pipeline(texts, truncation=True)
+
+    probs = mod.get_model_probs(["cached red", "cached green", "cached blue"], predict_fn)
+    assert predicted == ["cached green"]
+    assert cache.hits == hits + 2
+    assert np.allclose(probs[0], res[0].model_output.probs[0])
+    assert np.allclose(probs[2], res[1].model_output.probs[0])
+
+    # Postprocessing is not cached.
+    thresholded = cast(
+        List[PredictionResponse],
+        HFTextClassificationModule(
+            DatasetSplitName.eval,
+            simple_text_config,
+            mod_options=ModuleOptions(
+                model_contract_method_name=SupportedMethod.Predictions,
+                pipeline_index=0,
+                threshold=1.0,
+            ),
+        ).compute(batch),
+    )
+    assert all(
+        pred.postprocessed_output.preds[0] != pred.model_output.preds[0] for pred in thresholded
+    )
+
+
 def test_rejection_class(simple_text_config):
     mod = HFTextClassificationModule(
         DatasetSplitName.eval,
@@ -154,6 +208,60 @@ def test_mc_dropout(simple_text_config):
     assert p1.epistemic == 0 and p2.epistemic > 0
 
 
+def test_mc_dropout_fused_iterations(simple_text_config):
+    batch = Dataset.from_dict(
+        {
+            "utterance": ["this is hell.", "hello new york", "I like potatoes."],
+            "label": [1, 2, 3],
+        }
+    )
+    simple_text_config.uncertainty.iterations = 7
+    mod = HFTextClassificationModule(
+        DatasetSplitName.eval,
+        simple_text_config,
+        mod_options=ModuleOptions(
+            model_contract_method_name=SupportedMethod.Predictions, pipeline_index=0
+        ),
+    )
+    hf_pipeline = mod.get_model()
+    expected = mod.extract_probs_from_output(
+        hf_pipeline(batch["utterance"], num_workers=0, truncation=True)
+    )
+
+    # Without dropout, all iterations are identical to the pipeline output.
+    dropouts = [m for m in hf_pipeline.model.modules() if isinstance(m, torch.nn.Dropout)]
+    initial_p = [m.p for m in dropouts]
+    for m in dropouts:
+        m.p = 0.0
+    try:
+        with MCDropout(hf_pipeline.model):
+            n_predictions = mod._get_fused_mc_dropout_probs(hf_pipeline, batch["utterance"])
+    finally:
+        for m, p in zip(dropouts, initial_p):
+            m.p = p
+    assert n_predictions.shape == (3, expected.shape[1], 7)
+    assert np.allclose(n_predictions, expected[..., None], atol=1e-5)
+
+    # With dropout, each replicated row gets its own mask.
+    with MCDropout(hf_pipeline.model):
+        n_predictions = mod._get_fused_mc_dropout_probs(hf_pipeline, batch["utterance"])
+    assert not np.allclose(n_predictions[..., 0], n_predictions[..., 1])
+
+
+def test_fused_probs_classification_function():
+    logits = np.array([[2.0, -1.0], [0.5, 0.5]])
+
+    def get_probs(**model_config):
+        model_config = {"problem_type": None, "num_labels": 2, **model_config}
+        hf_pipeline = SimpleNamespace(model=SimpleNamespace(config=SimpleNamespace(**model_config)))
+        return HFTextClassificationModule._apply_classification_function(hf_pipeline, logits)
+
+    # Same functions as the pipeline postprocessing.
+    assert np.allclose(get_probs(), softmax(logits, -1))
+    assert np.allclose(get_probs(problem_type="multi_label_classification"), expit(logits))
+    assert np.allclose(get_probs(num_labels=1), expit(logits))
+
+
 def test_find_layer_by_name(simple_text_config):
     task = HFTextClassificationModule(
         dataset_split_name=DatasetSplitName.eval,
@@ -137,6 +137,30 @@ def test_post_process(simple_text_config):
     )
 
 
+@pytest.mark.parametrize("threshold", [0, 0.1, 0.9])
+def test_post_process_preds(simple_text_config, threshold):
+    mod = HFTextClassificationModule(
+        DatasetSplitName.eval,
+        simple_text_config,
+        mod_options=ModuleOptions(
+            threshold=threshold,
+            model_contract_method_name=SupportedMethod.PostProcess,
+            pipeline_index=0,
+            indices=[1, 2, 3],
+        ),
+    )
+    res = cast(List[PredictionResponse], mod.compute_on_dataset_split())
+    model_preds, postprocessed_preds = mod.post_process_preds(mod.get_dataset_split())
+    # Postprocessing all predictions at once gives the same result as the responses.
+    assert model_preds.tolist() == [pred.model_output.preds[0] for pred in res]
+    assert postprocessed_preds.tolist() == [pred.postprocessed_output.preds[0] for pred in res]
+
+    probs, epistemic = mod.stack_probabilities(res)
+    assert probs.shape == (3, mod.get_dataset_split_manager().get_num_classes(labels_only=True))
+    assert np.allclose(probs, [pred.model_output.probs[0] for pred in res])
+    assert epistemic == [0.0] * 3
+
+
 def test_post_process_file_based(file_text_config_top1):
     indices = [1, 2, 3]
     mod_low = FileBasedTextClassificationModule(
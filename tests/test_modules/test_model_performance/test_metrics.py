@@ -1,7 +1,7 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import Dict
 
 import datasets
@@ -16,9 +16,10 @@ from azimuth.modules.model_performance.outcome_count import (
 )
 from azimuth.modules.model_performance.outcomes import OutcomesModule
 from azimuth.plots.ece import make_ece_figure
-from azimuth.types import DatasetFilters, DatasetSplitName, ModuleOptions
+from azimuth.types import DatasetColumn, DatasetFilters, DatasetSplitName, ModuleOptions
 from azimuth.types.outcomes import OutcomeName, OutcomeResponse
 from azimuth.types.tag import SMART_TAGS_FAMILY_MAPPING, DataAction, SmartTag
+from azimuth.utils.dataset_operations import filter_dataset_split
 from tests.utils import save_outcomes, save_predictions
 
 
@@ -40,6 +41,11 @@ def test_metrics(tiny_text_config):
 
     assert metrics_res.utterance_count == len(ds)
 
+    # Probabilities are in the class order.
+    probs = metrics_mod.make_probabilities()
+    assert probs.argmax(-1).tolist() == [preds[0] for preds in ds[DatasetColumn.model_predictions]]
+    assert np.allclose(np.sort(probs)[:, ::-1], ds[DatasetColumn.postprocessed_confidences])
+
     # Check that outcome count match utterance count
     assert sum(metrics_res.outcome_count.values()) == len(ds)
     # Check that outcome and accuracy are close.
@@ -159,6 +165,17 @@ def test_outcome_count_per_threshold(tiny_text_config):
         )
     assert not all(len(set(counts)) == 1 for counts in outcomes_for_all_threshold.values())
 
+    # The sweep gives the same counts as computing the outcomes for each threshold.
+    for rg_per_th in result.outcome_count_per_threshold:
+        outcomes = OutcomesModule(
+            DatasetSplitName.eval,
+            tiny_text_config,
+            mod_options=ModuleOptions(threshold=float(rg_per_th.threshold), pipeline_index=0),
+        ).compute_on_dataset_split()
+        assert rg_per_th.outcome_count == Counter(
+            outcome.postprocessed_outcome for outcome in outcomes
+        )
+
 
 def test_outcome_count_per_filter(tiny_text_config):
     save_predictions(tiny_text_config)
@@ -295,6 +312,45 @@ def test_metrics_per_filter(tiny_text_config, apply_mocked_startup_task):
         assert len(smart_tag_metrics) == len(smart_tags) + 1
 
 
+def test_metrics_per_filter_same_as_filtering(tiny_text_config, apply_mocked_startup_task):
+    apply_mocked_startup_task(tiny_text_config)
+    mod_options = ModuleOptions(pipeline_index=0)
+    mf_module = MetricsPerFilterModule(
+        dataset_split_name=DatasetSplitName.eval,
+        config=tiny_text_config,
+        mod_options=mod_options,
+    )
+    [result] = mf_module.compute_on_dataset_split()
+    metrics_module = MetricsModule(
+        dataset_split_name=DatasetSplitName.eval, config=tiny_text_config, mod_options=mod_options
+    )
+    ds = mf_module.get_dataset_split()
+    class_names = mf_module.get_dataset_split_manager().get_class_names()
+
+    def expected_metrics(filters: DatasetFilters):
+        filtered = filter_dataset_split(ds, filters, config=tiny_text_config)
+        return metrics_module.compute_metrics(filtered)[0]
+
+    to_check = [
+        (metric, DatasetFilters(label=[class_names.index(metric.filter_value)]))
+        for metric in result.metrics_per_filter.label
+    ] + [
+        (metric, DatasetFilters(prediction=[class_names.index(metric.filter_value)]))
+        for metric in result.metrics_per_filter.prediction
+    ]
+    for family in SMART_TAGS_FAMILY_MAPPING:
+        to_check += [
+            (metric, DatasetFilters(smart_tags={family: [metric.filter_value]}))
+            for metric in getattr(result.metrics_per_filter, family.value)
+        ]
+    for metric, filters in to_check:
+        expected = expected_metrics(filters)
+        assert metric.utterance_count == expected.utterance_count
+        assert metric.outcome_count == expected.outcome_count
+        assert metric.ece == pytest.approx(expected.ece)
+        assert metric.custom_metrics == pytest.approx(expected.custom_metrics)
+
+
 _CITATION = """\
 """
 
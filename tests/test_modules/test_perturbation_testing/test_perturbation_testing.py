@@ -1,8 +1,12 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
+import os
 import re
 
+import pytest
+from datasets import Dataset
+
 from azimuth.modules.perturbation_testing.perturbation_testing import PerturbationTestingModule
 from azimuth.types import DatasetColumn, DatasetSplitName, ModuleOptions
 from azimuth.types.perturbation_testing import (
@@ -15,13 +19,14 @@ from azimuth.types.perturbation_testing import (
     PerturbedUtteranceResult,
 )
 from azimuth.types.tag import SmartTag
+from azimuth.utils.ml import perturbation_test
 from azimuth.utils.ml.perturbation_functions import (
     get_utterances_diff,
     remove_or_add_contractions,
     remove_or_add_final_punctuation,
     typo,
 )
-from azimuth.utils.ml.perturbation_test import PerturbationTest
+from azimuth.utils.ml.perturbation_test import PerturbationTest, get_perturbation_tests
 from tests.utils import get_table_key
 
 
@@ -75,7 +80,68 @@ def test_perturbation_testing(simple_text_config):
     assert len(res[0]) >= num_suf_neutrals + num_pre_neutrals + 7
 
 
-def test_typo_deterministic(simple_text_config):
+def test_perturbation_testing_single_inference(simple_text_config, monkeypatch):
+    mod = PerturbationTestingModule(
+        DatasetSplitName.eval,
+        config=simple_text_config,
+        mod_options=ModuleOptions(pipeline_index=0, indices=[0, 1]),
+    )
+    get_preds = mod.get_preds
+    num_perturbed_utterances = []
+
+    def counting_get_preds(batch):
+        num_perturbed_utterances.append(len(batch))
+        return get_preds(batch)
+
+    monkeypatch.setattr(mod, "get_preds", counting_get_preds)
+    res = mod.compute_on_dataset_split()
+    # The perturbed utterances of all tests are predicted at once, and never the original ones.
+    assert len(num_perturbed_utterances) == len(mod.get_batches(mod.get_dataset_split()))
+    assert sum(num_perturbed_utterances) == sum(len(utt_res) for utt_res in res)
+
+    # Identical utterances get the same prediction.
+    batch = Dataset.from_dict(
+        {
+            simple_text_config.columns.text_input: ["hello world", "bye", "hello world"],
+            simple_text_config.columns.label: [0, 1, 1],
+            DatasetColumn.row_idx: [0, 1, 2],
+        }
+    )
+    preds = get_preds(batch)
+    assert len(preds) == 3 and preds[0] == preds[2]
+
+
+def test_get_perturbation_tests(simple_text_config):
+    perturbation_tests = get_perturbation_tests(simple_text_config)
+    assert [t.name for t in perturbation_tests] == [
+        t.name
+        for t in PerturbationTestingModule(
+            DatasetSplitName.eval,
+            config=simple_text_config,
+            mod_options=ModuleOptions(pipeline_index=0),
+        ).perturbation_tests
+    ]
+    # Tests are created once per set of thresholds.
+    assert all(
+        test is cached_test
+        for test, cached_test in zip(perturbation_tests, get_perturbation_tests(simple_text_config))
+    )
+    config = simple_text_config.copy(deep=True)
+    config.behavioral_testing.typo.threshold += 0.1
+    [typo_test] = [
+        t for t in get_perturbation_tests(config) if t.name == PerturbationTestName.typos
+    ]
+    assert typo_test.conf_delta_threshold == config.behavioral_testing.typo.threshold
+
+
+@pytest.fixture
+def perturbation_executors():
+    yield
+    # The pools are kept for the whole process otherwise.
+    perturbation_test.shutdown_perturbation_executors()
+
+
+def test_typo_deterministic(simple_text_config, monkeypatch, perturbation_executors):
     mod = PerturbationTestingModule(
         DatasetSplitName.eval,
         config=simple_text_config,
@@ -91,31 +157,42 @@ def test_typo_deterministic(simple_text_config):
         expect_flip=False,
     )
 
-    batch_to_try = {
-        "utterance": ["Let's see if it is deterministic!"],
-        "label": [1],
-        DatasetColumn.row_idx: [0],
-    }
+    utterances = ["Let's see if it is deterministic!"]
 
-    first_try = mod.get_test_results(
-        typo_test_case,
-        batch=batch_to_try,
-    )
+    [first_try] = mod.generate_perturbations(utterances, [typo_test_case])
 
     # we have 3 typo tests
     assert len(first_try[0]) == 3
 
-    second_try = mod.get_test_results(
-        typo_test_case,
-        batch=batch_to_try,
-    )
+    [second_try] = mod.generate_perturbations(utterances, [typo_test_case])
     assert all(
         [
-            first.perturbed_utterance[0] == sec.perturbed_utterance[0]
+            first.perturbed_utterance == sec.perturbed_utterance
             for first, sec in zip(first_try[0], second_try[0])
         ]
     )
 
+    # Perturbations of a row don't depend on the other rows, nor on the number of processes.
+    [many_rows] = mod.generate_perturbations(
+        utterances * 4, [typo_test_case], row_indices=[1, 0, 2, 0]
+    )
+    assert many_rows[1] == many_rows[3] == first_try[0]
+    monkeypatch.setattr(perturbation_test, "PERTURBATION_BATCH_SIZE", 1)
+    monkeypatch.setattr(perturbation_test, "PERTURBATION_MAX_PROCESSES", 2)
+    assert perturbation_test.get_perturbation_n_process(4) == 2
+    [parallel_rows] = mod.generate_perturbations(
+        utterances * 4, [typo_test_case], row_indices=[1, 0, 2, 0]
+    )
+    assert parallel_rows == many_rows
+    # The pool of processes is kept for the next calls.
+    executor = perturbation_test.get_perturbation_executor(2)
+    assert mod.generate_perturbations(
+        utterances * 4, [typo_test_case], row_indices=[1, 0, 2, 0]
+    ) == [parallel_rows]
+    assert perturbation_test.get_perturbation_executor(2) is executor
+    perturbation_test.shutdown_perturbation_executors()
+    assert perturbation_test.get_perturbation_executor(2) is not executor
+
 
 def test_typo_hyphens(simple_text_config):
     original = "what's the total I've spent on shoes this month?"
@@ -235,5 +312,32 @@ def test_save(simple_text_config):
     ]
     mod.save_result(res, dm)
     simple_table_key = get_table_key(simple_text_config)
-    assert any(dm.get_dataset_split(simple_table_key)[SmartTag.failed_fuzzy_matching])
-    assert any(dm.get_dataset_split(simple_table_key)[SmartTag.failed_punctuation])
+    ds = dm.get_dataset_split(simple_table_key)
+    # Punctuation fails on even rows and fuzzy matching on odd rows.
+    assert ds[SmartTag.failed_punctuation] == [idx % 2 == 0 for idx in range(dm.num_rows)]
+    assert ds[SmartTag.failed_fuzzy_matching] == [idx % 2 == 1 for idx in range(dm.num_rows)]
+
+
+def test_results_table(tiny_text_config):
+    mod = PerturbationTestingModule(
+        DatasetSplitName.eval,
+        config=tiny_text_config,
+        mod_options=ModuleOptions(pipeline_index=0),
+    )
+    res = mod.compute_on_dataset_split()
+    mod.save_result(res, mod.get_dataset_split_manager())
+    table = mod.get_results_table()
+    assert table.num_rows == sum(len(utt_res) for utt_res in res)
+    assert table.column("row_idx").to_pylist() == [
+        row_idx for row_idx, utt_res in enumerate(res) for _ in utt_res
+    ]
+    assert table.column("failed").to_pylist() == [
+        test_res.failed for utt_res in res for test_res in utt_res
+    ]
+    # Saved next to the cache, until the results in the cache change.
+    assert mod.get_results_table().equals(table)
+    # Made from the results in the cache until they are saved.
+    mod._store_data_in_cache(res, mod.get_caching_indices())
+    assert not os.path.exists(mod._results_table_path)
+    assert mod.get_results_table().equals(table)
+    assert os.path.exists(mod._results_table_path)
@@ -26,7 +26,6 @@ def test_perturbation_testing_summary(tiny_text_config):
         config=tiny_text_config,
         mod_options=ModuleOptions(pipeline_index=0),
     )
-
     res = mod_sum.compute_on_dataset_split()[0].all_tests_summary
 
     # Check that all perturbation tests are included in the table (except contractions which is not
@@ -59,6 +58,5 @@ def test_perturbation_testing_summary_one_ds(tiny_text_config_one_ds):
         config=tiny_text_config_one_ds,
         mod_options=ModuleOptions(pipeline_index=0),
     )
-
     res = mod_sum.compute_on_dataset_split()[0]
     assert all(getattr(t, f"{other_ds_name}_count") == 0 for t in res.all_tests_summary)
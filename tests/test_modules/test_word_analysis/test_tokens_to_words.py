@@ -65,3 +65,17 @@ def test_top_words_get_tokens_saliencies(tiny_text_config):
     )
     rec = mod.get_tokens_saliencies([0, 1])
     assert len(rec) == 2
+
+
+def test_get_words_from_word_ids(tiny_text_config):
+    mod = TokensToWordsModule(
+        DatasetSplitName.eval,
+        tiny_text_config,
+        mod_options=ModuleOptions(pipeline_index=0, indices=[0, 1]),
+    )
+    records = mod.get_tokens_saliencies([0, 1])
+    json_output = mod.compute_on_dataset_split()
+    for record, words_record in zip(records, json_output):
+        assert not any(word.startswith("##") for word in words_record.words)
+        assert len(words_record.words) == len(words_record.saliency)
+        assert np.isclose(sum(record.saliency), sum(words_record.saliency))
@@ -5,7 +5,7 @@
 import numpy as np
 
 from azimuth.modules.word_analysis.top_words import TopWordsModule
-from azimuth.types import DatasetSplitName, ModuleOptions
+from azimuth.types import DatasetFilters, DatasetSplitName, ModuleOptions
 from azimuth.types.word_analysis import TokensToWordsResponse
 from tests.utils import save_predictions
 
@@ -53,6 +53,21 @@ def test_top_words_with_saliency(simple_text_config, apply_mocked_startup_task,
     [json_output] = mod.compute_on_dataset_split()
     assert len(json_output.all) > 0
     assert len(json_output.right) > 0 or len(json_output.errors) > 0
+    assert {"[cls]", "[sep]"}.isdisjoint(
+        top_words_result.word for top_words_result in json_output.all
+    )
+
+    # The saliency of the words is computed once for all filters.
+    filtered_mod = TopWordsModule(
+        dataset_split_name=DatasetSplitName.eval,
+        config=simple_text_config,
+        mod_options=ModuleOptions(top_x=4, pipeline_index=0, filters=DatasetFilters(label=[0])),
+    )
+    monkeypatch.setattr(filtered_mod, "get_words_saliencies", None)  # Not called again
+    [filtered_output] = filtered_mod.compute_on_dataset_split()
+    assert sum(top_words_result.count for top_words_result in filtered_output.all) <= sum(
+        top_words_result.count for top_words_result in json_output.all
+    )
 
 
 def test_top_words_without_saliency(file_text_config_top1):
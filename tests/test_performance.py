@@ -1,8 +1,29 @@
+import os
 import time
 
+import numpy as np
+import pytest
+import spacy
+from datasets import Dataset
+
+from azimuth.config import BatchingStrategy
+from azimuth.modules.dataset_analysis.syntax_tagging import SyntaxTaggingModule
 from azimuth.modules.model_contracts import HFTextClassificationModule
-from azimuth.types import DatasetFilters, DatasetSplitName, ModuleOptions, SupportedMethod
+from azimuth.modules.model_performance.confidence_binning import ConfidenceHistogramModule
+from azimuth.types import (
+    DatasetColumn,
+    DatasetFilters,
+    DatasetSplitName,
+    ModuleOptions,
+    SupportedMethod,
+)
+from azimuth.types.outcomes import OutcomeName
+from azimuth.types.tag import DataAction, SmartTag, SmartTagFamily
 from azimuth.utils.dataset_operations import filter_dataset_split
+from azimuth.utils.ml.ece import compute_ece_from_bins
+from azimuth.utils.ml.linguistic_analysis import load_spacy_model
+from azimuth.utils.ml.prediction_cache import PredictionCache
+from tests.utils import generate_mocked_dm, get_table_key
 
 
 def test_dataset_processing_speed(simple_text_config):
@@ -30,3 +51,156 @@ def test_dataset_processing_speed(simple_text_config):
     )
     stop = time.perf_counter()
     assert (stop - start) <= 0.0003
+
+
+def test_batching_strategy_padding(simple_text_config, monkeypatch, tmp_path):
+    # Synthetic long-tail dataset, where a few utterances are much longer than the others.
+    rng = np.random.default_rng(2022)
+    word_counts = np.minimum(rng.lognormal(mean=2, sigma=1, size=256).astype(int) + 1, 200)
+    utterances = [" ".join(["word"] * count) for count in word_counts]
+    ds = Dataset.from_dict(
+        {
+            simple_text_config.columns.text_input: utterances,
+            simple_text_config.columns.label: [0] * len(utterances),
+            DatasetColumn.row_idx: list(range(len(utterances))),
+        }
+    )
+
+    padded_sizes = {}
+    probs = {}
+    for strategy in BatchingStrategy:
+        config = simple_text_config.copy(update={"batching_strategy": strategy})
+        mod = HFTextClassificationModule(
+            DatasetSplitName.eval,
+            config,
+            mod_options=ModuleOptions(
+                model_contract_method_name=SupportedMethod.Predictions, pipeline_index=0
+            ),
+        )
+        hf_pipeline = mod.get_model()
+        forward_passes = []
+
+        def recording_pipeline(texts, batch_size, **kwargs):
+            forward_passes.extend(
+                texts[i : i + batch_size] for i in range(0, len(texts), batch_size)
+            )
+            return hf_pipeline(texts, batch_size=batch_size, **kwargs)
+
+        monkeypatch.setattr(mod, "get_dataset_split", lambda name=None: ds)
+        monkeypatch.setattr(mod, "get_model", lambda: recording_pipeline)
+        # An empty cache for each strategy, so that all utterances are predicted.
+        cache = PredictionCache(str(tmp_path / f"{strategy.value}.h5"))
+        monkeypatch.setattr(mod, "get_prediction_cache", lambda: cache)
+        res = mod.compute_on_dataset_split()
+
+        # The batches of `get_batches` are the forward passes of the pipeline.
+        assert [len(texts) for texts in forward_passes] == [
+            len(batch) for batch in mod.get_batches(ds)
+        ]
+        padded_sizes[strategy] = sum(
+            len(texts) * max(len(text.split()) for text in texts) for texts in forward_passes
+        )
+        probs[strategy] = np.stack([r.model_output.probs[0] for r in res])
+
+    # Grouping utterances of similar lengths reduces the padding, without changing predictions.
+    assert (
+        padded_sizes[BatchingStrategy.sorted_by_length] < padded_sizes[BatchingStrategy.contiguous]
+    )
+    assert padded_sizes[BatchingStrategy.token_budget] < padded_sizes[BatchingStrategy.contiguous]
+    assert np.allclose(
+        probs[BatchingStrategy.token_budget], probs[BatchingStrategy.contiguous], atol=1e-4
+    )
+
+
+def test_syntax_tagging_loads_model_once(tiny_text_config, monkeypatch):
+    rng = np.random.default_rng(2022)
+    words = ["I", "am", "looking", "for", "sugar", "and", "cookies", "detect", "files", "."]
+    utterances = [" ".join(rng.choice(words, size=rng.integers(2, 20))) for _ in range(512)]
+    mod = SyntaxTaggingModule(DatasetSplitName.eval, tiny_text_config)
+
+    spacy_load = spacy.load
+    loaded = []
+
+    def counting_load(*args, **kwargs):
+        loaded.append(args)
+        return spacy_load(*args, **kwargs)
+
+    load_spacy_model.cache_clear()
+    monkeypatch.setattr(spacy, "load", counting_load)
+    first = mod.compute({"utterance": utterances})
+
+    # The second batch reuses the spaCy model and parses all utterances with a single `pipe`.
+    spacy_model = load_spacy_model(tiny_text_config.syntax.spacy_model)
+    pipe = spacy_model.pipe
+    piped = []
+
+    def counting_pipe(texts, **kwargs):
+        texts = list(texts)
+        piped.append(len(texts))
+        return pipe(texts, **kwargs)
+
+    monkeypatch.setattr(spacy_model, "pipe", counting_pipe)
+    second = mod.compute({"utterance": utterances})
+    assert len(loaded) == 1
+    assert piped == [len(utterances)]
+    assert second == first
+
+
+@pytest.mark.skipif(
+    not os.environ.get("AZIMUTH_BENCHMARK"), reason="Benchmark, set AZIMUTH_BENCHMARK=1 to run."
+)
+def test_syntax_tagging_throughput(tiny_text_config, record_property):
+    # The throughput is reported in the JUnit XML report, such as with `--junitxml=report.xml`.
+    rng = np.random.default_rng(2022)
+    words = ["I", "am", "looking", "for", "sugar", "and", "cookies", "detect", "files", "."]
+    utterances = [" ".join(rng.choice(words, size=rng.integers(2, 20))) for _ in range(2048)]
+    mod = SyntaxTaggingModule(DatasetSplitName.eval, tiny_text_config)
+    mod.compute({"utterance": utterances[:8]})  # Loads the spaCy model.
+
+    start = time.perf_counter()
+    result = mod.compute({"utterance": utterances})
+    elapsed = time.perf_counter() - start
+    assert len(result) == len(utterances)
+    record_property("syntax_tagging_utterances_per_sec", round(len(utterances) / elapsed, 1))
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        DatasetFilters(label=[0]),
+        DatasetFilters(prediction=[0]),
+        DatasetFilters(outcome=[OutcomeName.CorrectAndPredicted]),
+        DatasetFilters(confidence_min=0.2, confidence_max=0.8),
+        DatasetFilters(utterance="the"),
+        DatasetFilters(data_action=[DataAction.no_action]),
+        DatasetFilters(smart_tags={SmartTagFamily.extreme_length: [SmartTag.no_smart_tag]}),
+        DatasetFilters(
+            label=[0, 1],
+            prediction=[1],
+            confidence_max=0.9,
+            data_action=[DataAction.no_action],
+            outcome=[OutcomeName.CorrectAndPredicted, OutcomeName.IncorrectAndPredicted],
+        ),
+    ],
+)
+def test_filtering_speed(simple_text_config, filters):
+    dm = generate_mocked_dm(simple_text_config)
+    ds = dm.get_dataset_split(get_table_key(simple_text_config))
+
+    start = time.perf_counter()
+    filter_dataset_split(ds, filters, config=simple_text_config)
+    stop = time.perf_counter()
+    assert (stop - start) <= 0.05
+
+
+def test_confidence_histogram_speed(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    ds = dm.get_dataset_split(get_table_key(simple_text_config))
+    ConfidenceHistogramModule.get_bins(ds)
+
+    start = time.perf_counter()
+    bins = ConfidenceHistogramModule.get_bins(ds)
+    compute_ece_from_bins(bins)
+    stop = time.perf_counter()
+    assert sum(sum(b.outcome_count.values()) for b in bins) == len(ds)
+    assert (stop - start) <= 0.005
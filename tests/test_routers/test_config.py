@@ -32,6 +32,7 @@ def test_get_default_config(app: FastAPI):
         "rejection_class": "REJECTION_CLASS",
         "artifact_path": os.path.abspath("cache"),
         "batch_size": 32,
+        "batching_strategy": "contiguous",
         "use_cuda": "auto",
         "large_dask_cluster": False,
         "read_only_config": False,
@@ -149,6 +150,7 @@ def test_get_config(app: FastAPI):
     assert res == {
         "artifact_path": "/tmp/azimuth_test_cache",
         "batch_size": 16,
+        "batching_strategy": "contiguous",
         "behavioral_testing": {
             "fuzzy_matching": {"threshold": 1.0},
             "neutral_token": {
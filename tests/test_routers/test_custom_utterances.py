@@ -15,6 +15,13 @@ def test_generate_perturbation_tests(app: FastAPI) -> None:
     )
     assert resp.status_code == HTTP_200_OK, resp.text
     assert resp.headers["content-type"] == "application/json"
-    assert int(resp.headers["content-length"]) > 0
     assert "generate_perturbation_tests" in resp.headers["content-disposition"]
     assert ".json" in resp.headers["content-disposition"]
+    perturbed_utterances = resp.json()
+    assert {
+        perturbed_utterance["original_utterance"] for perturbed_utterance in perturbed_utterances
+    } == {"hello, this is me", "I like potatoes."}
+    assert all(
+        perturbed_utterance["description"] and perturbed_utterance["prediction"] == "NA"
+        for perturbed_utterance in perturbed_utterances
+    )
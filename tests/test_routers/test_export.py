@@ -1,20 +1,40 @@
 # Copyright ServiceNow, Inc. 2021 – 2022
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
+import gzip
+import io
+import os
 
+import orjson
+import pandas as pd
 from fastapi import FastAPI
 from starlette.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from starlette.testclient import TestClient
 
+from azimuth.app import get_startup_tasks
+from azimuth.modules.perturbation_testing import PerturbationTestingModule
+
 
 def test_get_export(app: FastAPI) -> None:
     client = TestClient(app)
     resp = client.get("/export/dataset_splits/eval/utterances")
     assert resp.status_code == HTTP_200_OK, resp.text
     assert resp.headers["content-type"] == "text/csv; charset=utf-8"
-    assert int(resp.headers["content-length"]) > 0
     assert "azimuth_export_sentiment-analysis_eval" in resp.headers["content-disposition"]
     assert resp.text.startswith("row_idx,utterance,label")  # snake_case
+    csv_text = resp.text
+
+    resp = client.get("/export/dataset_splits/eval/utterances?export_format=csv.gz")
+    assert resp.status_code == HTTP_200_OK, resp.text
+    assert resp.headers["content-type"] == "application/gzip"
+    assert ".csv.gz" in resp.headers["content-disposition"]
+    assert gzip.decompress(resp.content).decode() == csv_text
+
+    resp = client.get("/export/dataset_splits/eval/utterances?export_format=parquet")
+    assert resp.status_code == HTTP_200_OK, resp.text
+    assert ".parquet" in resp.headers["content-disposition"]
+    df = pd.read_parquet(io.BytesIO(resp.content))
+    assert df.columns.tolist() == pd.read_csv(io.StringIO(csv_text)).columns.tolist()
 
 
 def test_get_report(app: FastAPI) -> None:
@@ -44,9 +64,39 @@ def test_get_utterances(app: FastAPI) -> None:
     resp = client.get("/export/dataset_splits/eval/perturbed_utterances?pipeline_index=0")
     assert resp.status_code == HTTP_200_OK, resp.text
     assert resp.headers["content-type"] == "application/json"
-    assert int(resp.headers["content-length"]) > 0
     assert "modified_set" in resp.headers["content-disposition"]
     assert ".json" in resp.headers["content-disposition"]
+    perturbed_utterances = resp.json()
+    assert len(perturbed_utterances) > 0
+    assert all(
+        isinstance(perturbed_utterance["prediction"], str)
+        and isinstance(perturbed_utterance["original_prediction"], str)
+        for perturbed_utterance in perturbed_utterances
+    )
+
+    resp = client.get(
+        "/export/dataset_splits/eval/perturbed_utterances?pipeline_index=0&export_format=jsonl"
+    )
+    assert resp.status_code == HTTP_200_OK, resp.text
+    assert ".jsonl" in resp.headers["content-disposition"]
+    assert [orjson.loads(line) for line in resp.text.splitlines()] == perturbed_utterances
+
+    resp = client.get(
+        "/export/dataset_splits/eval/perturbed_utterances?pipeline_index=0&export_format=parquet"
+    )
+    assert resp.status_code == HTTP_200_OK, resp.text
+    df = pd.read_parquet(io.BytesIO(resp.content))
+    assert df["original_utterance"].tolist() == [
+        perturbed_utterance["original_utterance"] for perturbed_utterance in perturbed_utterances
+    ]
+
+    # Made from the results of the task when the results table is not saved.
+    for task in get_startup_tasks().values():
+        if isinstance(task, PerturbationTestingModule) and os.path.exists(task._results_table_path):
+            os.remove(task._results_table_path)
+    resp = client.get("/export/dataset_splits/eval/perturbed_utterances?pipeline_index=0")
+    assert resp.status_code == HTTP_200_OK, resp.text
+    assert resp.json() == perturbed_utterances
 
 
 def test_get_proposed_actions(app: FastAPI) -> None:
@@ -127,6 +127,49 @@ def test_get_utterances_pagination(app: FastAPI):
     assert resp.status_code == HTTP_400_BAD_REQUEST, resp.text
 
 
+def test_get_utterances_cursor(app: FastAPI):
+    client = TestClient(app)
+    url = "/dataset_splits/eval/utterances"
+    query = {"pipeline_index": 0, "sort": "confidence", "label": "negative"}
+    expected = client.get(url, params=query).json()
+    assert expected["nextCursor"] is None
+
+    resp = client.get(url, params={**query, "limit": 5, "offset": 0}).json()
+    indices = [u["index"] for u in resp["utterances"]]
+    while resp["nextCursor"] is not None:
+        resp = client.get(url, params={**query, "limit": 5, "cursor": resp["nextCursor"]}).json()
+        assert resp["utteranceCount"] == expected["utteranceCount"]
+        indices += [u["index"] for u in resp["utterances"]]
+    assert indices == [u["index"] for u in expected["utterances"]]
+
+    # Restricted to some indices, the pages and count only cover the rows in the indices.
+    query_indices = {**query, "indices": indices[::2]}
+    expected = client.get(url, params=query_indices).json()
+    resp = client.get(url, params={**query_indices, "limit": 3, "offset": 0}).json()
+    indices = [u["index"] for u in resp["utterances"]]
+    while resp["nextCursor"] is not None:
+        resp = client.get(
+            url, params={**query_indices, "limit": 3, "cursor": resp["nextCursor"]}
+        ).json()
+        assert resp["utteranceCount"] == expected["utteranceCount"]
+        indices += [u["index"] for u in resp["utterances"]]
+    assert indices == [u["index"] for u in expected["utterances"]]
+
+    cursor = client.get(url, params={**query, "limit": 5, "offset": 0}).json()["nextCursor"]
+    resp = client.get(url, params={**query, "limit": 5, "cursor": cursor, "descending": True})
+    assert resp.status_code == HTTP_400_BAD_REQUEST, resp.text
+    assert resp.json()["detail"] == "The cursor is for another sort order."
+
+    resp = client.get(url, params={**query, "limit": 5, "cursor": "not_a_cursor"})
+    assert resp.status_code == HTTP_400_BAD_REQUEST, resp.text
+    assert resp.json()["detail"] == "Invalid cursor."
+
+    resp = client.get(url, params={**query, "limit": 5, "offset": 0, "cursor": cursor})
+    assert resp.status_code == HTTP_400_BAD_REQUEST, resp.text
+    resp = client.get(url, params={**query, "cursor": cursor})
+    assert resp.status_code == HTTP_400_BAD_REQUEST, resp.text
+
+
 def test_get_utterances_filtering_and_indexing(app: FastAPI):
     client = TestClient(app)
 
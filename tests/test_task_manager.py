@@ -9,7 +9,14 @@ import pytest
 from azimuth.config import SyntaxConfig
 from azimuth.modules.base_classes import AggregationModule, FilterableModule, Module
 from azimuth.task_manager import TaskManagerLockedException
-from azimuth.types import DatasetSplitName, ModuleOptions, SupportedMethod, SupportedModule
+from azimuth.types import (
+    DatasetFilters,
+    DatasetSplitName,
+    ModuleOptions,
+    SupportedMethod,
+    SupportedModule,
+)
+from azimuth.types.tag import DataAction
 
 
 def test_get_all_task(tiny_text_task_manager):
@@ -117,6 +124,55 @@ def test_expired_task(tiny_text_task_manager, tiny_text_config):
         last_update=current_update,
     )
     assert not_expirable_task.done() and not expirable_task.done()
+    expirable_task.wait()
+
+    # Once recomputed, the task is not expired anymore
+    _, expirable_task = tiny_text_task_manager.get_task(
+        "ExpirableModule",
+        dataset_split_name=DatasetSplitName.eval,
+        mod_options=ModuleOptions(pipeline_index=0),
+        last_update=current_update,
+    )
+    assert expirable_task.done()
+
+
+def test_expired_task_data_actions(tiny_text_task_manager):
+    class ExpirableModule(FilterableModule[SyntaxConfig]):
+        def compute(self, batch):
+            return ["ExpirableModule"]
+
+    tiny_text_task_manager.register_task("ExpirableModule", ExpirableModule)
+    mod_options = ModuleOptions(pipeline_index=0)
+    data_action_mod_options = ModuleOptions(
+        pipeline_index=0, filters=DatasetFilters(data_action=[DataAction.relabel])
+    )
+
+    current_update = time.time()
+    for options in (mod_options, data_action_mod_options):
+        _, task = tiny_text_task_manager.get_task(
+            "ExpirableModule",
+            dataset_split_name=DatasetSplitName.eval,
+            mod_options=options,
+            last_update=current_update,
+        )
+        task.wait()
+
+    # Only data actions changed, so only the task filtering on data actions is recomputed.
+    _, task = tiny_text_task_manager.get_task(
+        "ExpirableModule",
+        dataset_split_name=DatasetSplitName.eval,
+        mod_options=mod_options,
+        last_update=time.time(),
+        last_update_excluding_data_actions=current_update,
+    )
+    _, data_action_task = tiny_text_task_manager.get_task(
+        "ExpirableModule",
+        dataset_split_name=DatasetSplitName.eval,
+        mod_options=data_action_mod_options,
+        last_update=time.time(),
+        last_update_excluding_data_actions=current_update,
+    )
+    assert task.done() and not data_action_task.done()
 
 
 def test_lock(tiny_text_task_manager):
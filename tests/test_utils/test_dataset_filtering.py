@@ -2,7 +2,9 @@
 # This source code is licensed under the Apache 2.0 license found in the LICENSE file
 # in the root directory of this source tree.
 
+import numpy as np
 import pytest
+from datasets import Dataset, concatenate_datasets
 
 from azimuth.types import DatasetColumn, DatasetFilters
 from azimuth.types.outcomes import OutcomeName
@@ -15,7 +17,13 @@ from azimuth.types.tag import (
     SmartTag,
     SmartTagFamily,
 )
-from azimuth.utils.dataset_operations import filter_dataset_split
+from azimuth.utils import dataset_operations
+from azimuth.utils.dataset_operations import (
+    filter_dataset_split,
+    get_arrow_column,
+    get_arrow_table,
+    get_filters_mask,
+)
 from tests.utils import generate_mocked_dm, get_table_key
 
 
@@ -196,5 +204,64 @@ def test_dataset_filtering_without_postprocessing(simple_text_config):
     assert len(ds_filtered_with_postprocessing) != len(ds_filtered_without_postprocessing)
 
 
+def test_get_filters_mask(simple_text_config):
+    dm = generate_mocked_dm(simple_text_config)
+    ds = dm.get_dataset_split(get_table_key(simple_text_config))
+    assert get_filters_mask(ds, DatasetFilters(), config=dm.config) is None
+
+    filters = DatasetFilters(
+        label=[0, 1], prediction=[0], outcome=[OutcomeName.CorrectAndPredicted]
+    )
+    mask = get_filters_mask(ds, filters, config=dm.config)
+    assert mask.shape == (len(ds),) and mask.dtype == bool
+    ds_filtered = filter_dataset_split(ds, filters, config=dm.config)
+    assert ds_filtered[DatasetColumn.row_idx] == np.flatnonzero(mask).tolist()
+
+
+@pytest.mark.parametrize("utterance", ["", "a", "hello", "don't", "zzz", "3", "12"])
+def test_dataset_filtering_with_utterance_index(simple_text_config, utterance):
+    dm = generate_mocked_dm(simple_text_config)
+    ds = dm.get_dataset_split(get_table_key(simple_text_config)).select([9, 3, 12, 1, 0])
+    filters = DatasetFilters(utterance=utterance)
+    ds_filtered = filter_dataset_split(
+        ds, filters, config=dm.config, utterance_index=dm.get_utterance_index()
+    )
+    expected = filter_dataset_split(ds, filters, config=dm.config)
+    assert ds_filtered[DatasetColumn.row_idx] == expected[DatasetColumn.row_idx]
+
+
 if __name__ == "__main__":
     pytest.main()
+
+
+def test_get_arrow_table(monkeypatch):
+    ds = concatenate_datasets(
+        [
+            Dataset.from_dict({"a": list(range(i, i + 10)), "b": ["x"] * 10})
+            for i in range(0, 50, 10)
+        ]
+    )
+    selection = ds.select([42, 3, 17, 3])
+    assert get_arrow_table(selection).to_pydict() == selection.to_dict()
+    monkeypatch.setattr(dataset_operations, "GATHER_MAX_ROWS", 2)  # Taken from whole columns
+    assert get_arrow_table(selection).to_pydict() == selection.to_dict()
+    assert get_arrow_table(ds.select([])).num_rows == 0
+    assert get_arrow_table(ds).to_pydict() == ds.to_dict()
+    # Positions are relative to the selection.
+    assert get_arrow_table(selection, [2, 0]).to_pydict() == selection.select([2, 0]).to_dict()
+    assert get_arrow_table(ds, [17, 3]).to_pydict() == ds.select([17, 3]).to_dict()
+
+
+def test_arrow_access_matches_datasets():
+    # Guards the use of the indices mapping of `datasets`, which is not public.
+    ds = Dataset.from_dict({"a": list(range(20)), "b": [str(i) for i in range(20)]})
+    for selection in [
+        ds,
+        ds.select([5, 1, 1, 12]),
+        ds.shuffle(seed=3),
+        ds.filter(lambda r: r["a"] % 3),
+    ]:
+        public = selection.with_format("arrow")
+        assert get_arrow_column(selection, "b").to_pylist() == public["b"].to_pylist()
+        assert get_arrow_table(selection).to_pydict() == public[:].to_pydict()
+        assert get_arrow_table(selection, [1, 0]).to_pydict() == public[[1, 0]].to_pydict()
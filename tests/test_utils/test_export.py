@@ -0,0 +1,66 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import gzip
+import io
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+
+from azimuth.types import ExportFormat
+from azimuth.utils.export import class_ids_to_names, iter_export_bytes
+
+
+def test_class_ids_to_names():
+    class_names = np.array(["a", "b", "REJECTION_CLASS"], dtype=object)
+
+    assert class_ids_to_names(pa.array([0, 2, -1]), class_names).to_pylist() == [
+        "a",
+        "REJECTION_CLASS",
+        "REJECTION_CLASS",
+    ]
+    lists = pa.array([[1, 0], [], [2]]).slice(1)
+    assert class_ids_to_names(lists, class_names).to_pylist() == [[], ["REJECTION_CLASS"]]
+    fixed_size_lists = pa.FixedSizeListArray.from_arrays(pa.array([1, 0, 0, 1]), 2)
+    assert class_ids_to_names(fixed_size_lists, class_names).to_pylist() == [
+        ["b", "a"],
+        ["a", "b"],
+    ]
+
+
+def test_iter_export_bytes():
+    tables = [
+        pa.table({"label": ["a", "b"], "confidences": [[0.6, 0.4], [0.9, 0.1]]}),
+        pa.table({"label": ["c"], "confidences": [[0.5, 0.5]]}),
+    ]
+    csv = b"".join(iter_export_bytes(tables, ExportFormat.csv)).decode()
+    assert csv.splitlines() == [
+        "label,confidences",
+        'a,"[0.6, 0.4]"',
+        'b,"[0.9, 0.1]"',
+        'c,"[0.5, 0.5]"',
+    ]
+    assert gzip.decompress(b"".join(iter_export_bytes(tables, ExportFormat.csv_gz))) == (
+        csv.encode()
+    )
+
+    parquet = b"".join(iter_export_bytes(tables, ExportFormat.parquet))
+    df = pd.read_parquet(io.BytesIO(parquet))
+    assert df["label"].tolist() == ["a", "b", "c"]
+    assert [confidences.tolist() for confidences in df["confidences"]] == [
+        [0.6, 0.4],
+        [0.9, 0.1],
+        [0.5, 0.5],
+    ]
+
+    rows = [
+        {"label": "a", "confidences": [0.6, 0.4]},
+        {"label": "b", "confidences": [0.9, 0.1]},
+        {"label": "c", "confidences": [0.5, 0.5]},
+    ]
+    assert orjson.loads(b"".join(iter_export_bytes(tables, ExportFormat.json))) == rows
+    assert orjson.loads(b"".join(iter_export_bytes([], ExportFormat.json))) == []
+    jsonl = b"".join(iter_export_bytes(tables, ExportFormat.jsonl)).decode()
+    assert [orjson.loads(line) for line in jsonl.splitlines()] == rows
@@ -0,0 +1,51 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+from azimuth.config import BatchingStrategy
+from azimuth.utils.ml.batching import make_batches
+
+
+def padded_size(batches, lengths):
+    return sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+
+
+@pytest.mark.parametrize("strategy", list(BatchingStrategy))
+def test_make_batches_covers_all_rows(strategy):
+    lengths = [5, 1, 30, 2, 2, 7, 100, 3, 1]
+    batches = make_batches(lengths, batch_size=4, strategy=strategy)
+    assert sorted(row for batch in batches for row in batch) == list(range(len(lengths)))
+    assert make_batches([], batch_size=4, strategy=strategy) == []
+
+
+def test_make_batches_contiguous():
+    batches = make_batches([5, 1, 30, 2, 2], batch_size=2)
+    assert batches == [[0, 1], [2, 3], [4]]
+
+
+def test_make_batches_sorted_by_length():
+    lengths = [5, 1, 30, 2, 2]
+    batches = make_batches(lengths, batch_size=2, strategy=BatchingStrategy.sorted_by_length)
+    # Ties keep their original order.
+    assert batches == [[1, 3], [4, 0], [2]]
+    assert padded_size(batches, lengths) < padded_size(make_batches(lengths, 2), lengths)
+
+
+def test_make_batches_token_budget():
+    lengths = [1] * 8 + [40, 50]
+    batches = make_batches(lengths, batch_size=2, strategy=BatchingStrategy.token_budget)
+    # The budget is 2 * mean(lengths) = 19.6, so short utterances are packed together while long
+    # ones are alone in their batch.
+    assert batches == [list(range(8)), [8], [9]]
+    assert all(len(batch) * max(lengths[i] for i in batch) <= 50 for batch in batches)
+
+
+def test_make_batches_reduce_padding_on_long_tail():
+    rng = np.random.default_rng(2022)
+    lengths = np.minimum(rng.lognormal(mean=3, sigma=1, size=1000).astype(int) + 1, 2000)
+    contiguous = padded_size(make_batches(lengths, 32), lengths)
+    for strategy in [BatchingStrategy.sorted_by_length, BatchingStrategy.token_budget]:
+        assert padded_size(make_batches(lengths, 32, strategy), lengths) < contiguous / 3
@@ -0,0 +1,86 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import numpy as np
+
+from azimuth.types.outcomes import ALL_OUTCOMES
+from azimuth.utils.ml.group_statistics import GroupStatistics
+from azimuth.utils.ml.model_performance import (
+    CONFIDENCE_BINS_COUNT,
+    compute_outcomes,
+    get_confidence_bin_indices,
+    get_outcome_codes,
+)
+
+
+def make_statistics(rng, memberships):
+    num_rows = len(memberships)
+    predictions = rng.integers(0, 4, size=num_rows)
+    labels = rng.integers(0, 4, size=num_rows)
+    return GroupStatistics(
+        labels=labels,
+        predictions=predictions,
+        outcome_codes=get_outcome_codes(compute_outcomes(predictions, labels, 3)),
+        confidences=rng.random(num_rows),
+        memberships=memberships,
+        num_classes=4,
+    )
+
+
+def assert_same_statistics(statistics, expected):
+    assert np.array_equal(statistics.confusion, expected.confusion)
+    assert np.array_equal(statistics.outcome_count_per_bin, expected.outcome_count_per_bin)
+    assert np.allclose(statistics.confidence_sum_per_bin, expected.confidence_sum_per_bin)
+
+
+def test_group_statistics():
+    rng = np.random.default_rng(2022)
+    memberships = rng.random((200, 3)) < 0.3
+    statistics = make_statistics(rng, memberships)
+
+    assert statistics.confusion.shape == (3, 4, 4)
+    assert statistics.outcome_count_per_bin.shape == (3, CONFIDENCE_BINS_COUNT, len(ALL_OUTCOMES))
+    assert statistics.utterance_count.tolist() == memberships.sum(0).tolist()
+    assert statistics.outcome_count.sum(1).tolist() == memberships.sum(0).tolist()
+
+    labels, predictions = statistics._labels, statistics._predictions
+    bins = get_confidence_bin_indices(statistics._confidences)
+    for group in range(3):
+        rows = memberships[:, group]
+        expected_confusion = np.zeros((4, 4), dtype=np.int64)
+        np.add.at(expected_confusion, (labels[rows], predictions[rows]), 1)
+        assert np.array_equal(statistics.confusion[group], expected_confusion)
+        assert np.allclose(
+            statistics.confidence_sum_per_bin[group],
+            np.bincount(
+                bins[rows],
+                weights=statistics._confidences[rows],
+                minlength=CONFIDENCE_BINS_COUNT,
+            ),
+        )
+
+
+def test_group_statistics_update():
+    rng = np.random.default_rng(2022)
+    memberships = rng.random((200, 3)) < 0.3
+    statistics = make_statistics(rng, memberships)
+
+    for _ in range(5):
+        memberships = memberships.copy()
+        rows = rng.choice(200, size=4, replace=False)
+        memberships[rows] = rng.random((4, 3)) < 0.5
+        expected_changes = (memberships != statistics._memberships).any(1).sum()
+        assert statistics.update_memberships(memberships) == expected_changes
+
+        expected = GroupStatistics(
+            labels=statistics._labels,
+            predictions=statistics._predictions,
+            outcome_codes=statistics._outcome_codes,
+            confidences=statistics._confidences,
+            memberships=memberships,
+            num_classes=4,
+        )
+        assert_same_statistics(statistics, expected)
+
+    # Nothing changed
+    assert statistics.update_memberships(memberships) == 0
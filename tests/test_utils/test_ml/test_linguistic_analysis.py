@@ -0,0 +1,45 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+from azimuth.utils.ml import linguistic_analysis
+from azimuth.utils.ml.linguistic_analysis import (
+    analyze_utterances,
+    flatten_token_column,
+    get_token_row_indices,
+    load_spacy_model,
+)
+
+
+def test_analyze_utterances():
+    analysis = analyze_utterances(
+        ["Detect files.", "This is hell. It’s horrible!"], "en_core_web_sm"
+    )
+
+    assert analysis.column("tokens").to_pylist() == [
+        ["detect", "files", "."],
+        ["this", "is", "hell", ".", "it", "'s", "horrible", "!"],
+    ]
+    assert analysis.column("is_punct").to_pylist()[0] == [False, False, True]
+    assert analysis.column("is_stop").to_pylist()[1][:2] == [True, True]
+    assert analysis.column("sentence_count").to_pylist() == [1, 2]
+    assert get_token_row_indices(analysis).tolist() == [0] * 3 + [1] * 8
+    assert flatten_token_column(analysis, "pos").tolist()[:2] == ["VERB", "NOUN"]
+
+    # Only the selected rows are flattened.
+    selection = analysis.take([1])
+    assert get_token_row_indices(selection).tolist() == [0] * 8
+    assert flatten_token_column(selection, "tokens").tolist()[:2] == ["this", "is"]
+
+
+def test_analyze_utterances_parallel(monkeypatch):
+    utterances = ["detect files.", "I am looking for", "sugar and cookies!", "this is hell."] * 4
+    expected = analyze_utterances(utterances, "en_core_web_sm")
+    # The spaCy model is only loaded once.
+    assert load_spacy_model("en_core_web_sm") is load_spacy_model("en_core_web_sm")
+    assert "ner" not in load_spacy_model("en_core_web_sm").pipe_names
+
+    # Results are in the same order with many processes.
+    monkeypatch.setattr(linguistic_analysis, "SPACY_BATCH_SIZE", 2)
+    monkeypatch.setattr(linguistic_analysis, "SPACY_MAX_PROCESSES", 2)
+    assert linguistic_analysis.get_spacy_n_process(len(utterances)) == 2
+    assert analyze_utterances(utterances, "en_core_web_sm").equals(expected)
@@ -0,0 +1,66 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+from collections import Counter
+
+import numpy as np
+
+from azimuth.types.outcomes import ALL_OUTCOMES
+from azimuth.utils.ml.model_performance import (
+    compute_outcome,
+    compute_outcomes,
+    count_per_group,
+    get_outcome_codes,
+    outcome_count_per_threshold,
+)
+
+
+def test_compute_outcomes():
+    rng = np.random.default_rng(2022)
+    predictions = rng.integers(0, 4, size=100)
+    labels = rng.integers(0, 4, size=100)
+    rejection_class_idx = 3
+
+    assert compute_outcomes(predictions, labels, rejection_class_idx) == [
+        compute_outcome(prediction, label, rejection_class_idx)
+        for prediction, label in zip(predictions, labels)
+    ]
+    assert compute_outcomes(np.array([]), np.array([]), rejection_class_idx) == []
+
+
+def test_outcome_count_per_threshold():
+    rng = np.random.default_rng(2022)
+    probs = rng.dirichlet(np.ones(5), size=200)
+    labels = rng.integers(0, 5, size=200)
+    thresholds = np.linspace(0, 1, 101)
+    rejection_class_idx = 4
+
+    counts = outcome_count_per_threshold(
+        probs.max(-1), probs.argmax(-1), labels, thresholds, rejection_class_idx
+    )
+
+    assert len(counts) == len(thresholds)
+    for threshold, count in zip(thresholds, counts):
+        predictions = np.where(probs.max(-1) > threshold, probs.argmax(-1), rejection_class_idx)
+        assert count == Counter(compute_outcomes(predictions, labels, rejection_class_idx))
+
+
+def test_count_per_group():
+    rng = np.random.default_rng(2022)
+    predictions = rng.integers(0, 4, size=100)
+    labels = rng.integers(0, 4, size=100)
+    outcomes = compute_outcomes(predictions, labels, rejection_class_idx=3)
+    codes = get_outcome_codes(outcomes)
+    assert [ALL_OUTCOMES[code] for code in codes] == outcomes
+
+    counts = count_per_group(labels, codes, num_groups=5, num_codes=len(ALL_OUTCOMES))
+    assert counts.shape == (5, len(ALL_OUTCOMES))
+    for label in range(5):
+        expected = Counter(outcome for outcome, lbl in zip(outcomes, labels) if lbl == label)
+        assert counts[label].tolist() == [expected[outcome] for outcome in ALL_OUTCOMES]
+
+    weights = rng.random(100)
+    sums = count_per_group(
+        labels, codes, num_groups=5, num_codes=len(ALL_OUTCOMES), weights=weights
+    )
+    assert np.allclose(sums.sum(1), [weights[labels == label].sum() for label in range(5)])
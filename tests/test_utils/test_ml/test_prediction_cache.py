@@ -0,0 +1,51 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import h5py
+import numpy as np
+
+from azimuth.utils.ml.prediction_cache import PredictionCache, get_prediction_cache
+
+
+def test_prediction_cache(tmp_path):
+    path = str(tmp_path / "cache.h5")
+    cache = get_prediction_cache(path)
+    assert cache is get_prediction_cache(path)
+    assert cache.get(["hello", "bye"]) == [None, None]
+
+    cache.put(["hello", "bye"], np.array([[0.1, 0.9], [0.6, 0.4]]))
+    hello, unknown, bye = cache.get(["hello", "unknown", "bye"])
+    assert np.allclose(hello, [0.1, 0.9]) and np.allclose(bye, [0.6, 0.4])
+    assert unknown is None
+    assert (cache.hits, cache.lookups) == (2, 5)
+    assert cache.hit_rate == 0.4
+
+    # Saved for other processes.
+    [hello] = PredictionCache(path).get(["hello"])
+    assert np.allclose(hello, [0.1, 0.9])
+
+    # Rows are appended once per utterance, in one dataset for all utterances.
+    cache.put(["bye", "new", "new"], np.array([[0.0, 1.0], [0.3, 0.7], [0.3, 0.7]]))
+    with h5py.File(path, "r") as handle:
+        assert set(handle) == {"keys", "probs"}
+        assert handle["probs"].shape == (3, 2)
+    [bye, new] = PredictionCache(path).get(["bye", "new"])
+    assert np.allclose(bye, [0.6, 0.4]) and np.allclose(new, [0.3, 0.7])
+
+
+def test_prediction_cache_corrupt(tmp_path):
+    path = str(tmp_path / "cache.h5")
+    cache = PredictionCache(path)
+    cache.put(["hello"], np.array([[0.1, 0.9]]))
+    other_process = PredictionCache(path)
+    assert other_process.get(["hello"])[0] is not None
+
+    # Like a writer that crashed while appending.
+    with open(path, "wb") as f:
+        f.write(b"corrupt")
+    assert cache.get(["hello"]) == [None]
+
+    cache.put(["bye"], np.array([[0.6, 0.4]]))
+    # The previous rows are not valid in the recreated cache, in any process.
+    hello, bye = other_process.get(["hello", "bye"])
+    assert hello is None and np.allclose(bye, [0.6, 0.4])
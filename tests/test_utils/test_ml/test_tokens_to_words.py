@@ -0,0 +1,35 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import numpy as np
+import pytest
+
+from azimuth.utils.ml.tokens_to_words import merge_tokens
+
+
+def test_merge_tokens_word_pieces():
+    words, saliencies = merge_tokens(
+        [["[CLS]", "hel", "##lo", "sky", "[SEP]"], [], ["cof", "##f", "##ee"]],
+        [[0.1, 0.2, 0.3, 0.4, 0.5], [], [0.1, 0.1, 0.1]],
+    )
+    assert words == [["[CLS]", "hello", "sky", "[SEP]"], [], ["coffee"]]
+    assert np.allclose(saliencies[0], [0.1, 0.5, 0.4, 0.5])
+    assert saliencies[1] == []
+    assert np.allclose(saliencies[2], [0.3])
+
+    assert merge_tokens([[], []], [[], []]) == ([[], []], [[], []])
+    with pytest.raises(ValueError):
+        merge_tokens([["sky"], ["##lo"]], [[0.1], [0.2]])
+
+
+def test_merge_tokens_word_ids():
+    # BPE tokens, merged according to word indices, with a WordPiece fallback for the second row.
+    words, saliencies = merge_tokens(
+        [["<s>", "Ġhel", "lo", "Ġsky", "</s>"], ["hel", "##lo"]],
+        [[0.1, 0.2, 0.3, 0.4, 0.5], [0.1, 0.2]],
+        [[None, 0, 0, 1, None], None],
+        tokens_to_string=lambda tokens: "".join(tokens).replace("Ġ", " "),
+    )
+    assert words == [["<s>", "hello", "sky", "</s>"], ["hello"]]
+    assert np.allclose(saliencies[0], [0.1, 0.5, 0.4, 0.5])
+    assert np.allclose(saliencies[1], [0.3])
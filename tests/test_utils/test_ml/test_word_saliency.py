@@ -0,0 +1,34 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import numpy as np
+
+from azimuth.utils.ml.word_saliency import WordSaliency
+
+
+def test_word_saliency(tmp_path):
+    word_saliency = WordSaliency.from_words(
+        [0, 1, 2, 3],
+        [["[CLS]", "Hello", "sky", "[SEP]"], ["[CLS]", "blue", "Sky"], [], ["hello", "blue"]],
+        [[0.9, 0.6, 0.1, 0.2], [0.1, 0.5, 0.4], [], [0.02, 0.005]],
+        excluded_words=["[CLS]", "[SEP]"],
+    )
+    assert len(word_saliency) == 6
+
+    # Above half the highest saliency (cls included) and above 0.01.
+    assert word_saliency.most_important_words(np.array([0, 1, 2, 3]), 0.5, 0.01, 10) == [
+        ("hello", 2),
+        ("blue", 1),
+        ("sky", 1),
+    ]
+    assert word_saliency.most_important_words(np.array([1, 3]), 0.5, 0.01, 1) == [("blue", 1)]
+    assert word_saliency.most_important_words(np.array([2]), 0.5, 0.01, 10) == []
+
+    path = str(tmp_path / "word_saliency.npz")
+    word_saliency.save(path)
+    loaded = WordSaliency.load(path)
+    assert loaded.most_important_words(np.array([0, 1]), 0.0, 0.0, 10) == [
+        ("sky", 2),
+        ("hello", 1),
+        ("blue", 1),
+    ]
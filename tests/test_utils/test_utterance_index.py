@@ -0,0 +1,50 @@
+# Copyright ServiceNow, Inc. 2021 – 2022
+# This source code is licensed under the Apache 2.0 license found in the LICENSE file
+# in the root directory of this source tree.
+import pytest
+
+from azimuth.utils.utterance import clean_utterance
+from azimuth.utils.utterance_index import UtteranceIndex
+
+UTTERANCES = ["Hello world", "I don’t know", "", "hello", "WORLD cup", "a", "abab"]
+PERSISTENT_IDS = ["id0", "id1", "id2", "id3", "id4", "id5", "10"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "",
+        "h",
+        "lo",
+        "hello",
+        "world",
+        "o w",
+        "don't",
+        "don`t",
+        "ba",
+        "bab",
+        "abab",
+        "zzz",
+        "1",
+        "id4",
+    ]
+    + ["10", "12"],
+)
+def test_utterance_index_search(query):
+    row_indices = list(range(10, 10 + len(UTTERANCES)))
+    index = UtteranceIndex(UTTERANCES, row_indices=row_indices, persistent_ids=PERSISTENT_IDS)
+    expected = [
+        row_idx
+        for row_idx, utterance, persistent_id in zip(row_indices, UTTERANCES, PERSISTENT_IDS)
+        if clean_utterance(query) in clean_utterance(utterance)
+        or query == str(row_idx)
+        or query == persistent_id
+    ]
+    assert index.search(query).tolist() == expected
+
+
+def test_utterance_index_empty():
+    index = UtteranceIndex([], row_indices=[], persistent_ids=[])
+    assert len(index) == 0
+    assert index.search("").tolist() == []
+    assert index.search("hello").tolist() == []
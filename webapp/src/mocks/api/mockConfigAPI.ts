@@ -24,6 +24,7 @@ export const getConfigAPIResponse = rest.get(
       rejection_class: null,
       artifact_path: "/Users/nandhini.babu/OpenSource-Azimuth/azimuth/cache",
       batch_size: 32,
+      batching_strategy: "contiguous",
       use_cuda: "auto",
       large_dask_cluster: false,
       read_only_config: false,
@@ -141,6 +142,7 @@ export const getConfigMultipipelineAPIResponse = rest.get(
       rejection_class: null,
       artifact_path: "/Users/nandhini.babu/OpenSource-Azimuth/azimuth/cache",
       batch_size: 32,
+      batching_strategy: "contiguous",
       use_cuda: "auto",
       large_dask_cluster: false,
       read_only_config: false,
@@ -89,7 +89,7 @@ export interface paths {
     get: operations["get_similar_dataset_splits__dataset_split_name__utterances__index__similar_utterances_get"];
   };
   "/export/dataset_splits/{dataset_split_name}/utterances": {
-    /** Export the dataset_split to a CSV file and returns it. */
+    /** Export the dataset_split to a CSV (optionally compressed) or Parquet file and streams it. */
     get: operations["export_dataset_export_dataset_splits__dataset_split_name__utterances_get"];
   };
   "/export/dataset_splits/{dataset_split_name}/proposed_actions": {
@@ -101,7 +101,7 @@ export interface paths {
     get: operations["get_export_perturbation_testing_summary_export_perturbation_testing_summary_get"];
   };
   "/export/dataset_splits/{dataset_split_name}/perturbed_utterances": {
-    /** Export the perturbed dataset split (training or evaluation) to a JSON file and returns it. */
+    /** Export the perturbed dataset split (training or evaluation) to a JSON, JSON Lines or Parquet file and streams it. */
     get: operations["get_export_perturbed_set_export_dataset_splits__dataset_split_name__perturbed_utterances_get"];
   };
   "/custom_utterances/perturbed_utterances": {
@@ -141,6 +141,7 @@ export interface components {
       /** Where to store artifacts (Azimuth config history, HDF5 files, HF datasets). */
       artifact_path: string;
       batch_size: number;
+      batching_strategy: components["schemas"]["BatchingStrategy"];
       use_cuda: "auto" | boolean;
       large_dask_cluster: boolean;
       read_only_config: boolean;
@@ -168,6 +169,8 @@ export interface components {
       created_on: string;
       hash: string;
     };
+    /** An enumeration. */
+    BatchingStrategy: "contiguous" | "sorted_by_length" | "token_budget";
     /**
      * Base class for settings, allowing values to be overridden by environment variables.
      *
@@ -355,6 +358,8 @@ export interface components {
       max_delta_std_words: number;
     };
     /** An enumeration. */
+    ExportFormat: "csv" | "csv.gz" | "parquet" | "json" | "jsonl";
+    /** An enumeration. */
     FormatType: "Integer" | "Percentage" | "Decimal";
     /**
      * Base class for settings, allowing values to be overridden by environment variables.
@@ -373,6 +378,7 @@ export interface components {
       utterances: components["schemas"]["Utterance"][];
       utteranceCount: number;
       confidenceThreshold: number | null;
+      nextCursor?: string | null;
     };
     HTTPExceptionModel: {
       detail: string;
@@ -1948,6 +1954,7 @@ export interface operations {
         pipeline_index?: number;
         limit?: number;
         offset?: number;
+        cursor?: string;
       };
     };
     responses: {
@@ -2178,6 +2185,7 @@ export interface operations {
       };
       query: {
         use_bma?: boolean;
+        export_format?: components["schemas"]["ExportFormat"];
         pipeline_index?: number;
       };
     };
@@ -2318,7 +2326,7 @@ export interface operations {
       };
     };
   };
-  /** Export the perturbed dataset split (training or evaluation) to a JSON file and returns it. */
+  /** Export the perturbed dataset split (training or evaluation) to a JSON, JSON Lines or Parquet file and streams it. */
   get_export_perturbed_set_export_dataset_splits__dataset_split_name__perturbed_utterances_get: {
     parameters: {
       path: {
@@ -2326,6 +2334,7 @@ export interface operations {
       };
       query: {
         use_bma?: boolean;
+        export_format?: components["schemas"]["ExportFormat"];
         pipeline_index: number;
       };
     };